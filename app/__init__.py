@@ -13,7 +13,10 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    from app.db_pool import configure_pool, init_pool_metrics
+    configure_pool(app)
     db.init_app(app)
+    init_pool_metrics(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -26,6 +29,18 @@ def create_app(config_class=Config):
     app.register_blueprint(rep.bp)
     app.register_blueprint(customer.bp)
 
+    from app.instrumentation import init_instrumentation
+    init_instrumentation(app)
+
+    from app.assets import init_assets
+    init_assets(app)
+
+    from app.cache import init_cache
+    init_cache(app)
+
+    from app.customer_summary import init_customer_summaries
+    init_customer_summaries(app)
+
     return app
 
 
@@ -0,0 +1,206 @@
+"""
+Bulk application import from CSV or JSON-lines files
+
+Records are streamed through the same ApplicationForm validators the public
+apply page uses and inserted with one multi-row INSERT per batch, so large
+files import in constant memory. Rejected rows are reported with their line
+number and the validation errors.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from werkzeug.datastructures import MultiDict
+from wtforms import BooleanField
+from app import db
+from app.models import Application
+from app.forms import ApplicationForm
+from app.utils import log_activity
+from app.duplicates import index_applications
+from app.underwriting import score_records
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+# Rejected rows kept in memory for display; the full list goes to error_stream
+MAX_REPORTED_ERRORS = 200
+
+# Form fields that are not application columns
+_NON_COLUMN_FIELDS = ('submit', 'csrf_token')
+
+ERROR_REPORT_HEADER = ['line', 'business_name', 'owner_email', 'errors']
+
+# Spellings accepted for yes/no columns (compared lower-cased)
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'n', 'off', '')
+
+
+class ImportResult:
+    """Counts and the first rejected rows of an import run"""
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+
+    @property
+    def total(self):
+        return self.imported + self.rejected
+
+
+def detect_format(filename):
+    """Guess the import format from a file name ('csv' unless it ends in .jsonl/.json)"""
+    if filename and filename.lower().rsplit('.', 1)[-1] in ('jsonl', 'json'):
+        return 'jsonl'
+    return 'csv'
+
+
+def iter_records(stream, fmt='csv'):
+    """
+    Yield (line_number, record) pairs from a text stream
+
+    JSON lines that cannot be parsed are yielded with record None so they are
+    reported as rejected rows instead of aborting the import.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else None
+
+
+def _to_formdata(record, boolean_fields=()):
+    """
+    Turn a CSV/JSON record into form data the way a browser would submit it
+
+    Yes/no columns are sent as 'y' when true and left out when false, as a
+    checkbox would be.
+
+    Returns:
+        Tuple of (MultiDict, dict of field -> error messages for unrecognised yes/no values)
+    """
+    formdata = MultiDict()
+    errors = {}
+    for key, value in record.items():
+        if key is None or value is None:
+            continue
+        key = key.strip()
+        if key in boolean_fields:
+            text = str(value).strip().lower()
+            if value is True or text in TRUE_VALUES:
+                formdata[key] = 'y'
+            elif value is not False and text not in FALSE_VALUES:
+                errors[key] = [f'expected yes or no, got {str(value).strip()!r}']
+            continue
+        if value is False:
+            continue
+        if value is True:
+            value = 'y'
+        formdata[key] = str(value).strip()
+    return formdata, errors
+
+
+def _format_errors(form_errors):
+    return '; '.join(
+        f'{field}: {", ".join(messages)}' for field, messages in sorted(form_errors.items())
+    )
+
+
+def import_applications(stream, fmt='csv', error_stream=None, batch_size=IMPORT_BATCH_SIZE, user_id=None):
+    """
+    Validate and insert applications from a CSV or JSON-lines text stream
+
+    Each batch is committed on its own, so an interrupted import keeps the
+    batches that already went in.
+
+    Args:
+        stream: Text stream (file object) to read
+        fmt: 'csv' or 'jsonl'
+        error_stream: Optional text stream that receives a CSV report of every rejected row
+        batch_size: Rows per INSERT / commit
+        user_id: User credited with the import in the activity log
+
+    Returns:
+        ImportResult
+    """
+    result = ImportResult()
+    form = ApplicationForm(formdata=None, meta={'csrf': False})
+    columns = [field.name for field in form if field.name not in _NON_COLUMN_FIELDS]
+    boolean_fields = {field.name for field in form if isinstance(field, BooleanField)}
+
+    error_writer = csv.writer(error_stream) if error_stream is not None else None
+    if error_writer:
+        error_writer.writerow(ERROR_REPORT_HEADER)
+
+    def reject(line_number, record, message):
+        result.rejected += 1
+        record = record or {}
+        row = [line_number, record.get('business_name', ''), record.get('owner_email', ''), message]
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(dict(zip(ERROR_REPORT_HEADER, row)))
+        if error_writer:
+            error_writer.writerow(row)
+
+    def flush(batch):
+        for row, score in zip(batch, score_records(batch)):
+            row.update(score)
+        statement = db.insert(Application).returning(Application.id, sort_by_parameter_order=True)
+        ids = db.session.scalars(statement, batch).all()
+        index_applications(zip(ids, batch))
+        db.session.commit()
+        result.imported += len(batch)
+
+    batch = []
+    for line_number, record in iter_records(stream, fmt):
+        if record is None:
+            reject(line_number, None, 'invalid JSON object')
+            continue
+
+        formdata, value_errors = _to_formdata(record, boolean_fields)
+        if value_errors:
+            reject(line_number, record, _format_errors(value_errors))
+            continue
+
+        form.process(formdata=formdata)
+        if not form.validate():
+            reject(line_number, record, _format_errors(form.errors))
+            continue
+
+        row = {name: form[name].data for name in columns}
+        row['status'] = 'pending'
+        row['submitted_at'] = datetime.utcnow()
+        batch.append(row)
+
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+
+    if batch:
+        flush(batch)
+
+    log_activity(
+        action_type='applications_imported',
+        description=f'Imported {result.imported} applications ({result.rejected} rejected)',
+        user_id=user_id,
+        metadata={'imported': result.imported, 'rejected': result.rejected, 'format': fmt}
+    )
+    db.session.commit()
+
+    return result
+
+
+def import_uploaded_file(file_storage, user_id=None):
+    """Import an uploaded werkzeug FileStorage, detecting the format from its name"""
+    fmt = detect_format(file_storage.filename)
+    stream = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+    return import_applications(stream, fmt, user_id=user_id)
@@ -0,0 +1,134 @@
+"""
+Bulk application review
+
+Approves or rejects a batch of applications in one transaction: statuses are
+claimed with one UPDATE, customer accounts for approved applications are
+inserted in bulk and the activity logs are written with one insert.
+"""
+import secrets
+import string
+from datetime import datetime
+from werkzeug.security import generate_password_hash
+from sqlalchemy import or_
+from app import db
+from app.models import Application, Customer, ActivityLog
+from app.balances import BalanceConflict
+from app.customer_summary import mark_stale
+
+PASSWORD_ALPHABET = string.ascii_letters + string.digits
+
+
+def generate_customer_password(length=12):
+    return ''.join(secrets.choice(PASSWORD_ALPHABET) for _ in range(length))
+
+
+def review_applications(ids, approve, reviewer):
+    """
+    Approve or reject many applications (doesn't commit)
+
+    Approving creates a customer account with a generated password, unless
+    the application already has one or a customer with the owner email
+    exists (or is created earlier in the same batch). Approved
+    applications are skipped either way; rejected ones can still be approved.
+
+    Raises:
+        BalanceConflict: another reviewer changed one of the applications meanwhile (roll back)
+
+    Returns:
+        List of per-application result dicts ('id', 'label', 'amount', 'outcome', 'message',
+        plus 'email' and 'password' for new accounts)
+    """
+    applications = Application.query.filter(
+        Application.id.in_(ids)
+    ).order_by(Application.id).with_for_update().all()
+
+    customers_by_email = {}
+    customers_by_application = {}
+    if approve:
+        emails = {application.owner_email for application in applications}
+        application_ids = [application.id for application in applications]
+        for customer_id, email, application_id in db.session.query(
+            Customer.id, Customer.email, Customer.application_id
+        ).filter(or_(Customer.email.in_(emails), Customer.application_id.in_(application_ids))):
+            customers_by_email[email] = customer_id
+            if application_id:
+                customers_by_application[application_id] = customer_id
+
+    results = []
+    accepted = []
+    new_accounts = []
+    for application in applications:
+        row = {'id': application.id, 'label': application.business_name, 'amount': application.requested_amount}
+        if application.status == 'approved' or (not approve and application.status == 'rejected'):
+            row.update(outcome='skipped', message=f'Already {application.status}')
+        elif not approve:
+            row.update(outcome='rejected', message='')
+            accepted.append(application)
+        elif application.id in customers_by_application:
+            row.update(outcome='approved', message='Customer account already exists for this application')
+            accepted.append(application)
+        elif application.owner_email in customers_by_email:
+            row.update(outcome='approved', message=f'Customer account already exists for {application.owner_email}')
+            accepted.append(application)
+        else:
+            password = generate_customer_password()
+            row.update(outcome='approved', message='Customer account created',
+                       email=application.owner_email, password=password)
+            customers_by_email[application.owner_email] = None
+            accepted.append(application)
+            new_accounts.append((application, password))
+        results.append(row)
+
+    found = {application.id for application in applications}
+    results.extend({'id': missing, 'label': '', 'amount': None, 'outcome': 'skipped', 'message': 'Not found'}
+                   for missing in sorted(set(ids) - found))
+
+    if not accepted:
+        return results
+
+    now = datetime.utcnow()
+    status = 'approved' if approve else 'rejected'
+    claimed = db.session.execute(
+        db.update(Application).where(
+            Application.id.in_([application.id for application in accepted]),
+            Application.status.in_({application.status for application in accepted})
+        ).values(status=status, reviewed_at=now).execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != len(accepted):
+        raise BalanceConflict('Some of these applications were reviewed by someone else meanwhile. Nothing was changed.')
+
+    if new_accounts:
+        customer_ids = db.session.scalars(
+            db.insert(Customer).returning(Customer.id, sort_by_parameter_order=True),
+            [
+                {
+                    'application_id': application.id,
+                    'email': application.owner_email,
+                    'business_name': application.business_name,
+                    'owner_name': f'{application.owner_first_name} {application.owner_last_name}',
+                    'phone': application.business_phone,
+                    'password_hash': generate_password_hash(password),
+                }
+                for application, password in new_accounts
+            ]
+        ).all()
+        customers_by_email.update(
+            (application.owner_email, customer_id)
+            for (application, _), customer_id in zip(new_accounts, customer_ids)
+        )
+        mark_stale(customer_ids=customer_ids)
+
+    db.session.execute(db.insert(ActivityLog), [
+        {
+            'action_type': f'application_{status}',
+            'description': f'Application #{application.id} for {application.business_name} {status} by {reviewer.username}',
+            'user_id': reviewer.id,
+            'customer_id': customers_by_application.get(application.id, customers_by_email.get(application.owner_email))
+                           if approve else None,
+            'application_id': application.id,
+            'created_at': now,
+        }
+        for application in accepted
+    ])
+
+    return results
@@ -0,0 +1,123 @@
+"""
+Fingerprinted static assets
+
+At startup every file under app/static is hashed, and url_for('static', ...)
+adds the hash as a ?v= parameter. Requests carrying the current hash are
+served with a one-year immutable Cache-Control, so browsers and CDNs never
+revalidate them; a changed file gets a new URL. Precompressed .br / .gz
+siblings and resized WebP variants written by build_assets.py are
+picked up automatically: the static view serves the compressed sibling the
+client accepts, and image_sources() builds <picture> srcsets from the
+variants.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from flask import current_app, request, send_from_directory, url_for
+
+# Seconds browsers may cache a fingerprinted asset (one year) and an unversioned one
+VERSIONED_MAX_AGE = 31536000
+UNVERSIONED_MAX_AGE = 3600
+
+HASH_LENGTH = 12
+
+# Precompressed siblings, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Variant files written by build_assets.py: <stem>-<width>w.webp
+_VARIANT_PATTERN = re.compile(r'^(?P<stem>.+)-(?P<width>\d+)w\.webp$')
+
+
+def file_hash(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def build_manifest(static_folder):
+    """
+    Hash every static file and index the image variants
+
+    Returns:
+        Tuple of ({filename: hash}, {original filename: [(width, variant filename)]})
+    """
+    hashes = {}
+    variants = {}
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            hashes[filename] = file_hash(path)
+
+            match = _VARIANT_PATTERN.match(filename)
+            if match:
+                variants.setdefault(match.group('stem'), []).append((int(match.group('width')), filename))
+
+    by_original = {}
+    for filename in hashes:
+        stem, ext = os.path.splitext(filename)
+        if stem in variants and ext.lower() in ('.png', '.jpg', '.jpeg'):
+            by_original[filename] = sorted(variants[stem])
+    return hashes, by_original
+
+
+def init_assets(app):
+    """Hash the static folder, version static URLs and install the static view"""
+    hashes, variants = build_manifest(app.static_folder)
+    app.extensions['asset_hashes'] = hashes
+    app.extensions['asset_variants'] = variants
+
+    @app.url_defaults
+    def add_asset_version(endpoint, values):
+        if endpoint == 'static' and 'v' not in values:
+            version = hashes.get(values.get('filename'))
+            if version:
+                values['v'] = version
+
+    app.view_functions['static'] = send_static_asset
+    app.jinja_env.globals['image_sources'] = image_sources
+
+
+def send_static_asset(filename):
+    """Static view: precompressed variants, and long-lived caching for fingerprinted URLs"""
+    hashes = current_app.extensions['asset_hashes']
+    versioned = filename in hashes and request.args.get('v') == hashes[filename]
+
+    served = filename
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if filename + suffix in hashes and name in request.accept_encodings:
+            served, encoding = filename + suffix, name
+            break
+
+    response = send_from_directory(
+        current_app.static_folder, served,
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=VERSIONED_MAX_AGE if versioned else UNVERSIONED_MAX_AGE
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if any(filename + suffix in hashes for _, suffix in ENCODINGS):
+        response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    if versioned:
+        response.cache_control.immutable = True
+    return response
+
+
+def image_sources(filename):
+    """
+    URLs for a responsive <picture> of a static image
+
+    Returns:
+        Dict with 'src' (the original, the <img> fallback) and 'webp' (a WebP srcset,
+        empty when build_assets.py has not produced variants)
+    """
+    variants = current_app.extensions.get('asset_variants', {}).get(filename, [])
+    return {
+        'src': url_for('static', filename=filename),
+        'webp': ', '.join(f"{url_for('static', filename=variant)} {width}w" for width, variant in variants),
+    }
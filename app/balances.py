@@ -0,0 +1,273 @@
+"""
+Concurrency-safe balance changes for lines of credit
+
+Balances are never read into Python, changed and written back. Each change
+is one conditional UPDATE that does the arithmetic in SQL and enforces the
+limit in its WHERE clause, so two workers approving draws on the same line
+at the same time cannot lose an update or overdraw approved_amount: the
+database serializes the two UPDATEs and the second one sees the first one's
+result. Request status changes are claimed the same way (UPDATE ... WHERE
+status = 'pending'), so one request cannot be approved twice.
+
+None of these functions commit; the caller commits once the whole change
+(ledger rows, logs) is in the session.
+"""
+from datetime import datetime
+from sqlalchemy import bindparam, func, or_
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models import LineOfCredit, WithdrawalRequest, ActivityLog
+from app.portfolio import portfolio_snapshot, update_portfolio_rollup, update_portfolio_rollup_many
+from app.schedule import regenerate_schedule, regenerate_schedules
+from app.customer_summary import mark_stale
+from app.utils import log_activity
+
+
+class BalanceConflict(Exception):
+    """A balance or status change was refused because the row no longer allows it"""
+
+
+def _shifted(snapshot, deltas):
+    """Snapshot as it was before deltas were applied"""
+    amounts = dict(snapshot[1])
+    for field, delta in deltas.items():
+        amounts[field] -= delta
+    return snapshot[0], amounts
+
+
+def draw_credit(loc, amount):
+    """
+    Add a draw to a line of credit's used amount if it fits within the approved amount
+
+    Raises:
+        BalanceConflict: the draw would exceed the available credit
+    """
+    used = func.coalesce(LineOfCredit.used_amount, 0)
+    result = db.session.execute(
+        db.update(LineOfCredit).where(
+            LineOfCredit.id == loc.id,
+            used + amount <= LineOfCredit.approved_amount
+        ).values(
+            used_amount=used + amount,
+            available_amount=LineOfCredit.approved_amount - (used + amount),
+            updated_at=datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.session.refresh(loc)
+        raise BalanceConflict(
+            f'${amount:,.2f} exceeds available credit ${(loc.approved_amount or 0) - (loc.used_amount or 0):,.2f}'
+        )
+
+    # The row is write-locked by the UPDATE until commit, so this read is current
+    db.session.refresh(loc)
+    after = portfolio_snapshot(loc)
+    update_portfolio_rollup(_shifted(after, {'used_amount': amount}), after)
+    mark_stale(customer_ids=[loc.customer_id])
+
+
+def apply_payment(loc, amount, payment_date):
+    """
+    Apply a payment to a line of credit, marking it paid off when the balance reaches zero
+
+    Returns:
+        True if the payment paid the line off
+
+    Raises:
+        BalanceConflict: the payment exceeds the outstanding balance
+    """
+    outstanding = func.coalesce(LineOfCredit.outstanding_balance, 0)
+    result = db.session.execute(
+        db.update(LineOfCredit).where(
+            LineOfCredit.id == loc.id,
+            or_(outstanding <= 0, outstanding >= amount)
+        ).values(
+            total_paid=func.coalesce(LineOfCredit.total_paid, 0) + amount,
+            outstanding_balance=outstanding - amount,
+            number_of_payments_made=func.coalesce(LineOfCredit.number_of_payments_made, 0) + 1,
+            last_payment_date=payment_date,
+            updated_at=datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.session.refresh(loc)
+        raise BalanceConflict(
+            f'Payment amount ${amount:,.2f} exceeds outstanding balance ${loc.outstanding_balance or 0:,.2f}'
+        )
+
+    db.session.refresh(loc)
+    before = _shifted(portfolio_snapshot(loc), {'total_paid': amount, 'outstanding_balance': -amount})
+    paid_off = loc.outstanding_balance <= 0
+    if paid_off:
+        loc.outstanding_balance = 0
+        loc.status = 'paid_off'
+
+    update_portfolio_rollup(before, portfolio_snapshot(loc))
+    mark_stale(customer_ids=[loc.customer_id])
+    return paid_off
+
+
+def claim_withdrawal(withdrawal, status, reviewer_id, **values):
+    """
+    Move a pending withdrawal request to a new status
+
+    Raises:
+        BalanceConflict: the request was already processed (possibly by another worker)
+    """
+    result = db.session.execute(
+        db.update(WithdrawalRequest).where(
+            WithdrawalRequest.id == withdrawal.id,
+            WithdrawalRequest.status == 'pending'
+        ).values(
+            status=status, reviewed_by_id=reviewer_id, reviewed_at=datetime.utcnow(), **values
+        ).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise BalanceConflict('This withdrawal request has already been processed.')
+    db.session.refresh(withdrawal)
+
+
+def approve_withdrawal_request(withdrawal, reviewer):
+    """
+    Approve a pending withdrawal: claim it, draw the amount and regenerate the schedule
+
+    Roll the session back on BalanceConflict; the request may already be claimed.
+    """
+    claim_withdrawal(withdrawal, 'approved', reviewer.id)
+    loc = withdrawal.line_of_credit
+    draw_credit(loc, withdrawal.requested_amount)
+
+    # A larger draw means a larger repayment schedule
+    regenerate_schedule(loc)
+
+    log_activity(
+        action_type='withdrawal_approved',
+        description=f'Withdrawal request #{withdrawal.id} for ${withdrawal.requested_amount:,.2f} approved by {reviewer.username}',
+        user_id=reviewer.id,
+        customer_id=withdrawal.customer_id,
+        line_of_credit_id=withdrawal.line_of_credit_id
+    )
+
+
+def deny_withdrawal_request(withdrawal, reviewer, reason):
+    """Deny a pending withdrawal (raises BalanceConflict if it was already processed)"""
+    claim_withdrawal(withdrawal, 'denied', reviewer.id, denial_reason=reason)
+
+    log_activity(
+        action_type='withdrawal_denied',
+        description=f'Withdrawal request #{withdrawal.id} for ${withdrawal.requested_amount:,.2f} denied by {reviewer.username}. Reason: {reason}',
+        user_id=reviewer.id,
+        customer_id=withdrawal.customer_id,
+        line_of_credit_id=withdrawal.line_of_credit_id
+    )
+
+
+def review_withdrawals(ids, approve, reviewer, reason=None):
+    """
+    Approve or deny many withdrawal requests in one transaction (doesn't commit)
+
+    Each request is checked against the available credit left on its line
+    after the requests before it in the batch. Accepted requests are claimed
+    with one UPDATE, the draws are applied with one executemany UPDATE, the
+    schedules are regenerated together and the activity logs are inserted in
+    bulk. If another worker touched the same requests or lines meanwhile,
+    BalanceConflict is raised and the caller should roll back.
+
+    Args:
+        ids: Withdrawal request ids
+        approve: True to approve, False to deny
+        reviewer: User reviewing the requests
+        reason: Denial reason
+
+    Returns:
+        List of per-request result dicts ('id', 'label', 'amount', 'outcome', 'message')
+    """
+    withdrawals = WithdrawalRequest.query.options(
+        selectinload(WithdrawalRequest.customer)
+    ).filter(
+        WithdrawalRequest.id.in_(ids)
+    ).order_by(WithdrawalRequest.id).with_for_update().all()
+
+    locs = {}
+    if approve:
+        loc_ids = {withdrawal.line_of_credit_id for withdrawal in withdrawals}
+        locs = {loc.id: loc for loc in LineOfCredit.query.filter(LineOfCredit.id.in_(loc_ids)).with_for_update()}
+    available = {loc_id: (loc.approved_amount or 0) - (loc.used_amount or 0) for loc_id, loc in locs.items()}
+
+    results = []
+    accepted = []
+    for withdrawal in withdrawals:
+        row = {'id': withdrawal.id, 'label': withdrawal.customer.business_name, 'amount': withdrawal.requested_amount}
+        if withdrawal.status != 'pending':
+            row.update(outcome='skipped', message=f'Already {withdrawal.status}')
+        elif approve and withdrawal.requested_amount > available[withdrawal.line_of_credit_id]:
+            row.update(outcome='refused',
+                       message=f'Exceeds available credit ${available[withdrawal.line_of_credit_id]:,.2f}')
+        else:
+            if approve:
+                available[withdrawal.line_of_credit_id] -= withdrawal.requested_amount
+            row.update(outcome='approved' if approve else 'denied', message='')
+            accepted.append(withdrawal)
+        results.append(row)
+
+    found = {withdrawal.id for withdrawal in withdrawals}
+    results.extend({'id': missing, 'label': '', 'amount': None, 'outcome': 'skipped', 'message': 'Not found'}
+                   for missing in sorted(set(ids) - found))
+
+    if not accepted:
+        return results
+
+    now = datetime.utcnow()
+    values = {'status': 'approved' if approve else 'denied', 'reviewed_by_id': reviewer.id, 'reviewed_at': now}
+    if not approve:
+        values['denial_reason'] = reason
+    claimed = db.session.execute(
+        db.update(WithdrawalRequest).where(
+            WithdrawalRequest.id.in_([withdrawal.id for withdrawal in accepted]),
+            WithdrawalRequest.status == 'pending'
+        ).values(**values).execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != len(accepted):
+        raise BalanceConflict('Some of these requests were processed by someone else meanwhile. Nothing was changed.')
+
+    if approve:
+        draws = {}
+        for withdrawal in accepted:
+            draws[withdrawal.line_of_credit_id] = draws.get(withdrawal.line_of_credit_id, 0.0) + withdrawal.requested_amount
+
+        table = LineOfCredit.__table__
+        used = func.coalesce(table.c.used_amount, 0) + bindparam('amount')
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('loc_id')).values(
+                used_amount=used, available_amount=table.c.approved_amount - used, updated_at=now
+            ),
+            [{'loc_id': loc_id, 'amount': amount} for loc_id, amount in draws.items()]
+        )
+
+        # The lines are write-locked now, so this read is current
+        updated = LineOfCredit.query.filter(LineOfCredit.id.in_(draws)).populate_existing().all()
+        for loc in updated:
+            if (loc.used_amount or 0) > loc.approved_amount:
+                raise BalanceConflict(f'Line of credit #{loc.id} changed meanwhile and these draws would exceed it. Nothing was changed.')
+
+        update_portfolio_rollup_many(
+            (_shifted(portfolio_snapshot(loc), {'used_amount': draws[loc.id]}), portfolio_snapshot(loc))
+            for loc in updated
+        )
+        regenerate_schedules(updated)
+
+    verb = 'approved' if approve else 'denied'
+    db.session.execute(db.insert(ActivityLog), [
+        {
+            'action_type': f'withdrawal_{verb}',
+            'description': f'Withdrawal request #{withdrawal.id} for ${withdrawal.requested_amount:,.2f} {verb} by {reviewer.username}'
+                           + (f'. Reason: {reason}' if not approve else ''),
+            'user_id': reviewer.id,
+            'customer_id': withdrawal.customer_id,
+            'line_of_credit_id': withdrawal.line_of_credit_id,
+            'created_at': now,
+        }
+        for withdrawal in accepted
+    ])
+
+    return results
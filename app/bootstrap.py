@@ -0,0 +1,209 @@
+"""
+Idempotent database bootstrap run before every start (bootstrap.py)
+
+The tables, columns and indexes declared in app/models.py are fingerprinted
+and compared with the latest version recorded in schema_version. When they
+match (every restart and scale-out after the first start of a release),
+startup costs that one query. Otherwise the schema is upgraded the way
+update_database.py always did it: create_all for new tables,
+add_missing_columns for new columns, add_missing_indexes for indexes
+declared on existing tables, then the catch-up backfills. The
+admin user is created if missing and the new fingerprint is recorded.
+
+On PostgreSQL the upgrade holds an advisory lock, so replicas that start
+together upgrade once; the others wait and then find the new version.
+"""
+import hashlib
+import os
+from contextlib import contextmanager
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from app import db
+from app.models import User, Application, ApplicationMatchKey, Customer, CustomerSummary, LineOfCredit, PaymentScheduleEntry, SchemaVersion
+from app.portfolio import rebuild_portfolio_rollup
+from app.duplicates import rebuild_duplicate_index
+from app.underwriting import rescore_applications
+from app.schedule import rebuild_payment_schedules
+from app.search import SOURCES as SEARCH_SOURCES, search_ddl, ensure_search_indexes
+from app.customer_summary import rebuild_customer_summaries
+
+# pg_advisory_lock key serializing schema upgrades across replicas
+UPGRADE_LOCK_KEY = 4210021
+
+ADMIN_EMAIL = 'info@quicklinellc.com'
+
+
+def schema_fingerprint():
+    """Hash of every table, column and index the models declare, plus the search indexes"""
+    parts = []
+    for table in sorted(db.metadata.tables.values(), key=lambda table: table.name):
+        parts.append(table.name)
+        parts.extend(f'{column.name}:{column.type}:{column.nullable}' for column in table.columns)
+        parts.extend(
+            f"index:{index.name}:{','.join(column.name for column in index.columns)}:{index.unique}"
+            for index in sorted(table.indexes, key=lambda index: index.name or '')
+        )
+    for kind in SEARCH_SOURCES:
+        parts.extend(search_ddl('postgresql', kind) + search_ddl('sqlite', kind))
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+
+def stored_schema_version():
+    """The fingerprint the database was last upgraded to (None before the first bootstrap)"""
+    try:
+        return db.session.execute(
+            db.select(SchemaVersion.version).order_by(SchemaVersion.id.desc()).limit(1)
+        ).scalar()
+    except (OperationalError, ProgrammingError):
+        db.session.rollback()
+        return None
+
+
+def add_missing_columns(model):
+    """
+    Add columns defined on a model but missing from its existing table (create_all only creates new tables)
+
+    Returns:
+        Names of the columns added
+    """
+    table = model.__table__
+    inspector = db.inspect(db.engine)
+    if table.name not in inspector.get_table_names():
+        return []
+
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    added = []
+    with db.engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            conn.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            added.append(column.name)
+
+        for index in table.indexes:
+            if any(column.name in added for column in index.columns):
+                index.create(conn, checkfirst=True)
+
+    return added
+
+
+def add_missing_indexes():
+    """
+    Create indexes declared on the models but missing from existing tables
+
+    Returns:
+        Names of the indexes created
+    """
+    inspector = db.inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    created = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+    return created
+
+
+def ensure_admin_user(log=print):
+    """Create the initial admin (password from ADMIN_PASSWORD) unless it exists"""
+    admin = User.query.filter_by(email=ADMIN_EMAIL).first()
+    if admin:
+        log(f"ℹ️  Admin user already exists: {admin.email}")
+        return
+
+    admin = User(username='admin', email=ADMIN_EMAIL, role='admin', first_name='Admin', last_name='User')
+    admin.set_password(os.environ.get('ADMIN_PASSWORD', 'ChangeMe123!'))
+    db.session.add(admin)
+    db.session.commit()
+    log(f"✅ Admin user created: {admin.email}")
+    log("⚠️  Please change the password immediately after first login!")
+
+
+def upgrade_schema(log=print):
+    """Create new tables and columns, then run the catch-up backfills"""
+    db.create_all()
+    log("✅ Tables created")
+
+    for mapper in sorted(db.Model.registry.mappers, key=lambda mapper: mapper.class_.__tablename__):
+        added = add_missing_columns(mapper.class_)
+        if added:
+            log(f"   - {mapper.class_.__tablename__} columns added: {', '.join(added)}")
+
+    for name in add_missing_indexes():
+        log(f"   - index created: {name}")
+
+    ensure_search_indexes()
+    log("   - search indexes checked")
+
+    # Reconcile the portfolio rollup with lines of credit
+    rows = rebuild_portfolio_rollup()
+    log(f"   - portfolio_rollup rebuilt ({rows} rows)")
+
+    # Score applications that predate the underwriting engine
+    scored = rescore_applications(statuses=None, only_unscored=True)
+    if scored:
+        log(f"   - {scored} unscored applications scored")
+
+    # Backfill duplicate-detection keys the first time the table is deployed
+    if ApplicationMatchKey.query.first() is None and Application.query.first() is not None:
+        keys = rebuild_duplicate_index()
+        log(f"   - application_match_keys backfilled ({keys} keys)")
+
+    # Generate payment schedules the first time the table is deployed
+    if PaymentScheduleEntry.query.first() is None and LineOfCredit.query.first() is not None:
+        installments = rebuild_payment_schedules()
+        log(f"   - payment_schedule generated ({installments} installments)")
+
+    # Build the customer portal read model the first time the table is deployed
+    if CustomerSummary.query.first() is None and Customer.query.first() is not None:
+        summaries = rebuild_customer_summaries()
+        log(f"   - customer_summaries built ({summaries} customers)")
+
+
+@contextmanager
+def _upgrade_lock():
+    if db.engine.dialect.name != 'postgresql':
+        yield
+        return
+
+    with db.engine.connect() as conn:
+        conn.execute(db.text('SELECT pg_advisory_lock(:key)'), {'key': UPGRADE_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(db.text('SELECT pg_advisory_unlock(:key)'), {'key': UPGRADE_LOCK_KEY})
+            conn.commit()
+
+
+def bootstrap(force=False, log=print):
+    """
+    Upgrade the database if the models changed since the last bootstrap
+
+    Args:
+        force: Upgrade even when the stored version matches
+        log: Progress output
+
+    Returns:
+        True if the schema was upgraded, False if it was already current
+    """
+    version = schema_fingerprint()
+    if not force and stored_schema_version() == version:
+        return False
+
+    with _upgrade_lock():
+        # Another replica may have finished the upgrade while we waited for the lock
+        if not force and stored_schema_version() == version:
+            return False
+
+        upgrade_schema(log)
+        ensure_admin_user(log)
+        db.session.add(SchemaVersion(version=version))
+        db.session.commit()
+
+    log(f"✅ Schema version {version[:12]} recorded")
+    return True
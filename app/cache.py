@@ -0,0 +1,251 @@
+"""
+Pluggable cache for computed dashboard and report data
+
+@memoize caches the return value of an aggregate function (dashboard stats,
+report summary, portfolio totals) in the configured backend:
+
+    memory  In-process LRU with per-entry TTL (default). Each worker has its
+            own copy, so another worker's writes show up after at most
+            CACHE_DEFAULT_TIMEOUT seconds.
+    redis   Shared Redis (or any Redis-compatible server) at CACHE_REDIS_URL;
+            invalidations reach every worker at once. Needs the redis package.
+    null    No caching.
+
+Every memoized function names the tables it reads. Session events record
+which tables a transaction wrote to (ORM flushes and bulk insert / update /
+delete statements alike), and after the commit each of those tables gets a
+new version number. Cache keys include the versions of their tables, so a
+commit that touches lines_of_credit makes every entry built from it
+unreachable without having to find and delete them.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from app import db
+
+
+class MemoryCache:
+    """Thread-safe in-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries=1024, default_timeout=60):
+        self.max_entries = max_entries
+        self.default_timeout = default_timeout
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            data = entry[1]
+        return pickle.loads(data)
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        expires_at = time.time() + timeout if timeout else None
+        # Stored pickled so callers can't mutate a shared cached object
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries[key] = (expires_at, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self, tables):
+        # Kept outside the LRU: an evicted version would bring stale entries back
+        with self._lock:
+            return [self._versions.get(table, 0) for table in tables]
+
+    def bump(self, table):
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """Cache shared by every worker, stored in Redis"""
+
+    def __init__(self, url, default_timeout=60, prefix='quickline:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.default_timeout = default_timeout
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        self.client.set(self.prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=timeout or None)
+
+    def versions(self, tables):
+        return [int(version or 0) for version in self.client.mget([f'{self.prefix}version:{table}' for table in tables])]
+
+    def bump(self, table):
+        self.client.incr(f'{self.prefix}version:{table}')
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class NullCache:
+    """Backend that never stores anything"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def versions(self, tables):
+        return [0] * len(tables)
+
+    def bump(self, table):
+        pass
+
+    def clear(self):
+        pass
+
+
+class CacheStats:
+    """Hit / miss / invalidation counters per memoized name (this worker process)"""
+
+    def __init__(self):
+        self._counts = {}
+        self._invalidations = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, hit):
+        with self._lock:
+            counts = self._counts.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def record_invalidation(self, table):
+        with self._lock:
+            self._invalidations[table] = self._invalidations.get(table, 0) + 1
+
+    def summary(self):
+        with self._lock:
+            names = [
+                {'name': name, 'hits': hits, 'misses': misses,
+                 'hit_rate': hits / (hits + misses) * 100 if hits + misses else 0}
+                for name, (hits, misses) in sorted(self._counts.items())
+            ]
+            return {'names': names, 'invalidations': dict(sorted(self._invalidations.items()))}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._invalidations.clear()
+
+
+cache_stats = CacheStats()
+
+
+def get_cache():
+    if not has_app_context():
+        return NullCache()
+    return current_app.extensions.get('cache') or NullCache()
+
+
+def invalidate_tables(tables):
+    """Give each table a new version, orphaning every cached entry built from it"""
+    cache = get_cache()
+    for table in tables:
+        cache.bump(table)
+        cache_stats.record_invalidation(table)
+
+
+def memoize(name, tables, timeout=None):
+    """
+    Cache a function's return value until one of its tables changes (or the timeout passes)
+
+    Args:
+        name: Cache key prefix (also the name shown in the metrics)
+        tables: Names of the tables the function reads
+        timeout: Seconds to keep a value (default CACHE_DEFAULT_TIMEOUT)
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if isinstance(cache, NullCache):
+                return f(*args, **kwargs)
+
+            versions = cache.versions(tables)
+            key = f"{name}:{args!r}:{sorted(kwargs.items())!r}:{','.join(map(str, versions))}"
+
+            value = cache.get(key)
+            cache_stats.record(name, hit=value is not None)
+            if value is None:
+                value = f(*args, **kwargs)
+                cache.set(key, value, timeout)
+            return value
+        wrapper.uncached = f
+        return wrapper
+    return decorator
+
+
+def _written_tables(session):
+    return session.info.setdefault('cache_written_tables', set())
+
+
+def _record_flush(session, flush_context, instances):
+    tables = _written_tables(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            tables.add(table)
+
+
+def _record_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and getattr(table, 'name', None):
+            _written_tables(orm_execute_state.session).add(table.name)
+
+
+def _invalidate_after_commit(session):
+    tables = session.info.pop('cache_written_tables', None)
+    if tables:
+        invalidate_tables(tables)
+
+
+def _discard_after_rollback(session):
+    session.info.pop('cache_written_tables', None)
+
+
+def init_cache(app):
+    """Create the configured backend and hook commit-time invalidation"""
+    backend = app.config['CACHE_BACKEND']
+    timeout = app.config['CACHE_DEFAULT_TIMEOUT']
+
+    if backend == 'redis':
+        cache = RedisCache(app.config['CACHE_REDIS_URL'], default_timeout=timeout)
+    elif backend == 'memory':
+        cache = MemoryCache(max_entries=app.config['CACHE_MAX_ENTRIES'], default_timeout=timeout)
+    else:
+        cache = NullCache()
+    app.extensions['cache'] = cache
+
+    if not event.contains(db.session, 'before_flush', _record_flush):
+        event.listen(db.session, 'before_flush', _record_flush)
+        event.listen(db.session, 'do_orm_execute', _record_statement)
+        event.listen(db.session, 'after_commit', _invalidate_after_commit)
+        event.listen(db.session, 'after_rollback', _discard_after_rollback)
@@ -0,0 +1,273 @@
+"""
+Customer portal read model (customer_summaries)
+
+The customer dashboard reads one CustomerSummary row by primary key instead
+of loading the customer, their line of credit, rep and payment history on
+every view. Rows are recomputed from the source tables inside the
+transaction that changes them:
+
+    - before every flush, ORM changes to customers, lines of credit,
+      payments, schedule entries and reps mark the affected customers stale
+    - bulk UPDATE / INSERT paths (app/balances.py, app/payment_posting.py,
+      app/schedule.py) call mark_stale() with the customers they touched
+    - just before the commit, stale customers' rows are rebuilt with a
+      handful of set-based queries, so the summary commits (or rolls back)
+      together with the change
+
+rebuild_customer_summaries() recomputes every row (bootstrap.py backfills
+the table with it the first time it is deployed).
+"""
+import json
+from datetime import datetime
+from sqlalchemy import event, func
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import Customer, LineOfCredit, Payment, PaymentScheduleEntry, User, CustomerSummary
+
+RECENT_PAYMENTS = 10
+
+# Customers per set of queries when rebuilding
+BATCH_SIZE = 1000
+
+# Dialects whose INSERT ... ON CONFLICT DO UPDATE refresh_customer_summaries uses
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+# Cents below which an installment counts as paid (float amounts)
+_PAID_TOLERANCE = 0.005
+
+
+def _stale(session):
+    return session.info.setdefault('stale_customer_summaries', {'customers': set(), 'locs': set(), 'reps': set()})
+
+
+def mark_stale(customer_ids=(), loc_ids=(), rep_ids=()):
+    """Refresh the summaries of these customers (deals' customers, reps' customers) before the next commit"""
+    stale = _stale(db.session())
+    for kind, ids in (('customers', customer_ids), ('locs', loc_ids), ('reps', rep_ids)):
+        stale[kind].update(id for id in ids if id is not None)
+
+
+def _loc_customer_ids(loc_ids):
+    if not loc_ids:
+        return set()
+    return set(db.session.scalars(
+        db.select(LineOfCredit.customer_id).where(LineOfCredit.id.in_(loc_ids))
+    ))
+
+
+def build_summaries(customer_ids):
+    """
+    Compute summary rows without writing them
+
+    Returns:
+        Dict of customer_id -> CustomerSummary column values (only customers that exist)
+    """
+    customer_ids = list(customer_ids)
+    if not customer_ids:
+        return {}
+
+    rows = db.session.execute(
+        db.select(Customer, LineOfCredit, User)
+        .outerjoin(LineOfCredit, LineOfCredit.customer_id == Customer.id)
+        .outerjoin(User, User.id == LineOfCredit.rep_id)
+        .where(Customer.id.in_(customer_ids))
+        # Bulk UPDATEs leave loaded objects stale; read the current rows
+        .execution_options(populate_existing=True)
+    ).all()
+    locs = {loc.id: loc for _, loc, _ in rows if loc is not None}
+
+    next_due = {}
+    recent = {loc_id: [] for loc_id in locs}
+    if locs:
+        # First installment whose running total exceeds what has been paid
+        paid = func.coalesce(LineOfCredit.total_paid, 0)
+        next_due = {
+            loc_id: (due_date, cumulative)
+            for loc_id, due_date, cumulative in db.session.execute(
+                db.select(
+                    PaymentScheduleEntry.line_of_credit_id,
+                    func.min(PaymentScheduleEntry.due_date),
+                    func.min(PaymentScheduleEntry.cumulative_amount),
+                )
+                .join(LineOfCredit, LineOfCredit.id == PaymentScheduleEntry.line_of_credit_id)
+                .where(
+                    PaymentScheduleEntry.line_of_credit_id.in_(list(locs)),
+                    PaymentScheduleEntry.cumulative_amount > paid + _PAID_TOLERANCE,
+                )
+                .group_by(PaymentScheduleEntry.line_of_credit_id)
+            )
+        }
+
+        newest_first = func.row_number().over(
+            partition_by=Payment.line_of_credit_id,
+            order_by=(Payment.payment_date.desc(), Payment.id.desc())
+        ).label('position')
+        ranked = db.select(
+            Payment.line_of_credit_id, Payment.payment_date, Payment.amount, Payment.method, newest_first
+        ).where(Payment.line_of_credit_id.in_(list(locs))).subquery()
+        for loc_id, payment_date, amount, method, _ in db.session.execute(
+            db.select(ranked).where(ranked.c.position <= RECENT_PAYMENTS)
+            .order_by(ranked.c.line_of_credit_id, ranked.c.position)
+        ):
+            recent[loc_id].append({'date': payment_date.isoformat(), 'amount': amount, 'method': method})
+
+    now = datetime.utcnow()
+    # Every row carries every column so a customer without a deal (or rep) overwrites stale values
+    blank = dict.fromkeys(column.key for column in CustomerSummary.__table__.columns)
+    summaries = {}
+    for customer, loc, rep in rows:
+        summary = dict(blank)
+        summary.update({
+            'customer_id': customer.id,
+            'business_name': customer.business_name,
+            'customer_since': customer.created_at,
+            'last_login': customer.last_login,
+            'updated_at': now,
+        })
+        if loc is not None:
+            approved = loc.approved_amount or 0
+            used = loc.used_amount or 0
+            due_date, cumulative = next_due.get(loc.id, (None, None))
+            summary.update({
+                'line_of_credit_id': loc.id,
+                'status': loc.status,
+                'approved_amount': approved,
+                'used_amount': used,
+                'available_amount': approved - used,
+                'utilization_percentage': (used / approved * 100) if approved > 0 else 0,
+                'outstanding_balance': loc.outstanding_balance,
+                'total_paid': loc.total_paid,
+                'number_of_payments_made': loc.number_of_payments_made,
+                'number_of_payments_remaining': loc.number_of_payments_remaining,
+                'interest_rate': loc.interest_rate,
+                'payment_frequency': loc.payment_frequency,
+                'payment_amount': loc.payment_amount,
+                'term_months': loc.term_months,
+                'first_payment_date': loc.first_payment_date,
+                'maturity_date': loc.maturity_date,
+                'last_payment_date': loc.last_payment_date,
+                'next_payment_due_date': due_date if loc.status == 'active' else None,
+                'next_payment_due_amount': round(cumulative - (loc.total_paid or 0), 2)
+                                           if due_date and loc.status == 'active' else None,
+                'recent_payments': json.dumps(recent[loc.id]),
+            })
+            if rep is not None:
+                summary.update({
+                    'rep_name': ' '.join(filter(None, (rep.first_name, rep.last_name))) or rep.username,
+                    'rep_email': rep.email,
+                })
+        summaries[customer.id] = summary
+    return summaries
+
+
+def refresh_customer_summaries(customer_ids):
+    """
+    Rewrite the summary rows of these customers (and drop those of deleted customers)
+
+    Rows are upserted rather than deleted and re-inserted: two transactions
+    refreshing the same customer (a login and a payment, say) would otherwise
+    both miss the row and the second INSERT would fail on the primary key.
+
+    Does not commit. Returns the number of rows written.
+    """
+    customer_ids = list(customer_ids)
+    summaries = build_summaries(customer_ids)
+    gone = [customer_id for customer_id in customer_ids if customer_id not in summaries]
+    if gone:
+        db.session.execute(db.delete(CustomerSummary).where(CustomerSummary.customer_id.in_(gone)))
+    if not summaries:
+        return 0
+
+    make_insert = _UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if make_insert is None:
+        db.session.execute(db.delete(CustomerSummary).where(CustomerSummary.customer_id.in_(list(summaries))))
+        db.session.execute(db.insert(CustomerSummary), list(summaries.values()))
+        return len(summaries)
+
+    statement = make_insert(CustomerSummary)
+    statement = statement.on_conflict_do_update(
+        index_elements=[CustomerSummary.customer_id],
+        set_={
+            column.name: statement.excluded[column.name]
+            for column in CustomerSummary.__table__.columns if not column.primary_key
+        },
+    )
+    db.session.execute(statement, list(summaries.values()))
+    return len(summaries)
+
+
+def rebuild_customer_summaries(batch_size=BATCH_SIZE):
+    """
+    Recompute every customer's summary; commits
+
+    Returns:
+        Number of rows written
+    """
+    db.session.execute(db.delete(CustomerSummary))
+    written = 0
+    customer_ids = db.session.scalars(db.select(Customer.id).order_by(Customer.id)).all()
+    for start in range(0, len(customer_ids), batch_size):
+        written += refresh_customer_summaries(customer_ids[start:start + batch_size])
+    db.session.commit()
+    return written
+
+
+def get_customer_summary(customer_id):
+    """
+    The dashboard read model of one customer, or None if the customer doesn't exist
+
+    Falls back to computing the row in memory (never writing on a read) if it
+    hasn't been built yet.
+    """
+    summary = db.session.get(CustomerSummary, customer_id)
+    if summary is None:
+        row = build_summaries([customer_id]).get(customer_id)
+        summary = CustomerSummary(**row) if row else None
+    return summary
+
+
+_TRACKED = {
+    Customer: lambda obj: ('customers', obj.id),
+    LineOfCredit: lambda obj: ('customers', obj.customer_id),
+    Payment: lambda obj: ('customers', obj.customer_id) if obj.customer_id else ('locs', obj.line_of_credit_id),
+    PaymentScheduleEntry: lambda obj: ('locs', obj.line_of_credit_id),
+    User: lambda obj: ('reps', obj.id) if obj.role == 'rep' else (None, None),
+}
+
+
+def _record_flush(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        key = _TRACKED.get(type(obj))
+        if key is not None:
+            kind, value = key(obj)
+            if kind and value is not None:
+                _stale(session)[kind].add(value)
+
+
+def _refresh_before_commit(session):
+    # Commit flushes after this hook; flush first so pending changes are marked and visible
+    session.flush()
+    stale = session.info.pop('stale_customer_summaries', None)
+    if not stale or not any(stale.values()):
+        return
+
+    customer_ids = stale['customers'] | _loc_customer_ids(stale['locs'])
+    if stale['reps']:
+        customer_ids |= set(db.session.scalars(
+            db.select(LineOfCredit.customer_id).where(LineOfCredit.rep_id.in_(stale['reps']))
+        ))
+    customer_ids.discard(None)
+    if customer_ids:
+        refresh_customer_summaries(sorted(customer_ids))
+
+
+def _discard_after_rollback(session):
+    session.info.pop('stale_customer_summaries', None)
+
+
+def init_customer_summaries(app):
+    """Hook commit-time maintenance of customer_summaries"""
+    if not event.contains(db.session, 'before_flush', _record_flush):
+        event.listen(db.session, 'before_flush', _record_flush)
+        event.listen(db.session, 'before_commit', _refresh_before_commit)
+        event.listen(db.session, 'after_rollback', _discard_after_rollback)
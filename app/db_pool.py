@@ -0,0 +1,148 @@
+"""
+Database connection pool metrics
+
+Every gunicorn worker has its own SQLAlchemy pool (sized by the DB_POOL_*
+settings in config.py). MeteredQueuePool times how long each checkout waits
+for a free connection, and pool events count new connections, checkouts and
+connections replaced because pre-ping or the server found them dead. The
+admin perf page and /admin/perf/pool read pool_stats to check the pool size
+against the worker count and the server's connection limit.
+"""
+import threading
+import time
+from collections import deque
+from flask import current_app
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from app import db
+from app.instrumentation import percentile
+
+
+class PoolStats:
+    """Checkout waits and connection lifecycle counts for this worker's pool"""
+
+    def __init__(self, window_size=1000):
+        self._waits = deque(maxlen=window_size)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record_wait(self, wait_ms, timed_out=False):
+        with self._lock:
+            self._waits.append(wait_ms)
+            if timed_out:
+                self._counts['timeouts'] = self._counts.get('timeouts', 0) + 1
+
+    def increment(self, name):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._waits.clear()
+            self._counts.clear()
+
+    def summary(self, slow_ms=100):
+        with self._lock:
+            waits = sorted(self._waits)
+            counts = dict(self._counts)
+        return {
+            'connects': counts.get('connects', 0),
+            'checkouts': counts.get('checkouts', 0),
+            'invalidations': counts.get('invalidations', 0),
+            'timeouts': counts.get('timeouts', 0),
+            'wait_samples': len(waits),
+            'wait_avg_ms': sum(waits) / len(waits) if waits else 0,
+            'wait_p95_ms': percentile(waits, 0.95),
+            'wait_max_ms': waits[-1] if waits else 0,
+            'slow_waits': sum(1 for wait in waits if wait > slow_ms),
+        }
+
+
+pool_stats = PoolStats()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record_wait((time.perf_counter() - started) * 1000, timed_out=True)
+            raise
+        pool_stats.record_wait((time.perf_counter() - started) * 1000)
+        return connection
+
+
+def _on_connect(dbapi_connection, connection_record):
+    pool_stats.increment('connects')
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_stats.increment('checkouts')
+
+
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_stats.increment('invalidations')
+
+
+def configure_pool(app):
+    """Use the metered pool for server databases (call before db.init_app)"""
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.setdefault('poolclass', MeteredQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def init_pool_metrics(app):
+    """Count connects, checkouts and invalidations on the app's engine"""
+    with app.app_context():
+        pool = db.engine.pool
+        if not event.contains(pool, 'connect', _on_connect):
+            event.listen(pool, 'connect', _on_connect)
+            event.listen(pool, 'checkout', _on_checkout)
+            event.listen(pool, 'invalidate', _on_invalidate)
+
+
+def server_max_connections():
+    """The database server's connection limit, or None when it has none (SQLite)"""
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    return int(db.session.execute(text('SHOW max_connections')).scalar())
+
+
+def pool_status():
+    """
+    Pool configuration, current usage and metrics for this worker
+
+    Returns:
+        Dict of pool settings, live counts, pool_stats.summary() and the
+        connections all workers may open compared to the server limit
+    """
+    config = current_app.config
+    pool = db.engine.pool
+    options = config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    sized = isinstance(pool, QueuePool)
+
+    per_worker = pool.size() + options.get('max_overflow', 10) if sized else None
+    workers = config['WEB_CONCURRENCY']
+    max_connections = server_max_connections()
+    return {
+        'pool_class': type(pool).__name__,
+        'pool_size': pool.size() if sized else None,
+        'max_overflow': options.get('max_overflow') if sized else None,
+        'pool_timeout': options.get('pool_timeout'),
+        'pool_recycle': options.get('pool_recycle'),
+        'pool_pre_ping': options.get('pool_pre_ping', False),
+        'checked_out': pool.checkedout() if sized else None,
+        'idle': pool.checkedin() if sized else None,
+        'overflow': max(pool.overflow(), 0) if sized else None,
+        'workers': workers,
+        'connections_per_worker': per_worker,
+        'connections_all_workers': per_worker * workers if per_worker else None,
+        'server_max_connections': max_connections,
+        **pool_stats.summary(slow_ms=config['DB_SLOW_CHECKOUT_MS']),
+    }
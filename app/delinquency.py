@@ -0,0 +1,162 @@
+"""
+Portfolio-wide delinquency scan
+
+One aggregate query joins every active line of credit with its stored
+payment schedule (app/schedule.py) to get expected payments and the oldest
+installment not covered by what has been paid. The results are written to
+delinquency_status in bulk, and the admin and rep dashboards read their
+late deals lists from that table. Run scan_delinquency.py on a schedule.
+"""
+from datetime import date, datetime
+from app import db
+from app.models import LineOfCredit, PaymentScheduleEntry, DelinquencyStatus
+from app.cache import memoize
+from sqlalchemy import func, case, and_
+from sqlalchemy.orm import contains_eager
+
+# (bucket, minimum days past due), checked from most to least severe
+BUCKETS = (
+    ('30+', 31),
+    ('8-30', 8),
+    ('1-7', 1),
+)
+BUCKET_NAMES = [name for name, _ in reversed(BUCKETS)]
+
+INSERT_BATCH_SIZE = 5000
+
+
+def bucket_for(days_past_due):
+    for name, minimum in BUCKETS:
+        if days_past_due >= minimum:
+            return name
+    return 'current'
+
+
+def _scan_query(as_of):
+    """Expected vs. actual figures for every active line of credit, grouped in the database"""
+    paid = func.coalesce(LineOfCredit.total_paid, 0)
+    due = PaymentScheduleEntry.due_date <= as_of
+
+    return db.session.query(
+        LineOfCredit.id,
+        LineOfCredit.customer_id,
+        LineOfCredit.rep_id,
+        LineOfCredit.number_of_payments_made,
+        LineOfCredit.total_paid,
+        LineOfCredit.last_payment_date,
+        func.count(case((due, PaymentScheduleEntry.id))),
+        func.max(case((due, PaymentScheduleEntry.cumulative_amount))),
+        func.min(case((and_(due, PaymentScheduleEntry.cumulative_amount > paid), PaymentScheduleEntry.due_date))),
+    ).outerjoin(
+        PaymentScheduleEntry, PaymentScheduleEntry.line_of_credit_id == LineOfCredit.id
+    ).filter(
+        LineOfCredit.status == 'active'
+    ).group_by(
+        LineOfCredit.id,
+        LineOfCredit.customer_id,
+        LineOfCredit.rep_id,
+        LineOfCredit.number_of_payments_made,
+        LineOfCredit.total_paid,
+        LineOfCredit.last_payment_date,
+    )
+
+
+def scan_delinquency(as_of=None):
+    """
+    Recompute delinquency_status for every active line of credit; commits
+
+    Args:
+        as_of: Date to measure against (default today)
+
+    Returns:
+        Dict of bucket name -> number of deals, including 'current'
+    """
+    as_of = as_of or date.today()
+    scanned_at = datetime.utcnow()
+    counts = {name: 0 for name in ['current'] + BUCKET_NAMES}
+
+    rows = []
+    for (loc_id, customer_id, rep_id, payments_made, total_paid, last_payment_date,
+         expected_payments, expected_amount, oldest_unpaid) in _scan_query(as_of):
+        paid_amount = total_paid or 0
+        expected_amount = expected_amount or 0
+        days_past_due = (as_of - oldest_unpaid).days if oldest_unpaid else 0
+        bucket = bucket_for(days_past_due)
+        counts[bucket] += 1
+
+        rows.append({
+            'line_of_credit_id': loc_id,
+            'customer_id': customer_id,
+            'rep_id': rep_id,
+            'expected_payments': expected_payments or 0,
+            'payments_made': payments_made or 0,
+            'expected_amount': expected_amount,
+            'paid_amount': paid_amount,
+            'past_due_amount': round(max(expected_amount - paid_amount, 0), 2),
+            'oldest_unpaid_due_date': oldest_unpaid,
+            'days_past_due': days_past_due,
+            'days_since_last_payment': (as_of - last_payment_date).days if last_payment_date else None,
+            'bucket': bucket,
+            'scanned_at': scanned_at,
+        })
+
+    DelinquencyStatus.query.delete()
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.session.execute(db.insert(DelinquencyStatus), rows[start:start + INSERT_BATCH_SIZE])
+    db.session.commit()
+
+    return counts
+
+
+def get_late_deals(rep_id=None, limit=10):
+    """
+    Most overdue active deals from the last scan (one indexed query, customer eager-loaded)
+
+    Args:
+        rep_id: Only this rep's deals (None for all)
+        limit: Maximum number of deals
+    """
+    query = DelinquencyStatus.query.join(
+        DelinquencyStatus.line_of_credit
+    ).options(
+        contains_eager(DelinquencyStatus.line_of_credit).joinedload(LineOfCredit.customer)
+    ).filter(
+        DelinquencyStatus.days_past_due > 0,
+        LineOfCredit.status == 'active'
+    )
+    if rep_id is not None:
+        query = query.filter(DelinquencyStatus.rep_id == rep_id)
+
+    return query.order_by(DelinquencyStatus.days_past_due.desc(), DelinquencyStatus.id).limit(limit).all()
+
+
+@memoize('delinquency_summary', tables=('delinquency_status',))
+def get_delinquency_summary(rep_id=None):
+    """
+    Deal counts and past-due totals per bucket from the last scan
+
+    Returns:
+        Dict with 'buckets' (name -> {'count', 'past_due_amount'}), 'late_count' and 'scanned_at'
+    """
+    query = db.session.query(
+        DelinquencyStatus.bucket,
+        func.count(DelinquencyStatus.id),
+        func.sum(DelinquencyStatus.past_due_amount),
+        func.max(DelinquencyStatus.scanned_at),
+    )
+    if rep_id is not None:
+        query = query.filter(DelinquencyStatus.rep_id == rep_id)
+
+    buckets = {name: {'count': 0, 'past_due_amount': 0} for name in BUCKET_NAMES}
+    scanned_at = None
+    for bucket, count, past_due, last_scan in query.group_by(DelinquencyStatus.bucket):
+        if bucket in buckets:
+            buckets[bucket] = {'count': count, 'past_due_amount': past_due or 0}
+        if last_scan and (scanned_at is None or last_scan > scanned_at):
+            scanned_at = last_scan
+
+    return {
+        'buckets': buckets,
+        'late_count': sum(bucket['count'] for bucket in buckets.values()),
+        'scanned_at': scanned_at,
+    }
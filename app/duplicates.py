@@ -0,0 +1,229 @@
+"""
+Duplicate and stacked application detection
+
+Every application gets a set of normalized identity keys (email, EIN, phones,
+SSN last 4 + date of birth, business name tokens, street address) stored in
+application_match_keys. Keys are written when the application is submitted,
+imported or edited, so finding every application that shares any key with
+another is one indexed self-join instead of a scan per field.
+"""
+import re
+from app import db
+from app.models import Application, ApplicationMatchKey
+
+# How strongly a shared key suggests the same applicant (higher first when ranking matches)
+MATCH_WEIGHTS = {
+    'ein': 5,
+    'ssn_dob': 5,
+    'email': 3,
+    'phone': 3,
+    'address': 2,
+    'business_name': 2,
+}
+
+# Strongest matches shown on an application (a shared broker address can match thousands)
+MAX_DUPLICATES = 20
+
+MATCH_LABELS = {
+    'ein': 'EIN',
+    'ssn_dob': 'SSN + DOB',
+    'email': 'Email',
+    'phone': 'Phone',
+    'address': 'Address',
+    'business_name': 'Business Name',
+}
+
+# Words dropped from business names so "Joe's Pizza LLC" matches "Joes Pizza Inc."
+_NAME_STOPWORDS = {
+    'the', 'and', 'of', 'llc', 'inc', 'incorporated', 'corp', 'corporation', 'co', 'company',
+    'ltd', 'limited', 'lp', 'llp', 'pllc', 'pc', 'dba', 'group', 'enterprises', 'holdings',
+}
+
+_ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'boulevard': 'blvd', 'drive': 'dr',
+    'lane': 'ln', 'court': 'ct', 'place': 'pl', 'parkway': 'pkwy', 'highway': 'hwy',
+    'suite': 'ste', 'apartment': 'apt', 'unit': 'apt', '#': 'apt',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+}
+
+MATCH_FIELDS = (
+    'owner_email', 'ein', 'business_phone', 'owner_phone', 'owner_ssn_last_4', 'owner_date_of_birth',
+    'business_name', 'business_legal_name', 'business_address', 'business_zip', 'owner_address', 'owner_zip',
+)
+
+_WORD_RE = re.compile(r'[a-z0-9#]+')
+
+
+def _digits(value):
+    return re.sub(r'\D', '', value or '')
+
+
+def normalize_email(email):
+    email = (email or '').strip().lower()
+    return email or None
+
+
+def normalize_ein(ein):
+    digits = _digits(ein)
+    return digits if len(digits) == 9 else None
+
+
+def normalize_phone(phone):
+    """Last 10 digits, so +1 and formatting differences don't matter"""
+    digits = _digits(phone)[-10:]
+    return digits if len(digits) == 10 else None
+
+
+def normalize_ssn_dob(ssn_last_4, date_of_birth):
+    digits = _digits(ssn_last_4)
+    if len(digits) != 4 or not date_of_birth:
+        return None
+    return f'{digits}|{date_of_birth.isoformat()}'
+
+
+def normalize_business_name(name):
+    """Sorted distinct name tokens without punctuation or legal-entity suffixes"""
+    words = _WORD_RE.findall((name or '').lower().replace("'", '').replace('.', ''))
+    tokens = sorted({word for word in words if word not in _NAME_STOPWORDS})
+    return ' '.join(tokens) or None
+
+
+def normalize_address(address, zip_code):
+    """Street address with standard abbreviations plus the 5-digit ZIP"""
+    zip5 = _digits(zip_code)[:5]
+    words = _WORD_RE.findall((address or '').lower())
+    if not words or len(zip5) != 5:
+        return None
+    street = ' '.join(_ADDRESS_ABBREVIATIONS.get(word, word) for word in words)
+    return f'{street}|{zip5}'[:255]
+
+
+def match_keys(fields):
+    """
+    Compute the normalized match keys for one application
+
+    Args:
+        fields: Mapping with the MATCH_FIELDS values (form data or a row dict)
+
+    Returns:
+        Set of (kind, value) tuples
+    """
+    candidates = [
+        ('email', normalize_email(fields.get('owner_email'))),
+        ('ein', normalize_ein(fields.get('ein'))),
+        ('phone', normalize_phone(fields.get('business_phone'))),
+        ('phone', normalize_phone(fields.get('owner_phone'))),
+        ('ssn_dob', normalize_ssn_dob(fields.get('owner_ssn_last_4'), fields.get('owner_date_of_birth'))),
+        ('business_name', normalize_business_name(fields.get('business_name'))),
+        ('business_name', normalize_business_name(fields.get('business_legal_name'))),
+        ('address', normalize_address(fields.get('business_address'), fields.get('business_zip'))),
+        ('address', normalize_address(fields.get('owner_address'), fields.get('owner_zip'))),
+    ]
+    return {(kind, value[:255]) for kind, value in candidates if value}
+
+
+def application_fields(application):
+    """The MATCH_FIELDS of an Application as a dict"""
+    return {name: getattr(application, name) for name in MATCH_FIELDS}
+
+
+def index_application(application):
+    """
+    Replace an application's match keys (call after flush so it has an id; doesn't commit)
+    """
+    ApplicationMatchKey.query.filter_by(application_id=application.id).delete()
+    index_applications([(application.id, application_fields(application))])
+
+
+def index_applications(rows):
+    """
+    Insert match keys for new applications with one multi-row INSERT (doesn't commit)
+
+    Args:
+        rows: Iterable of (application_id, fields) pairs
+
+    Returns:
+        Number of keys inserted
+    """
+    keys = [
+        {'application_id': application_id, 'kind': kind, 'value': value}
+        for application_id, fields in rows
+        for kind, value in match_keys(fields)
+    ]
+    if keys:
+        db.session.execute(db.insert(ApplicationMatchKey), keys)
+    return len(keys)
+
+
+def find_duplicates(application_id, limit=MAX_DUPLICATES):
+    """
+    Other applications sharing at least one match key, strongest first
+
+    Matches are grouped and scored in SQL (one indexed self-join) and only
+    the top `limit` applications are loaded, however common a shared key is.
+
+    Returns:
+        List of dicts with 'application', 'matched_on' (kinds) and 'score', strongest first
+    """
+    mine = db.aliased(ApplicationMatchKey)
+    other = db.aliased(ApplicationMatchKey)
+
+    # Per kind, max() counts a kind once however many of its values match, so
+    # one grouped query gives the score and (as a bit mask) the matched kinds
+    bits = {kind: 1 << position for position, kind in enumerate(MATCH_WEIGHTS)}
+    score = sum(
+        db.func.max(db.case((other.kind == kind, weight), else_=0)) for kind, weight in MATCH_WEIGHTS.items()
+    ).label('score')
+    kind_mask = sum(
+        db.func.max(db.case((other.kind == kind, bit), else_=0)) for kind, bit in bits.items()
+    ).label('kind_mask')
+    scored = db.session.execute(
+        db.select(other.application_id, score, kind_mask)
+        .join(mine, db.and_(mine.kind == other.kind, mine.value == other.value))
+        .where(
+            mine.application_id == application_id,
+            other.application_id != application_id
+        )
+        .group_by(other.application_id)
+        .order_by(score.desc(), other.application_id.desc())
+        .limit(limit)
+    ).all()
+    if not scored:
+        return []
+
+    applications = {
+        application.id: application
+        for application in Application.query.filter(Application.id.in_([row.application_id for row in scored]))
+    }
+    strongest_first = sorted(MATCH_WEIGHTS, key=lambda kind: -MATCH_WEIGHTS[kind])
+    return [
+        {
+            'application': applications[row.application_id],
+            'matched_on': [kind for kind in strongest_first if row.kind_mask & bits[kind]],
+            'score': row.score,
+        }
+        for row in scored
+        if row.application_id in applications
+    ]
+
+
+def rebuild_duplicate_index(batch_size=1000):
+    """
+    Recompute match keys for every application (after changing normalization rules)
+
+    Streams applications with yield_per and inserts keys in batches; commits.
+
+    Returns:
+        Number of match keys written
+    """
+    ApplicationMatchKey.query.delete()
+
+    columns = [getattr(Application, name) for name in MATCH_FIELDS]
+    statement = db.select(Application.id, *columns).execution_options(yield_per=batch_size)
+
+    written = 0
+    for partition in db.session.execute(statement).partitions():
+        written += index_applications((row[0], dict(zip(MATCH_FIELDS, row[1:]))) for row in partition)
+
+    db.session.commit()
+    return written
@@ -0,0 +1,47 @@
+"""
+Eager-loading options for list queries
+
+Each function returns the loader options a list view needs so its template
+can walk relationships without issuing one lazy SELECT per row.
+"""
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import LineOfCredit, Customer, WithdrawalRequest, ActivityLog, Payment
+
+
+def deal_list_options():
+    """Deals table: customer name and assigned rep per row"""
+    return (
+        joinedload(LineOfCredit.customer),
+        joinedload(LineOfCredit.assigned_rep),
+    )
+
+
+def customer_list_options():
+    """Customers table: line of credit link per row"""
+    return (
+        selectinload(Customer.line_of_credit),
+    )
+
+
+def withdrawal_list_options():
+    """Withdrawal requests table: customer, line of credit and reviewer per row"""
+    return (
+        joinedload(WithdrawalRequest.customer),
+        joinedload(WithdrawalRequest.line_of_credit),
+        joinedload(WithdrawalRequest.reviewed_by),
+    )
+
+
+def activity_log_list_options():
+    """Activity log table: performing user and customer per row"""
+    return (
+        joinedload(ActivityLog.user),
+        joinedload(ActivityLog.customer),
+    )
+
+
+def payment_list_options():
+    """Payment lists: customer name per row"""
+    return (
+        joinedload(Payment.customer),
+    )
@@ -0,0 +1,163 @@
+"""
+Streaming CSV / JSON-lines export of table data
+
+Rows are read through server-side cursors (yield_per) and serialized a chunk
+at a time, so memory stays flat however large the table is.
+"""
+import csv
+import io
+import json
+from datetime import datetime, date, timedelta
+from app import db
+from app.models import Application, LineOfCredit, ActivityLog, Payment, User, Customer
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+def _serialize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_rows(statement, batch_size=EXPORT_BATCH_SIZE):
+    """Execute a select and yield its rows through a server-side cursor"""
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        for row in partition:
+            yield row
+
+
+def stream_rows(columns, rows, fmt='csv', batch_size=EXPORT_BATCH_SIZE):
+    """
+    Serialize rows chunk by chunk
+
+    Args:
+        columns: Column names, used as the CSV header / JSON keys
+        rows: Iterable of row tuples (consumed lazily)
+        fmt: 'csv' or 'jsonl'
+        batch_size: Rows serialized per chunk
+
+    Yields:
+        Text chunks ready to write to a file or stream in a response
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if fmt == 'csv':
+        writer.writerow(columns)
+
+    rows_in_buffer = 0
+    for row in rows:
+        values = [_serialize(value) for value in row]
+        if fmt == 'csv':
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(columns, values))) + '\n')
+
+        rows_in_buffer += 1
+        if rows_in_buffer >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows_in_buffer = 0
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_export(statement, fmt='csv', batch_size=EXPORT_BATCH_SIZE):
+    """Serialize the rows of a select statement, read through a server-side cursor"""
+    columns = [column.name for column in statement.selected_columns]
+    return stream_rows(columns, iter_rows(statement, batch_size), fmt, batch_size)
+
+
+def parse_date_range(args):
+    """
+    Read an inclusive start/end date range (YYYY-MM-DD) from request args
+
+    Returns:
+        Tuple of (start, end) dates; either is None when missing or invalid
+    """
+    dates = []
+    for key in ('start', 'end'):
+        try:
+            dates.append(date.fromisoformat(args.get(key, '')))
+        except ValueError:
+            dates.append(None)
+    return tuple(dates)
+
+
+def filter_date_range(query, column, start=None, end=None):
+    """Restrict a query or select to start <= column < end + 1 day"""
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column < end + timedelta(days=1))
+    return query
+
+
+def filter_activity_logs(query, action_type='all', start=None, end=None):
+    """Apply the activity log page filters (action type and date range)"""
+    if action_type and action_type != 'all':
+        query = query.filter(ActivityLog.action_type == action_type)
+    return filter_date_range(query, ActivityLog.created_at, start, end)
+
+
+def application_export_statement():
+    """All application columns, oldest first"""
+    return db.select(Application.__table__).order_by(Application.id)
+
+
+def deal_export_statement():
+    """All line of credit columns, oldest first"""
+    return db.select(LineOfCredit.__table__).order_by(LineOfCredit.id)
+
+
+def activity_log_export_statement(action_type='all', start=None, end=None):
+    """Activity logs with the acting user and customer names, oldest first"""
+    statement = db.select(
+        ActivityLog.id,
+        ActivityLog.created_at,
+        ActivityLog.action_type,
+        ActivityLog.description,
+        ActivityLog.user_id,
+        User.username.label('username'),
+        ActivityLog.customer_id,
+        Customer.business_name.label('customer_business_name'),
+        ActivityLog.application_id,
+        ActivityLog.line_of_credit_id,
+        ActivityLog.extra_data,
+    ).outerjoin(
+        User, User.id == ActivityLog.user_id
+    ).outerjoin(
+        Customer, Customer.id == ActivityLog.customer_id
+    )
+    statement = filter_activity_logs(statement, action_type, start, end)
+    return statement.order_by(ActivityLog.created_at, ActivityLog.id)
+
+
+def payment_export_statement(start=None, end=None):
+    """Payments ledger with customer names, in payment date order"""
+    statement = db.select(
+        Payment.id,
+        Payment.payment_date,
+        Payment.line_of_credit_id,
+        Payment.customer_id,
+        Customer.business_name.label('customer_business_name'),
+        Payment.amount,
+        Payment.method,
+        Payment.notes,
+        Payment.created_at,
+    ).outerjoin(
+        Customer, Customer.id == Payment.customer_id
+    )
+    statement = filter_date_range(statement, Payment.payment_date, start, end)
+    return statement.order_by(Payment.payment_date, Payment.id)
+
+
+EXPORTS = {
+    'applications': application_export_statement,
+    'deals': deal_export_statement,
+}
@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, PasswordField, FloatField, IntegerField, SelectField, TextAreaField, DateField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, Email, Length, Optional, NumberRange, EqualTo
 
@@ -153,3 +154,25 @@ class UpdateDealStatusForm(FlaskForm):
                         validators=[DataRequired()])
     notes = TextAreaField('Notes (optional)', validators=[Optional()])
     submit = SubmitField('Update Status')
+
+
+class ImportApplicationsForm(FlaskForm):
+    """Form for admin to bulk import applications from a file"""
+    file = FileField('Applications File (CSV or JSON lines)',
+                     validators=[FileRequired(), FileAllowed(['csv', 'jsonl', 'json'], 'CSV or JSON lines files only')])
+    submit = SubmitField('Import Applications')
+
+
+class BulkReviewForm(FlaskForm):
+    """Form for admin to approve or deny the rows selected in a list"""
+    reason = TextAreaField('Reason (for denials)', validators=[Optional(), Length(max=500)])
+    approve = SubmitField('Approve Selected')
+    deny = SubmitField('Deny Selected')
+
+
+class PostPaymentsForm(FlaskForm):
+    """Form for admin to post a bank remittance file of collected payments"""
+    file = FileField('Remittance File (CSV or NACHA)',
+                     validators=[FileRequired(), FileAllowed(['csv', 'ach', 'txt', 'nacha'], 'CSV or NACHA files only')])
+    dry_run = BooleanField('Dry run (validate only, post nothing)')
+    submit = SubmitField('Post Payments')
@@ -0,0 +1,191 @@
+"""
+Per-request SQL and template instrumentation
+
+Hooks SQLAlchemy cursor events and Flask request/template signals to record,
+for every request, the number of SQL statements, total DB time, the slowest
+statement and the template render time. Results are sent back in a
+Server-Timing header and kept in a rolling per-endpoint window (perf_stats)
+that the admin perf page reads.
+
+When SQL_QUERY_BUDGET is set (e.g. in tests), a request that runs more
+statements than its view's budget raises QueryBudgetExceeded, so N+1
+regressions fail loudly instead of slowing down.
+"""
+import threading
+import time
+from collections import deque
+from flask import g, request, current_app, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+from app import db
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more SQL statements than its view allows"""
+
+
+def query_budget(limit):
+    """
+    Set the maximum number of SQL statements a view may run
+
+    Place directly above the view function (below @bp.route and the auth decorators).
+    """
+    def decorator(f):
+        f.query_budget = limit
+        return f
+    return decorator
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile (fraction 0-1) of an already sorted list; 0 when empty"""
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class PerfStats:
+    """Rolling window of request timings per endpoint (in-process, thread-safe)"""
+
+    def __init__(self, window_size=500):
+        self.window_size = window_size
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, total_ms, db_ms, query_count, template_ms, slowest_ms, slowest_statement):
+        sample = (total_ms, db_ms, query_count, template_ms, slowest_ms, slowest_statement)
+        with self._lock:
+            if endpoint not in self._samples:
+                self._samples[endpoint] = deque(maxlen=self.window_size)
+            self._samples[endpoint].append(sample)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        """
+        Summarize the window for every endpoint
+
+        Returns:
+            List of dicts sorted by total time spent (slowest endpoints first)
+        """
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+
+        rows = []
+        for endpoint, samples in snapshot.items():
+            totals = sorted(sample[0] for sample in samples)
+            slowest = max(samples, key=lambda sample: sample[4])
+            histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+            for total_ms in totals:
+                bucket = next((i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if total_ms <= bound),
+                              len(HISTOGRAM_BUCKETS_MS))
+                histogram[bucket] += 1
+
+            count = len(samples)
+            rows.append({
+                'endpoint': endpoint,
+                'count': count,
+                'p50_ms': percentile(totals, 0.50),
+                'p95_ms': percentile(totals, 0.95),
+                'max_ms': totals[-1],
+                'avg_queries': sum(sample[2] for sample in samples) / count,
+                'avg_db_ms': sum(sample[1] for sample in samples) / count,
+                'avg_template_ms': sum(sample[3] for sample in samples) / count,
+                'slowest_query_ms': slowest[4],
+                'slowest_statement': slowest[5],
+                'histogram': histogram,
+                'time_spent_ms': sum(totals),
+            })
+
+        rows.sort(key=lambda row: row['time_spent_ms'], reverse=True)
+        return rows
+
+
+perf_stats = PerfStats()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_start_time'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info.pop('query_start_time', time.perf_counter())) * 1000
+    if not has_request_context():
+        return
+
+    g.sql_query_count = g.get('sql_query_count', 0) + 1
+    g.sql_time_ms = g.get('sql_time_ms', 0.0) + elapsed_ms
+    if elapsed_ms > g.get('sql_slowest_ms', 0.0):
+        g.sql_slowest_ms = elapsed_ms
+        g.sql_slowest_statement = statement
+
+
+def _before_render_template(sender, template, context, **extra):
+    if has_request_context():
+        g.template_start_time = time.perf_counter()
+
+
+def _template_rendered(sender, template, context, **extra):
+    if has_request_context() and 'template_start_time' in g:
+        g.template_time_ms = g.get('template_time_ms', 0.0) + (time.perf_counter() - g.template_start_time) * 1000
+
+
+def _start_request():
+    g.request_start_time = time.perf_counter()
+    g.sql_query_count = 0
+    g.sql_time_ms = 0.0
+    g.sql_slowest_ms = 0.0
+    g.sql_slowest_statement = None
+    g.template_time_ms = 0.0
+
+
+def _finish_request(response):
+    app = current_app
+    count = g.get('sql_query_count', 0)
+
+    if app.config.get('PERF_INSTRUMENTATION') and 'request_start_time' in g:
+        total_ms = (time.perf_counter() - g.request_start_time) * 1000
+        db_ms = g.get('sql_time_ms', 0.0)
+        template_ms = g.get('template_time_ms', 0.0)
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_ms:.1f};desc="{count} queries", tpl;dur={template_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+        perf_stats.record(
+            request.endpoint or 'unmatched',
+            total_ms, db_ms, count, template_ms,
+            g.get('sql_slowest_ms', 0.0), g.get('sql_slowest_statement')
+        )
+
+    if app.config.get('SQL_QUERY_BUDGET'):
+        view = app.view_functions.get(request.endpoint)
+        limit = getattr(view, 'query_budget', None) or app.config['SQL_QUERY_BUDGET']
+        if count > limit:
+            raise QueryBudgetExceeded(
+                f'{request.endpoint} ran {count} SQL queries (budget {limit})'
+            )
+
+    return response
+
+
+def init_instrumentation(app):
+    """Hook SQL, request and template timing if PERF_INSTRUMENTATION or SQL_QUERY_BUDGET is enabled"""
+    if not (app.config.get('PERF_INSTRUMENTATION') or app.config.get('SQL_QUERY_BUDGET')):
+        return
+
+    perf_stats.window_size = app.config.get('PERF_WINDOW_SIZE', perf_stats.window_size)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+    before_render_template.connect(_before_render_template, app)
+    template_rendered.connect(_template_rendered, app)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -1,4 +1,5 @@
-from datetime import datetime
+import json
+from datetime import date, datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from app import db, login_manager
@@ -99,9 +100,21 @@ class Application(db.Model):
     reviewed_at = db.Column(db.DateTime)
     notes = db.Column(db.Text)
     
+    # Underwriting score (app/underwriting.py), set on submit and by the batch re-score
+    risk_score = db.Column(db.Float, index=True)  # 0-100, higher is safer
+    risk_grade = db.Column(db.String(1))  # A-E
+    recommended_amount = db.Column(db.Float)
+    score_version = db.Column(db.String(20))
+    scored_at = db.Column(db.DateTime)
+    
     # Relationship to customer (after approval)
     customer = db.relationship('Customer', backref='original_application', uselist=False)
     
+    __table_args__ = (
+        # Application list filtered by status, newest first (id breaks ties for keyset pages)
+        db.Index('ix_applications_status_submitted_at', 'status', 'submitted_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Application {self.business_name} - {self.status}>'
 
@@ -129,6 +142,12 @@ class Customer(db.Model):
     # Relationship
     line_of_credit = db.relationship('LineOfCredit', backref='customer', uselist=False)
     
+    # Sort orders of the customers list
+    __table_args__ = (
+        db.Index('ix_customers_created_at', 'created_at', 'id'),
+        db.Index('ix_customers_business_name', 'business_name', 'id'),
+    )
+    
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
     
@@ -188,6 +207,14 @@ class LineOfCredit(db.Model):
         self.available_amount = self.approved_amount - self.used_amount
         return self.available_amount
     
+    __table_args__ = (
+        # Deal lists: all, by status and by rep, newest first; top balances on the reports page
+        db.Index('ix_lines_of_credit_created_at', 'created_at', 'id'),
+        db.Index('ix_lines_of_credit_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_lines_of_credit_rep_created_at', 'rep_id', 'created_at', 'id'),
+        db.Index('ix_lines_of_credit_status_outstanding', 'status', 'outstanding_balance'),
+    )
+    
     def __repr__(self):
         return f'<LineOfCredit ${self.approved_amount} for Customer {self.customer_id}>'
 
@@ -217,6 +244,12 @@ class ActivityLog(db.Model):
     # Timestamp
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
+    __table_args__ = (
+        # Payment history of a deal (admin deal page, customer dashboard)
+        db.Index('ix_activity_logs_loc_action_created', 'line_of_credit_id', 'action_type', 'created_at'),
+        db.Index('ix_activity_logs_customer_id', 'customer_id'),
+    )
+    
     def __repr__(self):
         return f'<ActivityLog {self.action_type} at {self.created_at}>'
 
@@ -226,10 +259,10 @@ class WithdrawalRequest(db.Model):
     __tablename__ = 'withdrawal_requests'
     
     id = db.Column(db.Integer, primary_key=True)
-    line_of_credit_id = db.Column(db.Integer, db.ForeignKey('lines_of_credit.id'), nullable=False)
+    line_of_credit_id = db.Column(db.Integer, db.ForeignKey('lines_of_credit.id'), nullable=False, index=True)
     line_of_credit = db.relationship('LineOfCredit', backref='withdrawal_requests')
     
-    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False, index=True)
     customer = db.relationship('Customer', backref='withdrawal_requests')
     
     requested_amount = db.Column(db.Float, nullable=False)
@@ -244,5 +277,215 @@ class WithdrawalRequest(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
+    __table_args__ = (
+        # Withdrawal queue filtered by status, newest first
+        db.Index('ix_withdrawal_requests_status_created_at', 'status', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<WithdrawalRequest ${self.requested_amount} - {self.status}>'
+
+
+class Payment(db.Model):
+    """Payments recorded against a line of credit"""
+    __tablename__ = 'payments'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    line_of_credit_id = db.Column(db.Integer, db.ForeignKey('lines_of_credit.id'), nullable=False, index=True)
+    line_of_credit = db.relationship('LineOfCredit', backref=db.backref('payments', lazy='dynamic'))
+    
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=True, index=True)
+    customer = db.relationship('Customer', backref='payments')
+    
+    amount = db.Column(db.Float, nullable=False)
+    payment_date = db.Column(db.Date, nullable=False, index=True)
+    method = db.Column(db.String(50))  # ACH, Wire, Check, Card, Other
+    notes = db.Column(db.Text)
+    
+    # Who recorded the payment
+    recorded_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    recorded_by = db.relationship('User', backref='recorded_payments')
+    
+    # The 'payment_recorded' activity log entry for this payment (used by the backfill to skip migrated rows)
+    activity_log_id = db.Column(db.Integer, unique=True)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        db.Index('ix_payments_loc_payment_date', 'line_of_credit_id', 'payment_date'),
+        # Covers the collection totals on the reports page
+        db.Index('ix_payments_payment_date_amount', 'payment_date', 'amount'),
+    )
+    
+    def __repr__(self):
+        return f'<Payment ${self.amount} on {self.payment_date} for LOC {self.line_of_credit_id}>'
+
+
+class PortfolioRollup(db.Model):
+    """Precomputed line of credit totals per (status, rep), maintained on every deal change"""
+    __tablename__ = 'portfolio_rollup'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(50), nullable=False)
+    rep_id = db.Column(db.Integer, nullable=False, default=0, index=True)  # 0 = unassigned
+    
+    deal_count = db.Column(db.Integer, nullable=False, default=0)
+    approved_amount = db.Column(db.Float, nullable=False, default=0.0)
+    used_amount = db.Column(db.Float, nullable=False, default=0.0)
+    outstanding_balance = db.Column(db.Float, nullable=False, default=0.0)
+    total_paid = db.Column(db.Float, nullable=False, default=0.0)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('status', 'rep_id', name='uq_portfolio_rollup_status_rep'),
+    )
+    
+    def __repr__(self):
+        return f'<PortfolioRollup {self.status} rep={self.rep_id}: {self.deal_count} deals>'
+
+
+class ApplicationMatchKey(db.Model):
+    """Normalized identity keys of an application, used to find duplicate and stacked applications"""
+    __tablename__ = 'application_match_keys'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    application_id = db.Column(db.Integer, db.ForeignKey('applications.id'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # email, ein, phone, ssn_dob, business_name, address
+    value = db.Column(db.String(255), nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_application_match_keys_kind_value', 'kind', 'value'),
+    )
+    
+    def __repr__(self):
+        return f'<ApplicationMatchKey {self.kind}={self.value} app={self.application_id}>'
+
+
+class PaymentScheduleEntry(db.Model):
+    """Expected installment of a line of credit, generated by app/schedule.py when the terms change"""
+    __tablename__ = 'payment_schedule'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    line_of_credit_id = db.Column(db.Integer, db.ForeignKey('lines_of_credit.id'), nullable=False)
+    installment_number = db.Column(db.Integer, nullable=False)  # 1-based
+    due_date = db.Column(db.Date, nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    cumulative_amount = db.Column(db.Float, nullable=False)  # Total due through this installment
+    
+    __table_args__ = (
+        db.UniqueConstraint('line_of_credit_id', 'installment_number', name='uq_payment_schedule_loc_installment'),
+        db.Index('ix_payment_schedule_loc_due_date', 'line_of_credit_id', 'due_date'),
+    )
+    
+    def __repr__(self):
+        return f'<PaymentScheduleEntry LOC {self.line_of_credit_id} #{self.installment_number} ${self.amount} due {self.due_date}>'
+
+
+class DelinquencyStatus(db.Model):
+    """Expected vs. actual payments of an active line of credit, written by the delinquency scan (app/delinquency.py)"""
+    __tablename__ = 'delinquency_status'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    line_of_credit_id = db.Column(db.Integer, db.ForeignKey('lines_of_credit.id'), nullable=False, unique=True)
+    customer_id = db.Column(db.Integer, nullable=False)
+    rep_id = db.Column(db.Integer)
+    
+    expected_payments = db.Column(db.Integer, nullable=False, default=0)
+    payments_made = db.Column(db.Integer, nullable=False, default=0)
+    expected_amount = db.Column(db.Float, nullable=False, default=0.0)
+    paid_amount = db.Column(db.Float, nullable=False, default=0.0)
+    past_due_amount = db.Column(db.Float, nullable=False, default=0.0)
+    
+    oldest_unpaid_due_date = db.Column(db.Date)
+    days_past_due = db.Column(db.Integer, nullable=False, default=0, index=True)
+    days_since_last_payment = db.Column(db.Integer)
+    bucket = db.Column(db.String(10), nullable=False, default='current', index=True)  # current, 1-7, 8-30, 30+
+    
+    scanned_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    line_of_credit = db.relationship('LineOfCredit')
+    
+    __table_args__ = (
+        db.Index('ix_delinquency_status_rep_days_past_due', 'rep_id', 'days_past_due'),
+    )
+    
+    def __repr__(self):
+        return f'<DelinquencyStatus LOC {self.line_of_credit_id}: {self.days_past_due} days ({self.bucket})>'
+
+
+class CustomerSummary(db.Model):
+    """
+    Everything the customer portal dashboard shows, one row per customer
+
+    A read model maintained on write by app/customer_summary.py (refreshed
+    before every commit that touches the customer, their deal, payments,
+    schedule or rep), so a dashboard view is one primary key read.
+    customer_id is deliberately not a foreign key: the row is derived data
+    and is removed in the same commit as its customer.
+    """
+    __tablename__ = 'customer_summaries'
+    
+    customer_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    business_name = db.Column(db.String(200))
+    customer_since = db.Column(db.DateTime)
+    last_login = db.Column(db.DateTime)
+    
+    # Line of credit (all None when the customer has none)
+    line_of_credit_id = db.Column(db.Integer)
+    status = db.Column(db.String(50))
+    approved_amount = db.Column(db.Float)
+    used_amount = db.Column(db.Float)
+    available_amount = db.Column(db.Float)
+    utilization_percentage = db.Column(db.Float)
+    outstanding_balance = db.Column(db.Float)
+    total_paid = db.Column(db.Float)
+    number_of_payments_made = db.Column(db.Integer)
+    number_of_payments_remaining = db.Column(db.Integer)
+    interest_rate = db.Column(db.Float)
+    payment_frequency = db.Column(db.String(50))
+    payment_amount = db.Column(db.Float)
+    term_months = db.Column(db.Integer)
+    first_payment_date = db.Column(db.Date)
+    maturity_date = db.Column(db.Date)
+    last_payment_date = db.Column(db.Date)
+    
+    # Oldest installment of the payment schedule not yet covered by payments
+    next_payment_due_date = db.Column(db.Date)
+    next_payment_due_amount = db.Column(db.Float)
+    
+    # Assigned rep's contact details
+    rep_name = db.Column(db.String(200))
+    rep_email = db.Column(db.String(120))
+    
+    # JSON list of the last 10 payments: [{"date", "amount", "method"}], newest first
+    recent_payments = db.Column(db.Text)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def has_line_of_credit(self):
+        return self.line_of_credit_id is not None
+    
+    @property
+    def payments(self):
+        """recent_payments decoded, with dates as date objects"""
+        return [
+            dict(payment, date=date.fromisoformat(payment['date']))
+            for payment in json.loads(self.recent_payments or '[]')
+        ]
+    
+    def __repr__(self):
+        return f'<CustomerSummary customer {self.customer_id}>'
+
+
+class SchemaVersion(db.Model):
+    """Fingerprint of the schema the database was last upgraded to, checked by bootstrap.py on every start"""
+    __tablename__ = 'schema_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.String(64), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SchemaVersion {self.version}>'
@@ -0,0 +1,107 @@
+"""
+Response cache for anonymous public pages
+
+Views decorated with @cache_page render once per URL and are then served
+from memory to visitors who are not logged in: the stored body (plus a
+gzip copy made at store time) is returned with an ETag, Last-Modified and
+a short public Cache-Control, and conditional requests get a 304 without
+rendering anything. Logged-in users, customers and requests with pending
+flash messages always render the view.
+"""
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session, make_response, Response
+from flask_login import current_user
+
+
+class CachedPage:
+    """A rendered page and its validators"""
+
+    def __init__(self, response):
+        self.body = response.get_data()
+        self.gzip_body = gzip.compress(self.body, compresslevel=6)
+        self.mimetype = response.mimetype
+        self.etag = hashlib.md5(self.body).hexdigest()
+        self.last_modified = time.time()
+        self.expires_at = self.last_modified + current_app.config['PAGE_CACHE_TIMEOUT']
+
+
+_pages = OrderedDict()
+_lock = threading.Lock()
+
+
+def _get(key):
+    with _lock:
+        page = _pages.get(key)
+        if page is None:
+            return None
+        if page.expires_at < time.time():
+            del _pages[key]
+            return None
+        _pages.move_to_end(key)
+        return page
+
+
+def _store(key, page):
+    with _lock:
+        _pages[key] = page
+        _pages.move_to_end(key)
+        while len(_pages) > current_app.config['PAGE_CACHE_MAX_ENTRIES']:
+            _pages.popitem(last=False)
+
+
+def clear_page_cache():
+    with _lock:
+        _pages.clear()
+
+
+def is_anonymous_request():
+    """GET/HEAD from a visitor who is not logged in and has no flash messages waiting"""
+    return (
+        request.method in ('GET', 'HEAD')
+        and not current_user.is_authenticated
+        and 'customer_id' not in session
+        and '_flashes' not in session
+    )
+
+
+def _page_response(page, hit):
+    use_gzip = 'gzip' in request.accept_encodings
+    response = Response(page.gzip_body if use_gzip else page.body, mimetype=page.mimetype)
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+
+    # ETags differ per encoding so a cache never mixes the two bodies
+    response.set_etag(f"{page.etag}-gz" if use_gzip else page.etag)
+    response.last_modified = page.last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['PAGE_CACHE_MAX_AGE']
+    response.vary.update(('Accept-Encoding', 'Cookie'))
+    response.headers['X-Page-Cache'] = 'HIT' if hit else 'MISS'
+    return response.make_conditional(request)
+
+
+def cache_page(view):
+    """Serve a public view from the page cache for anonymous visitors"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config['PAGE_CACHE_ENABLED'] or not is_anonymous_request():
+            return view(*args, **kwargs)
+
+        key = request.full_path
+        page = _get(key)
+        if page is not None:
+            return _page_response(page, hit=True)
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.direct_passthrough:
+            return response
+
+        page = CachedPage(response)
+        _store(key, page)
+        return _page_response(page, hit=False)
+    return wrapper
@@ -0,0 +1,190 @@
+"""
+Keyset (seek) pagination for list views
+
+Pages are addressed by an opaque cursor holding the sort value and id of the
+last (or first) row shown, so fetching any page costs one indexed range scan
+of page size rows no matter how deep the page is.
+"""
+import base64
+import json
+from datetime import datetime, date
+from flask import request
+from sqlalchemy import tuple_
+
+DEFAULT_PER_PAGE = 50
+
+
+class KeysetPage:
+    """One page of keyset-paginated results"""
+
+    def __init__(self, items, has_next, has_prev, next_cursor, prev_cursor):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+        # Filled in by paginate_request() for building links in templates
+        self.sort = None
+        self.order = None
+        self.args = {}
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(value, column):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values):
+    """Encode a row's sort key values as a URL-safe cursor string"""
+    raw = json.dumps([_encode_value(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """
+    Decode a cursor produced by encode_cursor()
+
+    Returns:
+        List of values typed to match columns, or None if the cursor is invalid
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(columns):
+            return None
+        return [_decode_value(value, column) for value, column in zip(values, columns)]
+    except (ValueError, TypeError):
+        return None
+
+
+def _may_be_null(column):
+    """Whether a sort column can hold NULL (columns filled by a default never do in practice)"""
+    return bool(getattr(column, 'nullable', False)) and column.default is None and column.server_default is None
+
+
+def _seek(query, columns, values, descending):
+    """Rows of query past the key values (from the start if None), in the given order"""
+    if values is not None:
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+    return query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+
+
+def keyset_paginate(query, columns, after=None, before=None, per_page=DEFAULT_PER_PAGE, descending=True):
+    """
+    Fetch one page of a query ordered by columns
+
+    Row value comparisons never match NULL, so when the sort column can be
+    NULL the rows without a value are paged separately, after all the others
+    (ordered by the remaining columns) in either direction.
+
+    Args:
+        query: Filtered query to paginate (must not already be ordered)
+        columns: Sort key columns, ending with a unique column such as id
+        after: Cursor of the last row on the previous page (next page)
+        before: Cursor of the first row on the following page (previous page)
+        per_page: Page size
+        descending: Sort newest/largest first
+
+    Returns:
+        KeysetPage
+    """
+    after_values = decode_cursor(after, columns) if after else None
+    before_values = decode_cursor(before, columns) if before else None
+
+    # Walking backwards runs the query in reverse order and flips the result
+    backwards = before_values is not None and after_values is None
+    forward_desc = descending != backwards
+    values = before_values if backwards else after_values
+
+    if _may_be_null(columns[0]):
+        present = (query.filter(columns[0].isnot(None)), columns)
+        missing = (query.filter(columns[0].is_(None)), columns[1:])
+        in_missing = values is not None and values[0] is None
+        if not backwards:
+            parts = [missing + (values[1:],)] if in_missing else [present + (values,), missing + (None,)]
+        else:
+            parts = [missing + (values[1:],), present + (None,)] if in_missing else [present + (values,)]
+    else:
+        parts = [(query, columns, values)]
+
+    rows = []
+    for part_query, part_columns, part_values in parts:
+        if len(rows) > per_page:
+            break
+        rows += _seek(part_query, part_columns, part_values, forward_desc).limit(per_page + 1 - len(rows)).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(row):
+        return encode_cursor([getattr(row, column.key) for column in columns])
+
+    if backwards:
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after_values is not None
+
+    return KeysetPage(
+        items=rows,
+        has_next=has_next and bool(rows),
+        has_prev=has_prev and bool(rows),
+        next_cursor=cursor_for(rows[-1]) if rows else None,
+        prev_cursor=cursor_for(rows[0]) if rows else None,
+    )
+
+
+def paginate_request(query, sort_columns, default_sort, id_column, per_page=DEFAULT_PER_PAGE):
+    """
+    Paginate a list view from the current request's sort/order/after/before args
+
+    Args:
+        query: Filtered query for the list
+        sort_columns: Dict of allowed sort names -> column
+        default_sort: Sort name used when the request gives none (or an unknown one)
+        id_column: Unique tie-breaker column (the model's id)
+        per_page: Page size
+
+    Returns:
+        KeysetPage with sort, order and the non-cursor request args filled in
+    """
+    sort = request.args.get('sort', default_sort)
+    if sort not in sort_columns:
+        sort = default_sort
+    order = request.args.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        order = 'desc'
+
+    page = keyset_paginate(
+        query,
+        [sort_columns[sort], id_column],
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=per_page,
+        descending=(order == 'desc')
+    )
+    page.sort = sort
+    page.order = order
+    page.args = {k: v for k, v in request.args.items() if k not in ('after', 'before')}
+    return page
@@ -0,0 +1,352 @@
+"""
+Bulk payment posting from bank remittance files
+
+Reads a CSV or NACHA-style fixed-width file of collected debits, matches each
+row to a line of credit and posts every accepted payment in one transaction:
+payments and their activity logs are inserted in bulk, deal balances are
+updated with one parameterized UPDATE per deal (executemany), and deals whose
+balance reaches zero are flagged paid off with a single UPDATE.
+"""
+import csv
+import io
+import json
+import re
+from datetime import datetime, date
+from sqlalchemy import bindparam, case, func
+from app import db
+from app.models import LineOfCredit, Payment, ActivityLog
+from app.portfolio import ROLLUP_FIELDS, update_portfolio_rollup_many
+from app.customer_summary import mark_stale
+from app.utils import log_activity
+
+POSTING_FORMATS = ('csv', 'nacha')
+
+# Rejected rows kept for display
+MAX_REPORTED_ERRORS = 200
+
+# Deals are loaded (and locked) in chunks of this many ids
+LOAD_CHUNK_SIZE = 1000
+
+# NACHA transaction codes for debits to the customer's checking / savings account
+NACHA_DEBIT_CODES = ('27', '37')
+
+_CSV_DEAL_COLUMNS = ('deal_id', 'line_of_credit_id', 'loc_id', 'reference')
+_DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%Y%m%d')
+
+# The only reference formats a deal id is read from; anything else is unmatched
+_DEAL_REFERENCE_RE = re.compile(r'(?:LOC[- ]?|QL)?0*(\d+)', re.IGNORECASE)
+
+
+class PostingResult:
+    """Outcome of a posting run"""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.posted = 0
+        self.rejected = 0
+        self.total_amount = 0.0
+        self.paid_off = []
+        self.errors = []
+
+    def reject(self, item, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({
+                'line': item.get('line'),
+                'reference': item.get('reference', ''),
+                'amount': item.get('amount'),
+                'error': message,
+            })
+
+
+def detect_format(filename):
+    """'nacha' for .ach/.txt/.nacha files, otherwise 'csv'"""
+    if filename and filename.lower().rsplit('.', 1)[-1] in ('ach', 'txt', 'nacha'):
+        return 'nacha'
+    return 'csv'
+
+
+def parse_deal_reference(reference):
+    """
+    Deal id from a remittance reference such as '123', 'LOC-123' or 'QL000123'
+
+    Returns None for any other reference (e.g. 'INV-2024-0042') rather than
+    guessing a deal from whatever digits it contains.
+    """
+    match = _DEAL_REFERENCE_RE.fullmatch((reference or '').strip())
+    return int(match.group(1)) if match else None
+
+
+def _parse_date(value):
+    value = (value or '').strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_amount(value):
+    try:
+        return round(float(str(value).replace('$', '').replace(',', '').strip()), 2)
+    except ValueError:
+        return None
+
+
+def parse_csv(stream, default_date=None):
+    """
+    Yield payment items from a CSV with a deal id column plus amount, date and optional method/notes
+
+    Items that cannot be parsed carry an 'error' key.
+    """
+    reader = csv.DictReader(stream)
+    for record in reader:
+        record = {(key or '').strip().lower(): (value or '').strip() for key, value in record.items()}
+        reference = next((record[column] for column in _CSV_DEAL_COLUMNS if record.get(column)), '')
+        raw_date = record.get('date') or record.get('payment_date')
+        item = {
+            'line': reader.line_num,
+            'reference': reference,
+            'line_of_credit_id': parse_deal_reference(reference),
+            'amount': _parse_amount(record.get('amount', '')),
+            'payment_date': _parse_date(raw_date) if raw_date else default_date,
+            'method': record.get('method') or 'ACH',
+            'notes': record.get('notes') or None,
+        }
+        if item['amount'] is None:
+            item['error'] = 'invalid amount'
+        elif item['payment_date'] is None:
+            item['error'] = 'invalid or missing date'
+        yield item
+
+
+def parse_nacha(stream, default_date=None):
+    """
+    Yield payment items from the entry detail (type 6) records of a NACHA file
+
+    The deal id is read from the individual identification number, the
+    amount from the cents field and the date from the batch header's
+    effective entry date.
+    """
+    effective_date = default_date
+    for line_number, line in enumerate(stream, start=1):
+        line = line.rstrip('\r\n')
+        record_type = line[:1]
+
+        if record_type == '5':
+            effective_date = _parse_date('20' + line[69:75]) or default_date
+            continue
+        if record_type != '6':
+            continue
+
+        reference = line[39:54].strip()
+        item = {
+            'line': line_number,
+            'reference': reference,
+            'line_of_credit_id': parse_deal_reference(reference),
+            'amount': None,
+            'payment_date': effective_date,
+            'method': 'ACH',
+            'notes': f'ACH trace {line[79:94].strip()}' if line[79:94].strip() else None,
+        }
+        cents = line[29:39]
+        if line[1:3] not in NACHA_DEBIT_CODES:
+            item['error'] = f'unsupported transaction code {line[1:3]}'
+        elif not cents.isdigit():
+            item['error'] = 'invalid amount'
+        else:
+            item['amount'] = int(cents) / 100
+        if 'error' not in item and item['payment_date'] is None:
+            item['error'] = 'missing effective entry date'
+        yield item
+
+
+def parse_payment_file(stream, fmt='csv', default_date=None):
+    """Yield payment items from a remittance file in POSTING_FORMATS"""
+    if fmt == 'nacha':
+        return parse_nacha(stream, default_date)
+    return parse_csv(stream, default_date)
+
+
+def _load_deals(ids):
+    """Current balances of the given deals, locked for update until the posting commits"""
+    deals = {}
+    ids = sorted(ids)
+    for start in range(0, len(ids), LOAD_CHUNK_SIZE):
+        rows = db.session.query(
+            LineOfCredit.id, LineOfCredit.customer_id, LineOfCredit.rep_id, LineOfCredit.status,
+            LineOfCredit.approved_amount, LineOfCredit.used_amount,
+            LineOfCredit.outstanding_balance, LineOfCredit.total_paid,
+        ).filter(
+            LineOfCredit.id.in_(ids[start:start + LOAD_CHUNK_SIZE])
+        ).with_for_update().all()
+        for row in rows:
+            deals[row.id] = {
+                'customer_id': row.customer_id,
+                'rep_id': row.rep_id,
+                'status': row.status or 'active',
+                'approved_amount': row.approved_amount or 0.0,
+                'used_amount': row.used_amount or 0.0,
+                'outstanding_balance': row.outstanding_balance or 0.0,
+                'total_paid': row.total_paid or 0.0,
+            }
+    return deals
+
+
+def _snapshot(deal):
+    return (deal['status'], deal['rep_id'] or 0), {field: deal[field] for field in ROLLUP_FIELDS}
+
+
+def post_payments(items, user_id=None, method=None, dry_run=False):
+    """
+    Validate and post payment items in one transaction
+
+    Args:
+        items: Iterable of dicts from parse_payment_file()
+        user_id: User recorded as having posted the payments
+        method: Override the payment method of every item
+        dry_run: Validate and report without writing anything
+
+    Returns:
+        PostingResult
+    """
+    result = PostingResult(dry_run=dry_run)
+    items = list(items)
+    deals = _load_deals({item['line_of_credit_id'] for item in items if item.get('line_of_credit_id')})
+    before = {deal_id: _snapshot(deal) for deal_id, deal in deals.items()}
+
+    accepted = []
+    for item in items:
+        if item.get('error'):
+            result.reject(item, item['error'])
+            continue
+        if item['line_of_credit_id'] is None:
+            result.reject(item, 'unrecognized deal reference')
+            continue
+        deal = deals.get(item['line_of_credit_id'])
+        if deal is None:
+            result.reject(item, 'no matching deal')
+            continue
+        if deal['status'] != 'active':
+            result.reject(item, f"deal is {deal['status'].replace('_', ' ')}")
+            continue
+        amount = item['amount']
+        if amount <= 0:
+            result.reject(item, 'amount must be positive')
+            continue
+        if deal['outstanding_balance'] > 0 and amount > round(deal['outstanding_balance'], 2):
+            result.reject(item, f"exceeds outstanding balance ${deal['outstanding_balance']:,.2f}")
+            continue
+
+        # Track balances as rows are accepted so later rows see earlier ones
+        deal['total_paid'] += amount
+        deal['outstanding_balance'] -= amount
+        if deal['outstanding_balance'] <= 0.005:
+            deal['outstanding_balance'] = 0.0
+            deal['status'] = 'paid_off'
+        accepted.append(item)
+
+    result.posted = len(accepted)
+    result.total_amount = round(sum(item['amount'] for item in accepted), 2)
+    result.paid_off = sorted(
+        deal_id for deal_id, deal in deals.items()
+        if deal['status'] == 'paid_off' and before[deal_id][0][0] != 'paid_off'
+    )
+
+    if dry_run or not accepted:
+        db.session.rollback()
+        return result
+
+    now = datetime.utcnow()
+
+    # Activity logs first (bulk, ids returned in order) so each payment can link to its log
+    log_rows = [
+        {
+            'action_type': 'payment_recorded',
+            'description': f"Payment of ${item['amount']:,.2f} posted via {method or item['method']} on {item['payment_date'].strftime('%m/%d/%Y')} from remittance file. {item['notes'] or ''}",
+            'user_id': user_id,
+            'customer_id': deals[item['line_of_credit_id']]['customer_id'],
+            'line_of_credit_id': item['line_of_credit_id'],
+            'extra_data': json.dumps({
+                'amount': item['amount'], 'method': method or item['method'], 'date': item['payment_date'].isoformat()
+            }),
+            'created_at': now,
+        }
+        for item in accepted
+    ]
+    log_ids = db.session.scalars(
+        db.insert(ActivityLog).returning(ActivityLog.id, sort_by_parameter_order=True), log_rows
+    ).all()
+
+    db.session.execute(db.insert(Payment), [
+        {
+            'line_of_credit_id': item['line_of_credit_id'],
+            'customer_id': deals[item['line_of_credit_id']]['customer_id'],
+            'amount': item['amount'],
+            'payment_date': item['payment_date'],
+            'method': method or item['method'],
+            'notes': item['notes'],
+            'recorded_by_id': user_id,
+            'activity_log_id': log_id,
+            'created_at': now,
+        }
+        for item, log_id in zip(accepted, log_ids)
+    ])
+
+    # One relative UPDATE per deal, sent as a single executemany
+    per_deal = {}
+    for item in accepted:
+        totals = per_deal.setdefault(item['line_of_credit_id'], {'amount': 0.0, 'count': 0, 'last': date.min})
+        totals['amount'] += item['amount']
+        totals['count'] += 1
+        totals['last'] = max(totals['last'], item['payment_date'])
+
+    table = LineOfCredit.__table__
+    db.session.execute(
+        table.update().where(table.c.id == bindparam('deal_id')).values(
+            total_paid=func.coalesce(table.c.total_paid, 0) + bindparam('amount'),
+            outstanding_balance=func.coalesce(table.c.outstanding_balance, 0) - bindparam('amount'),
+            number_of_payments_made=func.coalesce(table.c.number_of_payments_made, 0) + bindparam('count'),
+            last_payment_date=case(
+                (table.c.last_payment_date > bindparam('last_date'), table.c.last_payment_date),
+                else_=bindparam('last_date')
+            ),
+            updated_at=now,
+        ),
+        [
+            {'deal_id': deal_id, 'amount': totals['amount'], 'count': totals['count'], 'last_date': totals['last']}
+            for deal_id, totals in per_deal.items()
+        ]
+    )
+
+    if result.paid_off:
+        db.session.execute(
+            table.update().where(table.c.id.in_(result.paid_off)).values(
+                status='paid_off', outstanding_balance=0, updated_at=now
+            )
+        )
+
+    update_portfolio_rollup_many(
+        (before[deal_id], _snapshot(deals[deal_id])) for deal_id in per_deal
+    )
+    mark_stale(customer_ids=[deals[deal_id]['customer_id'] for deal_id in per_deal])
+
+    log_activity(
+        action_type='payments_posted',
+        description=f'Posted {result.posted} payments totaling ${result.total_amount:,.2f} from a remittance file ({result.rejected} rejected, {len(result.paid_off)} paid off)',
+        user_id=user_id,
+        metadata={'posted': result.posted, 'rejected': result.rejected, 'total_amount': result.total_amount,
+                  'paid_off': result.paid_off},
+        buffered=False
+    )
+
+    db.session.commit()
+    return result
+
+
+def post_uploaded_file(file_storage, fmt=None, user_id=None, dry_run=False):
+    """Post an uploaded werkzeug FileStorage, detecting the format from its name"""
+    fmt = fmt or detect_format(file_storage.filename)
+    stream = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+    return post_payments(parse_payment_file(stream, fmt, default_date=date.today()), user_id=user_id, dry_run=dry_run)
@@ -0,0 +1,197 @@
+"""
+Portfolio rollup maintenance and queries
+
+The portfolio_rollup table keeps line of credit totals per (status, rep).
+Routes that change a deal take a snapshot before the change and pass it to
+update_portfolio_rollup() with a snapshot after, in the same transaction.
+"""
+from datetime import datetime
+from app import db
+from app.models import LineOfCredit, PortfolioRollup
+from app.cache import memoize
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+
+ROLLUP_FIELDS = ('approved_amount', 'used_amount', 'outstanding_balance', 'total_paid')
+
+# Dialects whose INSERT ... ON CONFLICT DO UPDATE _apply_deltas uses
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def portfolio_snapshot(loc):
+    """
+    Capture the rollup key and amounts of a line of credit
+
+    Returns:
+        Tuple of ((status, rep_id), amounts dict)
+    """
+    key = (loc.status or 'active', loc.rep_id or 0)
+    amounts = {field: getattr(loc, field) or 0.0 for field in ROLLUP_FIELDS}
+    return key, amounts
+
+
+def _apply_deltas(totals):
+    """
+    Atomically add deltas to rollup rows, creating rows that are missing
+
+    One INSERT ... ON CONFLICT DO UPDATE adds to every key: an UPDATE then
+    INSERT would let two transactions creating the same (status, rep) row
+    both insert, and the second would fail on the unique constraint.
+
+    Args:
+        totals: Dict of (status, rep_id) -> (deal_count delta, amounts deltas dict)
+    """
+    now = datetime.utcnow()
+    # Sorted so concurrent transactions lock rows in the same order
+    rows = [
+        dict(status=status, rep_id=rep_id, deal_count=deal_count, updated_at=now, **amounts)
+        for (status, rep_id), (deal_count, amounts) in sorted(totals.items())
+    ]
+    if not rows:
+        return
+
+    make_insert = _UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if make_insert is None:
+        for row in rows:
+            _update_or_insert(row)
+        return
+
+    table = PortfolioRollup.__table__
+    statement = make_insert(PortfolioRollup)
+    added = ('deal_count',) + ROLLUP_FIELDS
+    statement = statement.on_conflict_do_update(
+        index_elements=[PortfolioRollup.status, PortfolioRollup.rep_id],
+        set_=dict(
+            {field: table.c[field] + statement.excluded[field] for field in added},
+            updated_at=statement.excluded.updated_at,
+        ),
+    )
+    db.session.execute(statement, rows)
+
+
+def _update_or_insert(row):
+    """Fallback for databases without ON CONFLICT: add to the row, or create it"""
+    values = {
+        getattr(PortfolioRollup, field): getattr(PortfolioRollup, field) + row[field]
+        for field in ('deal_count',) + ROLLUP_FIELDS
+    }
+    values[PortfolioRollup.updated_at] = row['updated_at']
+    updated = PortfolioRollup.query.filter_by(status=row['status'], rep_id=row['rep_id']).update(
+        values, synchronize_session=False
+    )
+    if not updated:
+        db.session.execute(db.insert(PortfolioRollup), [row])
+
+
+def update_portfolio_rollup(before, after):
+    """
+    Apply the difference between two snapshots of a deal to the rollup
+
+    Args:
+        before: portfolio_snapshot() taken before the change, or None for a new deal
+        after: portfolio_snapshot() taken after the change, or None for a deleted deal
+
+    Does not commit; the caller commits along with the deal change.
+    """
+    update_portfolio_rollup_many([(before, after)])
+
+
+def update_portfolio_rollup_many(changes):
+    """
+    Apply many (before, after) snapshot pairs with one rollup upsert
+
+    Used by bulk operations so N deal changes cost one statement instead of
+    N. Does not commit.
+    """
+    totals = {}
+    
+    def add(key, deal_count, amounts, sign):
+        count, summed = totals.setdefault(key, [0, {field: 0.0 for field in ROLLUP_FIELDS}])
+        totals[key][0] = count + deal_count
+        for field in ROLLUP_FIELDS:
+            summed[field] += sign * amounts[field]
+    
+    for before, after in changes:
+        if before:
+            add(before[0], -1, before[1], -1)
+        if after:
+            add(after[0], 1, after[1], 1)
+    
+    _apply_deltas({
+        key: (deal_count, amounts)
+        for key, (deal_count, amounts) in totals.items()
+        if deal_count or any(amounts.values())
+    })
+
+
+def rebuild_portfolio_rollup():
+    """
+    Recompute the whole rollup table from lines_of_credit (for reconciliation)
+
+    Returns:
+        Number of rollup rows written
+    """
+    rep_key = func.coalesce(LineOfCredit.rep_id, 0)
+    rows = db.session.query(
+        LineOfCredit.status,
+        rep_key,
+        func.count(LineOfCredit.id),
+        func.coalesce(func.sum(LineOfCredit.approved_amount), 0),
+        func.coalesce(func.sum(LineOfCredit.used_amount), 0),
+        func.coalesce(func.sum(LineOfCredit.outstanding_balance), 0),
+        func.coalesce(func.sum(LineOfCredit.total_paid), 0),
+    ).group_by(LineOfCredit.status, rep_key).all()
+    
+    PortfolioRollup.query.delete()
+    
+    now = datetime.utcnow()
+    if rows:
+        db.session.execute(db.insert(PortfolioRollup), [
+            {
+                'status': status or 'active',
+                'rep_id': rep_id,
+                'deal_count': deal_count,
+                'approved_amount': approved_amount,
+                'used_amount': used_amount,
+                'outstanding_balance': outstanding_balance,
+                'total_paid': total_paid,
+                'updated_at': now,
+            }
+            for status, rep_id, deal_count, approved_amount, used_amount, outstanding_balance, total_paid in rows
+        ])
+    
+    db.session.commit()
+    return len(rows)
+
+
+@memoize('portfolio_totals', tables=('portfolio_rollup',))
+def get_portfolio_totals(rep_id=None):
+    """
+    Sum rollup rows per status
+
+    Args:
+        rep_id: Limit totals to one rep's deals (None for the whole book)
+
+    Returns:
+        Dict of status -> dict with 'deal_count' and the summed amount fields
+    """
+    query = db.session.query(
+        PortfolioRollup.status,
+        func.sum(PortfolioRollup.deal_count),
+        *[func.sum(getattr(PortfolioRollup, field)) for field in ROLLUP_FIELDS]
+    )
+    if rep_id is not None:
+        query = query.filter(PortfolioRollup.rep_id == rep_id)
+    
+    totals = {}
+    for row in query.group_by(PortfolioRollup.status).all():
+        totals[row[0]] = {'deal_count': row[1] or 0}
+        for field, value in zip(ROLLUP_FIELDS, row[2:]):
+            totals[row[0]][field] = value or 0
+    
+    return totals
+
+
+def empty_totals():
+    """Zeroed totals for a status with no deals"""
+    return {'deal_count': 0, **{field: 0 for field in ROLLUP_FIELDS}}
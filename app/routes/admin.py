@@ -1,16 +1,82 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, session
+from flask import Blueprint, render_template, redirect, url_for, flash, request, session, current_app, Response, stream_with_context, abort
 from flask_login import login_required, current_user
-from app.models import Application, User, Customer, LineOfCredit, ActivityLog, WithdrawalRequest
-from app.forms import CreateUserForm, LineOfCreditForm, AssignRepForm, CustomerPasswordForm, ChangeCustomerPasswordForm, UpdateDealStatusForm, ApplicationForm, RecordPaymentForm
+from app.models import Application, User, Customer, LineOfCredit, ActivityLog, WithdrawalRequest, Payment, ApplicationMatchKey, PaymentScheduleEntry, DelinquencyStatus
+from app.forms import CreateUserForm, LineOfCreditForm, AssignRepForm, CustomerPasswordForm, ChangeCustomerPasswordForm, UpdateDealStatusForm, ApplicationForm, RecordPaymentForm, ImportApplicationsForm, PostPaymentsForm, BulkReviewForm
 from app import db
 from datetime import datetime
 from functools import wraps
-import secrets
-import string
+import csv
+import os
 from app.utils import log_activity
+from app.stats import get_dashboard_stats, get_report_summary, get_collections_in_range
+from app.pagination import paginate_request
+from app.eager import deal_list_options, customer_list_options, withdrawal_list_options, activity_log_list_options, payment_list_options
+from app.instrumentation import query_budget, perf_stats, HISTOGRAM_BUCKETS_MS
+from app.cache import cache_stats
+from app.db_pool import pool_stats, pool_status
+from app.worker_stats import read_worker_stats
+from app.search import search as search_records, typeahead, MIN_QUERY_LENGTH
+from app.portfolio import portfolio_snapshot, update_portfolio_rollup
+from app.application_import import import_uploaded_file
+from app.payment_posting import post_uploaded_file
+from app.duplicates import find_duplicates, index_application, MATCH_LABELS
+from app.underwriting import score_application
+from app.schedule import schedule_terms, regenerate_schedule, get_schedule_status
+from app.delinquency import get_late_deals, get_delinquency_summary
+from app.balances import BalanceConflict, apply_payment, approve_withdrawal_request, deny_withdrawal_request, review_withdrawals
+from app.application_review import review_applications, generate_customer_password
+from app.exports import (EXPORTS, EXPORT_FORMATS, stream_export, stream_rows, parse_date_range,
+                         filter_activity_logs, activity_log_export_statement, payment_export_statement)
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+# Sort options for the paginated list views: name -> (column, label)
+APPLICATION_SORTS = {
+    'submitted_at': (Application.submitted_at, 'Submitted'),
+    'business_name': (Application.business_name, 'Business Name'),
+    'risk_score': (Application.risk_score, 'Risk Score'),
+}
+DEAL_SORTS = {
+    'created_at': (LineOfCredit.created_at, 'Created'),
+    'approved_amount': (LineOfCredit.approved_amount, 'Approved Amount'),
+}
+CUSTOMER_SORTS = {
+    'created_at': (Customer.created_at, 'Created'),
+    'business_name': (Customer.business_name, 'Business Name'),
+}
+USER_SORTS = {
+    'created_at': (User.created_at, 'Created'),
+    'username': (User.username, 'Username'),
+}
+WITHDRAWAL_SORTS = {
+    'created_at': (WithdrawalRequest.created_at, 'Requested'),
+    'requested_amount': (WithdrawalRequest.requested_amount, 'Amount'),
+}
+
+
+def paginate_list(query, sorts, default_sort, id_column):
+    """Keyset-paginate a list view and build its sort dropdown options"""
+    page = paginate_request(query, {name: column for name, (column, _) in sorts.items()}, default_sort, id_column)
+    sort_options = [(name, label) for name, (_, label) in sorts.items()]
+    return page, sort_options
+
+
+def export_format():
+    """Export format requested in the query string (csv or jsonl)"""
+    fmt = request.args.get('format', 'csv')
+    return fmt if fmt in EXPORT_FORMATS else 'csv'
+
+
+def export_response(chunks, name, fmt):
+    """Stream export chunks as a file download"""
+    filename = f'{name}_{datetime.utcnow().strftime("%Y%m%d")}.{fmt}'
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
 
 def admin_required(f):
     @wraps(f)
@@ -25,49 +91,118 @@ def admin_required(f):
 @bp.route('/dashboard')
 @login_required
 @admin_required
+@query_budget(8)
 def dashboard():
     """Admin dashboard - overview of applications and deals"""
-    pending_applications = Application.query.filter_by(status='pending').order_by(Application.submitted_at.desc()).all()
-    approved_applications = Application.query.filter_by(status='approved').order_by(Application.reviewed_at.desc()).limit(10).all()
-    
-    total_applications = Application.query.count()
-    pending_count = Application.query.filter_by(status='pending').count()
-    approved_count = Application.query.filter_by(status='approved').count()
-    rejected_count = Application.query.filter_by(status='rejected').count()
+    pending_applications = Application.query.filter_by(status='pending').order_by(Application.submitted_at.desc()).limit(5).all()
     
-    active_deals = LineOfCredit.query.filter_by(status='active').count()
-    total_credit_issued = db.session.query(db.func.sum(LineOfCredit.approved_amount)).filter_by(status='active').scalar() or 0
+    stats = get_dashboard_stats()
     
-    pending_withdrawals = WithdrawalRequest.query.filter_by(status='pending').count()
-    
-    reps = User.query.filter_by(role='rep', is_active=True).all()
+    # Late deals from the last delinquency scan
+    late_deals = get_late_deals()
+    delinquency = get_delinquency_summary()
     
     return render_template('admin/dashboard.html',
                          pending_applications=pending_applications,
-                         approved_applications=approved_applications,
-                         total_applications=total_applications,
-                         pending_count=pending_count,
-                         approved_count=approved_count,
-                         rejected_count=rejected_count,
-                         active_deals=active_deals,
-                         total_credit_issued=total_credit_issued,
-                         pending_withdrawals=pending_withdrawals,
-                         reps=reps)
+                         late_deals=late_deals,
+                         delinquency=delinquency,
+                         **stats)
+
+
+@bp.route('/search')
+@login_required
+@admin_required
+@query_budget(6)
+def search():
+    """Search applications, customers and deals by name, email, EIN, phone or number"""
+    query = request.args.get('q', '').strip()
+    results = search_records(query)
+    
+    return render_template('admin/search.html', query=query, min_length=MIN_QUERY_LENGTH, **results)
+
+
+@bp.route('/search/typeahead')
+@login_required
+@admin_required
+@query_budget(6)
+def search_typeahead():
+    """Search suggestions for the navbar search box, as JSON"""
+    query = request.args.get('q', '').strip()
+    return {'query': query, 'results': typeahead(query)}
 
 
 @bp.route('/applications')
 @login_required
 @admin_required
+@query_budget(4)
 def applications():
     """View all applications"""
     status_filter = request.args.get('status', 'all')
     
-    if status_filter == 'all':
-        applications = Application.query.order_by(Application.submitted_at.desc()).all()
-    else:
-        applications = Application.query.filter_by(status=status_filter).order_by(Application.submitted_at.desc()).all()
+    query = Application.query
+    if status_filter != 'all':
+        query = query.filter_by(status=status_filter)
+    
+    page, sort_options = paginate_list(query, APPLICATION_SORTS, 'submitted_at', Application.id)
+    
+    return render_template('admin/applications.html', applications=page, page=page,
+                         sort_options=sort_options, status_filter=status_filter,
+                         bulk_form=BulkReviewForm())
+
+
+@bp.route('/applications/bulk', methods=['POST'])
+@login_required
+@admin_required
+def bulk_review_applications():
+    """Approve or reject the selected applications in one transaction"""
+    form = BulkReviewForm()
+    ids = request.form.getlist('ids', type=int)
+    
+    if not form.validate_on_submit() or not ids:
+        flash('Select at least one application.', 'warning')
+        return redirect(url_for('admin.applications', status='pending'))
+    
+    try:
+        results = review_applications(ids, form.approve.data, current_user)
+        db.session.commit()
+    except BalanceConflict as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+        return redirect(url_for('admin.applications', status='pending'))
+    
+    return render_template('admin/bulk_review_results.html', results=results, title='Applications',
+                         back_url=url_for('admin.applications', status='pending'))
+
+
+@bp.route('/applications/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_applications():
+    """Bulk import applications from an uploaded CSV or JSON lines file"""
+    form = ImportApplicationsForm()
+    result = None
     
-    return render_template('admin/applications.html', applications=applications, status_filter=status_filter)
+    if form.validate_on_submit():
+        try:
+            result = import_uploaded_file(form.file.data, user_id=current_user.id)
+            flash(f'Imported {result.imported} applications. {result.rejected} rows were rejected.',
+                  'success' if not result.rejected else 'warning')
+        except (UnicodeDecodeError, csv.Error) as e:
+            db.session.rollback()
+            flash(f'Could not read the file: {str(e)}', 'error')
+    
+    return render_template('admin/import_applications.html', form=form, result=result)
+
+
+@bp.route('/export/<name>')
+@login_required
+@admin_required
+def export_data(name):
+    """Stream a full table export as CSV or JSON lines"""
+    if name not in EXPORTS:
+        abort(404)
+    fmt = export_format()
+    return export_response(stream_export(EXPORTS[name](), fmt), name, fmt)
 
 
 @bp.route('/application/<int:id>')
@@ -77,11 +212,8 @@ def view_application(id):
     """View detailed application"""
     application = Application.query.get_or_404(id)
     
-    # Check for duplicate applications from same email
-    duplicate_applications = Application.query.filter(
-        Application.owner_email == application.owner_email,
-        Application.id != application.id
-    ).all()
+    # Applications sharing an email, EIN, phone, SSN + DOB, business name or address
+    duplicate_applications = find_duplicates(application.id)
     
     # Check if customer already exists with this email
     existing_customer = Customer.query.filter_by(email=application.owner_email).first()
@@ -89,6 +221,7 @@ def view_application(id):
     return render_template('admin/view_application.html', 
                          application=application,
                          duplicate_applications=duplicate_applications,
+                         match_labels=MATCH_LABELS,
                          existing_customer=existing_customer)
 
 
@@ -121,8 +254,7 @@ def approve_application(id):
     application.reviewed_at = datetime.utcnow()
     
     # Generate a secure random password
-    alphabet = string.ascii_letters + string.digits
-    generated_password = ''.join(secrets.choice(alphabet) for i in range(12))
+    generated_password = generate_customer_password()
     
     # Create new customer account
     customer = Customer(
@@ -137,7 +269,7 @@ def approve_application(id):
     customer.set_password(generated_password)
     
     db.session.add(customer)
-    db.session.commit()
+    db.session.flush()
     
     # Log activity
     log_activity(
@@ -147,6 +279,8 @@ def approve_application(id):
         customer_id=customer.id
     )
     
+    db.session.commit()
+    
     # Store password in session to show on next page
     session['new_customer_password'] = generated_password
     session['new_customer_email'] = application.owner_email
@@ -227,7 +361,8 @@ def edit_application(id):
         application.has_previous_mca = form.has_previous_mca.data
         application.previous_mca_details = form.previous_mca_details.data
         
-        db.session.commit()
+        index_application(application)
+        score_application(application)
         
         # Log activity
         log_activity(
@@ -237,6 +372,8 @@ def edit_application(id):
             application_id=application.id
         )
         
+        db.session.commit()
+        
         flash(f'Application for {application.business_name} updated successfully.', 'success')
         return redirect(url_for('admin.view_application', id=application.id))
     
@@ -261,21 +398,23 @@ def delete_application(id):
         return redirect(url_for('admin.view_application', id=id))
     
     try:
-        # Delete related activity logs first
+        # Delete related activity logs and duplicate-detection keys first
         ActivityLog.query.filter_by(application_id=application.id).delete()
+        ApplicationMatchKey.query.filter_by(application_id=application.id).delete()
         db.session.flush()
         
         # Delete the application
         db.session.delete(application)
-        db.session.commit()
         
-        # Log the deletion after successful commit (with no application_id since we deleted it)
+        # Log the deletion in the same transaction (with no application_id since we deleted it)
         log_activity(
             action_type='delete_application',
             description=f'Deleted application #{app_id} for {business_name}',
             user_id=current_user.id
         )
         
+        db.session.commit()
+        
         flash(f'Application for {business_name} has been deleted.', 'info')
         return redirect(url_for('admin.applications'))
     except Exception as e:
@@ -287,16 +426,22 @@ def delete_application(id):
 @bp.route('/deals')
 @login_required
 @admin_required
+@query_budget(4)
 def deals():
     """View all deals (lines of credit)"""
     status_filter = request.args.get('status', 'all')
+    rep_filter = request.args.get('rep', type=int)
     
-    if status_filter == 'all':
-        lines_of_credit = LineOfCredit.query.order_by(LineOfCredit.created_at.desc()).all()
-    else:
-        lines_of_credit = LineOfCredit.query.filter_by(status=status_filter).order_by(LineOfCredit.created_at.desc()).all()
+    query = LineOfCredit.query.options(*deal_list_options())
+    if status_filter != 'all':
+        query = query.filter_by(status=status_filter)
+    if rep_filter is not None:
+        query = query.filter_by(rep_id=rep_filter or None)
     
-    return render_template('admin/deals.html', lines_of_credit=lines_of_credit, status_filter=status_filter)
+    page, sort_options = paginate_list(query, DEAL_SORTS, 'created_at', LineOfCredit.id)
+    
+    return render_template('admin/deals.html', lines_of_credit=page, page=page,
+                         sort_options=sort_options, status_filter=status_filter)
 
 
 @bp.route('/deal/<int:id>')
@@ -312,36 +457,15 @@ def view_deal(id):
         action_type='payment_recorded'
     ).order_by(ActivityLog.created_at.desc()).all()
     
-    # Calculate metrics
-    from datetime import date, timedelta
-    
     # Days since last payment
+    from datetime import date
     days_since_payment = None
     if loc.last_payment_date:
         days_since_payment = (date.today() - loc.last_payment_date).days
     
-    # Calculate expected number of payments
-    expected_payments = 0
-    if loc.first_payment_date and loc.payment_frequency:
-        days_since_start = (date.today() - loc.first_payment_date).days
-        if days_since_start >= 0:  # Only calculate if first payment date has passed
-            if loc.payment_frequency == 'Daily':
-                expected_payments = max(0, days_since_start)
-            elif loc.payment_frequency == 'Weekly':
-                expected_payments = max(0, days_since_start // 7)
-            elif loc.payment_frequency == 'Monthly':
-                expected_payments = max(0, days_since_start // 30)
-    
-    # Payment compliance - calculate how ahead or behind customer is
-    payment_ahead_behind = loc.number_of_payments_made - expected_payments
-    
-    # Calculate total expected from used amount
-    total_expected = loc.used_amount
-    if loc.factor_rate:
-        total_expected = loc.used_amount * loc.factor_rate
-    elif loc.interest_rate and loc.term_months:
-        # Simple interest calculation
-        total_expected = loc.used_amount * (1 + (loc.interest_rate / 100) * (loc.term_months / 12))
+    # Expected vs. actual payments from the stored payment schedule
+    schedule_status = get_schedule_status(loc)
+    total_expected = schedule_status['total_expected']
     
     # Remaining balance percentage
     balance_percentage = (loc.outstanding_balance / total_expected * 100) if total_expected > 0 else 0
@@ -350,8 +474,9 @@ def view_deal(id):
                          loc=loc, 
                          payment_logs=payment_logs,
                          days_since_payment=days_since_payment,
-                         expected_payments=expected_payments,
-                         payment_ahead_behind=payment_ahead_behind,
+                         expected_payments=schedule_status['expected_payments'],
+                         payment_ahead_behind=schedule_status['payments_ahead_behind'],
+                         next_due_date=schedule_status['next_due_date'],
                          total_expected=total_expected,
                          balance_percentage=balance_percentage)
 
@@ -370,39 +495,44 @@ def record_payment(id):
         payment_method = form.payment_method.data
         notes = form.notes.data or ''
         
-        # Ensure outstanding_balance is set
-        if loc.outstanding_balance is None:
-            loc.outstanding_balance = 0.0
-        
-        # Validate payment amount doesn't exceed outstanding balance
-        if loc.outstanding_balance > 0 and payment_amount > loc.outstanding_balance:
-            flash(f'Payment amount ${payment_amount:,.2f} exceeds outstanding balance ${loc.outstanding_balance:,.2f}', 'error')
+        # Update line of credit financials atomically (the balance check runs in the same UPDATE)
+        try:
+            paid_off = apply_payment(loc, payment_amount, payment_date)
+        except BalanceConflict as e:
+            db.session.rollback()
+            flash(str(e), 'error')
             return render_template('admin/record_payment.html', form=form, loc=loc)
         
-        # Update line of credit financials
-        loc.total_paid += payment_amount
-        loc.outstanding_balance -= payment_amount
-        loc.number_of_payments_made += 1
-        loc.last_payment_date = payment_date
-        loc.updated_at = datetime.utcnow()
-        
-        # Check if fully paid off
-        if loc.outstanding_balance <= 0:
-            loc.outstanding_balance = 0
-            loc.status = 'paid_off'
+        if paid_off:
             flash(f'🎉 Line of credit fully paid off!', 'success')
         
-        db.session.commit()
+        # Record the payment in the ledger
+        payment = Payment(
+            line_of_credit_id=loc.id,
+            customer_id=loc.customer_id,
+            amount=payment_amount,
+            payment_date=payment_date,
+            method=payment_method,
+            notes=notes or None,
+            recorded_by_id=current_user.id
+        )
+        db.session.add(payment)
         
-        # Log activity with detailed payment info
-        log_activity(
+        # Log activity with detailed payment info (written directly so the payment can link to it)
+        log = log_activity(
             action_type='payment_recorded',
             description=f'Payment of ${payment_amount:,.2f} recorded via {payment_method} on {payment_date.strftime("%m/%d/%Y")} by {current_user.username}. {notes}',
             user_id=current_user.id,
             customer_id=loc.customer_id,
             line_of_credit_id=loc.id,
-            metadata={"amount": payment_amount, "method": payment_method, "date": payment_date.isoformat()}
+            metadata={"amount": payment_amount, "method": payment_method, "date": payment_date.isoformat()},
+            buffered=False
         )
+        db.session.flush()
+        
+        # Link the ledger row to its log entry so the backfill skips it
+        payment.activity_log_id = log.id
+        db.session.commit()
         
         flash(f'Payment of ${payment_amount:,.2f} recorded successfully!', 'success')
         return redirect(url_for('admin.view_deal', id=loc.id))
@@ -410,6 +540,28 @@ def record_payment(id):
     return render_template('admin/record_payment.html', form=form, loc=loc)
 
 
+@bp.route('/payments/post', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def post_payments():
+    """Post a bank remittance file (CSV or NACHA) of collected payments in one transaction"""
+    form = PostPaymentsForm()
+    result = None
+    
+    if form.validate_on_submit():
+        try:
+            result = post_uploaded_file(form.file.data, user_id=current_user.id, dry_run=form.dry_run.data)
+            verb = 'Would post' if result.dry_run else 'Posted'
+            flash(f'{verb} {result.posted} payments totaling ${result.total_amount:,.2f}. '
+                  f'{result.rejected} rows were rejected, {len(result.paid_off)} deals paid off.',
+                  'success' if not result.rejected else 'warning')
+        except (UnicodeDecodeError, csv.Error) as e:
+            db.session.rollback()
+            flash(f'Could not read the file: {str(e)}', 'error')
+    
+    return render_template('admin/post_payments.html', form=form, result=result)
+
+
 @bp.route('/deal/<int:id>/mark-paid-off', methods=['POST'])
 @login_required
 @admin_required
@@ -421,11 +573,11 @@ def mark_paid_off(id):
         flash('This deal is already marked as paid off.', 'info')
         return redirect(url_for('admin.view_deal', id=loc.id))
     
+    before = portfolio_snapshot(loc)
     loc.status = 'paid_off'
     loc.outstanding_balance = 0
     loc.updated_at = datetime.utcnow()
-    
-    db.session.commit()
+    update_portfolio_rollup(before, portfolio_snapshot(loc))
     
     # Log activity
     log_activity(
@@ -436,6 +588,8 @@ def mark_paid_off(id):
         line_of_credit_id=loc.id
     )
     
+    db.session.commit()
+    
     flash(f'🎉 Deal marked as paid off!', 'success')
     return redirect(url_for('admin.view_deal', id=loc.id))
 
@@ -470,6 +624,9 @@ def create_line_of_credit(customer_id):
         loc.outstanding_balance = loc.used_amount
         
         db.session.add(loc)
+        db.session.flush()
+        update_portfolio_rollup(None, portfolio_snapshot(loc))
+        regenerate_schedule(loc)
         db.session.commit()
         
         flash(f'Line of credit created for {customer.business_name}!', 'success')
@@ -487,6 +644,8 @@ def edit_line_of_credit(id):
     form = LineOfCreditForm(obj=loc)
     
     if form.validate_on_submit():
+        before = portfolio_snapshot(loc)
+        terms_before = schedule_terms(loc)
         loc.approved_amount = form.approved_amount.data
         loc.used_amount = form.used_amount.data
         loc.interest_rate = form.interest_rate.data
@@ -501,6 +660,11 @@ def edit_line_of_credit(id):
         
         loc.calculate_available_amount()
         loc.updated_at = datetime.utcnow()
+        update_portfolio_rollup(before, portfolio_snapshot(loc))
+        
+        # Only a change of terms invalidates the stored schedule
+        if schedule_terms(loc) != terms_before:
+            regenerate_schedule(loc)
         
         db.session.commit()
         
@@ -523,6 +687,7 @@ def assign_rep(id):
     form.rep_id.choices = [(0, 'Unassigned')] + [(rep.id, f"{rep.first_name} {rep.last_name} ({rep.username})") for rep in reps]
     
     if form.validate_on_submit():
+        before = portfolio_snapshot(loc)
         if form.rep_id.data == 0:
             loc.rep_id = None
             flash('Rep unassigned from deal.', 'info')
@@ -531,6 +696,7 @@ def assign_rep(id):
             rep = User.query.get(form.rep_id.data)
             flash(f'Deal assigned to {rep.first_name} {rep.last_name}!', 'success')
         
+        update_portfolio_rollup(before, portfolio_snapshot(loc))
         db.session.commit()
         return redirect(url_for('admin.view_deal', id=loc.id))
     
@@ -559,7 +725,13 @@ def delete_deal(id):
         line_of_credit_id=loc.id
     )
     
+    # Delete payments and the payment schedule of the line of credit
+    Payment.query.filter_by(line_of_credit_id=loc.id).delete()
+    PaymentScheduleEntry.query.filter_by(line_of_credit_id=loc.id).delete()
+    DelinquencyStatus.query.filter_by(line_of_credit_id=loc.id).delete()
+    
     # First delete the line of credit
+    update_portfolio_rollup(portfolio_snapshot(loc), None)
     db.session.delete(loc)
     db.session.flush()  # Flush to database but don't commit yet
     
@@ -584,7 +756,9 @@ def update_deal_status(id):
     
     if form.validate_on_submit():
         old_status = loc.status
+        before = portfolio_snapshot(loc)
         loc.status = form.status.data
+        update_portfolio_rollup(before, portfolio_snapshot(loc))
         
         # Log the status change
         log_activity(
@@ -607,10 +781,19 @@ def update_deal_status(id):
 @bp.route('/users')
 @login_required
 @admin_required
+@query_budget(4)
 def users():
     """View all users (admins and reps)"""
-    all_users = User.query.order_by(User.created_at.desc()).all()
-    return render_template('admin/users.html', users=all_users)
+    role_filter = request.args.get('role', 'all')
+    
+    query = User.query
+    if role_filter != 'all':
+        query = query.filter_by(role=role_filter)
+    
+    page, sort_options = paginate_list(query, USER_SORTS, 'created_at', User.id)
+    
+    return render_template('admin/users.html', users=page, page=page,
+                         sort_options=sort_options, role_filter=role_filter)
 
 
 @bp.route('/users/create', methods=['GET', 'POST'])
@@ -689,10 +872,19 @@ def toggle_user_active(id):
 @bp.route('/customers')
 @login_required
 @admin_required
+@query_budget(4)
 def customers():
     """View all customers"""
-    all_customers = Customer.query.order_by(Customer.created_at.desc()).all()
-    return render_template('admin/customers.html', customers=all_customers)
+    active_filter = request.args.get('active', 'all')
+    
+    query = Customer.query.options(*customer_list_options())
+    if active_filter != 'all':
+        query = query.filter_by(is_active=(active_filter == 'yes'))
+    
+    page, sort_options = paginate_list(query, CUSTOMER_SORTS, 'created_at', Customer.id)
+    
+    return render_template('admin/customers.html', customers=page, page=page,
+                         sort_options=sort_options, active_filter=active_filter)
 
 
 @bp.route('/customers/<int:id>/delete', methods=['POST'])
@@ -713,13 +905,19 @@ def delete_customer(id):
             WithdrawalRequest.query.filter_by(line_of_credit_id=loc.id).delete()
         WithdrawalRequest.query.filter_by(customer_id=customer.id).delete()
         
-        # 2. Delete activity logs
+        # 2. Delete payments, the payment schedule and activity logs
+        if loc:
+            Payment.query.filter_by(line_of_credit_id=loc.id).delete()
+            PaymentScheduleEntry.query.filter_by(line_of_credit_id=loc.id).delete()
+            DelinquencyStatus.query.filter_by(line_of_credit_id=loc.id).delete()
+        Payment.query.filter_by(customer_id=customer.id).delete()
         ActivityLog.query.filter_by(customer_id=customer.id).delete()
         if loc:
             ActivityLog.query.filter_by(line_of_credit_id=loc.id).delete()
         
         # 3. Delete the line of credit itself (must be before customer)
         if loc:
+            update_portfolio_rollup(portfolio_snapshot(loc), None)
             db.session.delete(loc)
         
         # 4. Finally delete the customer
@@ -746,13 +944,11 @@ def view_customer_password(id):
     # Generate a new random password if requested
     generated_password = None
     if request.args.get('generate') == 'true':
-        alphabet = string.ascii_letters + string.digits
-        generated_password = ''.join(secrets.choice(alphabet) for i in range(12))
+        generated_password = generate_customer_password()
         flash(f'New password generated: {generated_password}', 'info')
     
     if form.validate_on_submit():
         customer.set_password(form.new_password.data)
-        db.session.commit()
         
         # Log activity
         log_activity(
@@ -761,6 +957,8 @@ def view_customer_password(id):
             customer_id=customer.id
         )
         
+        db.session.commit()
+        
         flash(f'Password changed successfully for {customer.business_name}!', 'success')
         return redirect(url_for('admin.customers'))
     
@@ -770,40 +968,79 @@ def view_customer_password(id):
 @bp.route('/activity-logs')
 @login_required
 @admin_required
+@query_budget(4)
 def activity_logs():
     """View all activity logs"""
-    page = request.args.get('page', 1, type=int)
     action_type_filter = request.args.get('type', 'all')
+    start, end = parse_date_range(request.args)
     
-    query = ActivityLog.query
+    query = ActivityLog.query.options(*activity_log_list_options())
+    query = filter_activity_logs(query, action_type_filter, start, end)
     
-    if action_type_filter != 'all':
-        query = query.filter_by(action_type=action_type_filter)
-    
-    logs = query.order_by(ActivityLog.created_at.desc()).paginate(page=page, per_page=50, error_out=False)
+    logs = paginate_request(query, {'created_at': ActivityLog.created_at}, 'created_at', ActivityLog.id)
     
     # Get unique action types for filter
     action_types = db.session.query(ActivityLog.action_type).distinct().all()
     action_types = [at[0] for at in action_types]
     
-    return render_template('admin/activity_logs.html', logs=logs, action_types=action_types, action_type_filter=action_type_filter)
+    return render_template('admin/activity_logs.html', logs=logs, page=logs, action_types=action_types,
+                         action_type_filter=action_type_filter, start=start, end=end)
+
+
+@bp.route('/activity-logs/export')
+@login_required
+@admin_required
+def export_activity_logs():
+    """Stream the activity log history with the same type/start/end filters as the list page"""
+    fmt = export_format()
+    start, end = parse_date_range(request.args)
+    statement = activity_log_export_statement(request.args.get('type', 'all'), start, end)
+    return export_response(stream_export(statement, fmt), 'activity_logs', fmt)
 
 
 @bp.route('/withdrawal-requests')
 @login_required
 @admin_required
+@query_budget(4)
 def withdrawal_requests():
     """View all pending withdrawal requests"""
     status_filter = request.args.get('status', 'pending')
     
-    query = WithdrawalRequest.query
+    query = WithdrawalRequest.query.options(*withdrawal_list_options())
     
     if status_filter != 'all':
         query = query.filter_by(status=status_filter)
     
-    requests = query.order_by(WithdrawalRequest.created_at.desc()).all()
+    page, sort_options = paginate_list(query, WITHDRAWAL_SORTS, 'created_at', WithdrawalRequest.id)
     
-    return render_template('admin/withdrawal_requests.html', requests=requests, status_filter=status_filter)
+    return render_template('admin/withdrawal_requests.html', requests=page, page=page,
+                         sort_options=sort_options, status_filter=status_filter,
+                         bulk_form=BulkReviewForm())
+
+
+@bp.route('/withdrawal-requests/bulk', methods=['POST'])
+@login_required
+@admin_required
+def bulk_review_withdrawals():
+    """Approve or deny the selected withdrawal requests in one transaction"""
+    form = BulkReviewForm()
+    ids = request.form.getlist('ids', type=int)
+    
+    if not form.validate_on_submit() or not ids:
+        flash('Select at least one withdrawal request.', 'warning')
+        return redirect(url_for('admin.withdrawal_requests'))
+    
+    try:
+        results = review_withdrawals(ids, form.approve.data, current_user,
+                                     reason=form.reason.data or 'No reason provided')
+        db.session.commit()
+    except BalanceConflict as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+        return redirect(url_for('admin.withdrawal_requests'))
+    
+    return render_template('admin/bulk_review_results.html', results=results, title='Withdrawal Requests',
+                         back_url=url_for('admin.withdrawal_requests'))
 
 
 @bp.route('/withdrawal-request/<int:id>/approve', methods=['POST'])
@@ -817,26 +1054,15 @@ def approve_withdrawal(id):
         flash('This withdrawal request has already been processed.', 'warning')
         return redirect(url_for('admin.withdrawal_requests'))
     
-    # Update line of credit used amount
-    loc = withdrawal.line_of_credit
-    loc.used_amount += withdrawal.requested_amount
-    loc.calculate_available_amount()
-    
-    # Update withdrawal request
-    withdrawal.status = 'approved'
-    withdrawal.reviewed_by_id = current_user.id
-    withdrawal.reviewed_at = datetime.utcnow()
+    try:
+        approve_withdrawal_request(withdrawal, current_user)
+    except BalanceConflict as e:
+        db.session.rollback()
+        flash(f'Withdrawal request could not be approved: {e}', 'error')
+        return redirect(url_for('admin.withdrawal_requests'))
     
     db.session.commit()
     
-    # Log activity
-    log_activity(
-        action_type='withdrawal_approved',
-        description=f'Withdrawal request #{withdrawal.id} for ${withdrawal.requested_amount:,.2f} approved by {current_user.username}',
-        customer_id=withdrawal.customer_id,
-        line_of_credit_id=withdrawal.line_of_credit_id
-    )
-    
     flash(f'Withdrawal request for ${withdrawal.requested_amount:,.2f} approved! Customer has been notified.', 'success')
     return redirect(url_for('admin.withdrawal_requests'))
 
@@ -854,21 +1080,15 @@ def deny_withdrawal(id):
     
     reason = request.form.get('reason', 'No reason provided')
     
-    withdrawal.status = 'denied'
-    withdrawal.reviewed_by_id = current_user.id
-    withdrawal.reviewed_at = datetime.utcnow()
-    withdrawal.denial_reason = reason
+    try:
+        deny_withdrawal_request(withdrawal, current_user, reason)
+    except BalanceConflict as e:
+        db.session.rollback()
+        flash(str(e), 'warning')
+        return redirect(url_for('admin.withdrawal_requests'))
     
     db.session.commit()
     
-    # Log activity
-    log_activity(
-        action_type='withdrawal_denied',
-        description=f'Withdrawal request #{withdrawal.id} for ${withdrawal.requested_amount:,.2f} denied by {current_user.username}. Reason: {reason}',
-        customer_id=withdrawal.customer_id,
-        line_of_credit_id=withdrawal.line_of_credit_id
-    )
-    
     flash(f'Withdrawal request denied.', 'info')
     return redirect(url_for('admin.withdrawal_requests'))
 
@@ -876,75 +1096,83 @@ def deny_withdrawal(id):
 @bp.route('/reports')
 @login_required
 @admin_required
+@query_budget(8)
 def reports():
     """Financial summary reports"""
-    from datetime import date, timedelta
-    from sqlalchemy import func
-    
-    # Get all active lines of credit
-    active_locs = LineOfCredit.query.filter_by(status='active').all()
-    
-    # Calculate totals
-    total_outstanding = sum(loc.outstanding_balance for loc in active_locs)
-    total_credit_issued = sum(loc.approved_amount for loc in active_locs)
-    total_credit_used = sum(loc.used_amount for loc in active_locs)
-    total_collected = db.session.query(func.sum(LineOfCredit.total_paid)).scalar() or 0
-    
-    # Calculate averages
-    all_locs = LineOfCredit.query.all()
-    avg_deal_size = (sum(loc.approved_amount for loc in all_locs) / len(all_locs)) if all_locs else 0
-    
-    # Get payment activity
-    payment_logs = ActivityLog.query.filter_by(action_type='payment_recorded').all()
-    payment_amounts = [float(log.extra_data.split('"amount": ')[1].split(',')[0]) 
-                      for log in payment_logs if '"amount":' in log.extra_data]
-    avg_payment = (sum(payment_amounts) / len(payment_amounts)) if payment_amounts else 0
-    
-    # This month's collections
-    first_day_of_month = date.today().replace(day=1)
-    monthly_payments = ActivityLog.query.filter(
-        ActivityLog.action_type == 'payment_recorded',
-        ActivityLog.created_at >= first_day_of_month
-    ).all()
-    this_month_collected = sum(float(log.extra_data.split('"amount": ')[1].split(',')[0]) 
-                               for log in monthly_payments if '"amount":' in log.extra_data)
-    
-    # This year's collections
-    first_day_of_year = date.today().replace(month=1, day=1)
-    yearly_payments = ActivityLog.query.filter(
-        ActivityLog.action_type == 'payment_recorded',
-        ActivityLog.created_at >= first_day_of_year
-    ).all()
-    this_year_collected = sum(float(log.extra_data.split('"amount": ')[1].split(',')[0]) 
-                              for log in yearly_payments if '"amount":' in log.extra_data)
-    
-    # Deal status breakdown
-    status_counts = {
-        'active': LineOfCredit.query.filter_by(status='active').count(),
-        'paid_off': LineOfCredit.query.filter_by(status='paid_off').count(),
-        'defaulted': LineOfCredit.query.filter_by(status='defaulted').count(),
-        'suspended': LineOfCredit.query.filter_by(status='suspended').count()
-    }
+    summary = get_report_summary()
     
     # Top customers by outstanding balance
-    top_customers = sorted(active_locs, key=lambda x: x.outstanding_balance, reverse=True)[:10]
+    top_customers = LineOfCredit.query.options(*deal_list_options()).filter_by(status='active').order_by(
+        LineOfCredit.outstanding_balance.desc()
+    ).limit(10).all()
     
     # Recent payments
-    recent_payments = ActivityLog.query.filter_by(
-        action_type='payment_recorded'
-    ).order_by(ActivityLog.created_at.desc()).limit(20).all()
+    recent_payments = Payment.query.options(*payment_list_options()).order_by(
+        Payment.payment_date.desc(), Payment.id.desc()
+    ).limit(20).all()
     
     return render_template('admin/reports.html',
-                         total_outstanding=total_outstanding,
-                         total_credit_issued=total_credit_issued,
-                         total_credit_used=total_credit_used,
-                         total_collected=total_collected,
-                         avg_deal_size=avg_deal_size,
-                         avg_payment=avg_payment,
-                         this_month_collected=this_month_collected,
-                         this_year_collected=this_year_collected,
-                         status_counts=status_counts,
                          top_customers=top_customers,
                          recent_payments=recent_payments,
-                         active_deals_count=len(active_locs),
-                         total_deals_count=len(all_locs))
+                         **summary)
+
+
+@bp.route('/reports/export')
+@login_required
+@admin_required
+def export_reports():
+    """Download the report figures (dataset=summary) or the payments ledger (dataset=payments)"""
+    fmt = export_format()
+    start, end = parse_date_range(request.args)
+    
+    if request.args.get('dataset') == 'payments':
+        chunks = stream_export(payment_export_statement(start, end), fmt)
+        return export_response(chunks, 'payments', fmt)
+    
+    summary = get_report_summary()
+    status_counts = summary.pop('status_counts')
+    rows = list(summary.items())
+    rows += [(f'{status}_deals', count) for status, count in status_counts.items()]
+    if start or end:
+        in_range = get_collections_in_range(start, end)
+        rows += [
+            ('range_start', start),
+            ('range_end', end),
+            ('range_payment_count', in_range['payment_count']),
+            ('range_collected', in_range['collected']),
+        ]
+    
+    return export_response(stream_rows(['metric', 'value'], rows, fmt), 'report_summary', fmt)
+
+
+@bp.route('/perf')
+@login_required
+@admin_required
+def perf():
+    """Request timing and query counts per endpoint (this worker process only)"""
+    if request.args.get('reset') == 'true':
+        perf_stats.reset()
+        cache_stats.reset()
+        pool_stats.reset()
+        flash('Performance statistics reset.', 'info')
+        return redirect(url_for('admin.perf'))
+    
+    bucket_labels = [f'≤{bound}ms' for bound in HISTOGRAM_BUCKETS_MS] + [f'>{HISTOGRAM_BUCKETS_MS[-1]}ms']
+    
+    return render_template('admin/perf.html',
+                         endpoints=perf_stats.summary(),
+                         bucket_labels=bucket_labels,
+                         enabled=current_app.config.get('PERF_INSTRUMENTATION'),
+                         cache=cache_stats.summary(),
+                         cache_backend=current_app.config.get('CACHE_BACKEND'),
+                         pool=pool_status(),
+                         workers=read_worker_stats(),
+                         current_pid=os.getpid())
+
+
+@bp.route('/perf/pool')
+@login_required
+@admin_required
+def pool_stats_json():
+    """Connection pool settings, usage and checkout waits for this worker, as JSON"""
+    return pool_status()
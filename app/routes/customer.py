@@ -1,8 +1,11 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, session
-from app.models import Customer, LineOfCredit, WithdrawalRequest, ActivityLog
+from datetime import date
+from flask import Blueprint, render_template, redirect, url_for, flash, session, abort
+from app.models import Customer, LineOfCredit, WithdrawalRequest
 from app.forms import WithdrawalRequestForm
 from app import db
 from app.utils import log_activity
+from app.customer_summary import get_customer_summary
+from app.instrumentation import query_budget
 
 bp = Blueprint('customer', __name__, url_prefix='/customer')
 
@@ -20,35 +23,18 @@ def customer_login_required(f):
 
 @bp.route('/dashboard')
 @customer_login_required
+@query_budget(1)
 def dashboard():
-    """Customer dashboard - shows their line of credit details"""
-    customer_id = session.get('customer_id')
-    customer = Customer.query.get_or_404(customer_id)
-    
-    # Get line of credit
-    loc = customer.line_of_credit
+    """Customer dashboard - shows their line of credit details from the customer_summaries read model"""
+    summary = get_customer_summary(session.get('customer_id'))
+    if summary is None:
+        abort(404)
     
-    if not loc:
+    if not summary.has_line_of_credit:
         flash('You do not have an active line of credit.', 'info')
-        return render_template('customer/no_credit.html', customer=customer)
-    
-    # Calculate available credit
-    loc.calculate_available_amount()
-    
-    # Calculate utilization percentage
-    utilization_percentage = (loc.used_amount / loc.approved_amount * 100) if loc.approved_amount > 0 else 0
-    
-    # Get payment history
-    payment_logs = ActivityLog.query.filter_by(
-        line_of_credit_id=loc.id,
-        action_type='payment_recorded'
-    ).order_by(ActivityLog.created_at.desc()).limit(10).all()
+        return render_template('customer/no_credit.html', customer=summary)
     
-    return render_template('customer/dashboard.html',
-                         customer=customer,
-                         loc=loc,
-                         utilization_percentage=utilization_percentage,
-                         payment_logs=payment_logs)
+    return render_template('customer/dashboard.html', summary=summary, today=date.today())
 
 
 @bp.route('/details')
@@ -102,7 +88,6 @@ def request_withdrawal():
         )
         
         db.session.add(withdrawal)
-        db.session.commit()
         
         # Log activity
         log_activity(
@@ -112,6 +97,8 @@ def request_withdrawal():
             line_of_credit_id=loc.id
         )
         
+        db.session.commit()
+        
         flash(f'Withdrawal request for ${requested_amount:,.2f} submitted successfully! Your rep will review it shortly.', 'success')
         return redirect(url_for('customer.dashboard'))
     
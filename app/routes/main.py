@@ -2,11 +2,15 @@ from flask import Blueprint, render_template, redirect, url_for, flash
 from app.forms import ApplicationForm
 from app.models import Application
 from app import db
+from app.duplicates import index_application
+from app.underwriting import score_application
+from app.page_cache import cache_page
 
 bp = Blueprint('main', __name__)
 
 
 @bp.route('/')
+@cache_page
 def index():
     """Home page with application form"""
     return render_template('index.html')
@@ -72,7 +76,13 @@ def apply():
             status='pending'
         )
         
+        score_application(application)
+        
         db.session.add(application)
+        db.session.flush()
+        
+        # Duplicate-detection keys go in with the application
+        index_application(application)
         db.session.commit()
         
         flash('Your application has been submitted successfully! We will review it and contact you soon.', 'success')
@@ -82,6 +92,7 @@ def apply():
 
 
 @bp.route('/thank-you')
+@cache_page
 def thank_you():
     """Thank you page after application submission"""
     return render_template('thank_you.html')
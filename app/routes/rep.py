@@ -1,6 +1,10 @@
 from flask import Blueprint, render_template, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app.models import LineOfCredit, User
+from app.portfolio import get_portfolio_totals, empty_totals
+from app.eager import deal_list_options
+from app.delinquency import get_late_deals, get_delinquency_summary
+from app.instrumentation import query_budget
 from functools import wraps
 
 bp = Blueprint('rep', __name__, url_prefix='/rep')
@@ -19,21 +23,26 @@ def rep_required(f):
 @bp.route('/dashboard')
 @login_required
 @rep_required
+@query_budget(6)
 def dashboard():
     """Rep dashboard - shows only their assigned deals"""
     # Get all deals assigned to this rep
-    assigned_deals = LineOfCredit.query.filter_by(rep_id=current_user.id).order_by(LineOfCredit.created_at.desc()).all()
+    assigned_deals = LineOfCredit.query.options(*deal_list_options()).filter_by(rep_id=current_user.id).order_by(LineOfCredit.created_at.desc()).all()
     
-    # Calculate statistics
-    active_deals = [deal for deal in assigned_deals if deal.status == 'active']
-    total_credit_managed = sum(deal.approved_amount for deal in active_deals)
-    total_outstanding = sum(deal.outstanding_balance for deal in active_deals)
+    # Statistics from the portfolio rollup
+    active = get_portfolio_totals(rep_id=current_user.id).get('active', empty_totals())
+    
+    # Late deals from the last delinquency scan
+    late_deals = get_late_deals(rep_id=current_user.id)
+    delinquency = get_delinquency_summary(rep_id=current_user.id)
     
     return render_template('rep/dashboard.html',
                          assigned_deals=assigned_deals,
-                         active_count=len(active_deals),
-                         total_credit_managed=total_credit_managed,
-                         total_outstanding=total_outstanding)
+                         late_deals=late_deals,
+                         delinquency=delinquency,
+                         active_count=active['deal_count'],
+                         total_credit_managed=active['approved_amount'],
+                         total_outstanding=active['outstanding_balance'])
 
 
 @bp.route('/deal/<int:id>')
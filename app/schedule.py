@@ -0,0 +1,265 @@
+"""
+Payment schedule engine
+
+Generates the expected installments of a line of credit from its terms
+(frequency, payment amount, factor or interest rate, term and first payment
+date) and stores them in payment_schedule. Due dates fall on business days:
+weekends and Federal Reserve holidays (when ACH does not settle) roll forward
+to the next business day. Schedules are regenerated only when the terms
+change, so "how many payments are due by today" is one indexed lookup.
+"""
+import calendar
+from datetime import date, timedelta
+from app import db
+from app.models import LineOfCredit, PaymentScheduleEntry
+from app.customer_summary import mark_stale
+from sqlalchemy import func, case
+
+# Line of credit fields that determine the schedule
+SCHEDULE_TERMS = (
+    'payment_frequency', 'payment_amount', 'factor_rate', 'interest_rate',
+    'term_months', 'first_payment_date', 'maturity_date', 'used_amount',
+)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th weekday (0=Monday) of a month; n=-1 for the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def bank_holidays(year):
+    """
+    Federal Reserve holidays for a year
+
+    Fixed-date holidays falling on a Sunday are observed on Monday; the Fed
+    does not observe Saturday holidays on the Friday before.
+    """
+    fixed = [date(year, 1, 1), date(year, 6, 19), date(year, 7, 4), date(year, 11, 11), date(year, 12, 25)]
+    holidays = {day + timedelta(days=1) if day.weekday() == 6 else day for day in fixed}
+    holidays.update({
+        _nth_weekday(year, 1, 0, 3),   # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),   # Presidents Day
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _nth_weekday(year, 9, 0, 1),   # Labor Day
+        _nth_weekday(year, 10, 0, 2),  # Columbus Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+    })
+    return holidays
+
+
+_holiday_cache = {}
+
+
+def is_business_day(day):
+    if day.weekday() >= 5:
+        return False
+    if day.year not in _holiday_cache:
+        _holiday_cache[day.year] = bank_holidays(day.year)
+    return day not in _holiday_cache[day.year]
+
+
+def next_business_day(day):
+    """day itself if it is a business day, otherwise the next one"""
+    while not is_business_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def add_months(day, months):
+    """Same day n months later, clamped to the end of shorter months"""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def term_end_date(loc):
+    """Maturity date, or first payment date + term (exclusive end of the schedule)"""
+    if loc.maturity_date:
+        return loc.maturity_date + timedelta(days=1)
+    if loc.first_payment_date and loc.term_months:
+        return add_months(loc.first_payment_date, loc.term_months)
+    return None
+
+
+def due_dates(frequency, first_payment_date, end_date):
+    """
+    Business-day due dates from the first payment date up to (not including) end_date
+
+    Daily deals are due every business day; weekly and monthly due dates are
+    laid out on the calendar and rolled forward to a business day.
+    """
+    dates = []
+    if frequency == 'Daily':
+        day = next_business_day(first_payment_date)
+        while day < end_date:
+            dates.append(day)
+            day = next_business_day(day + timedelta(days=1))
+        return dates
+
+    step = 0
+    while True:
+        if frequency == 'Weekly':
+            nominal = first_payment_date + timedelta(weeks=step)
+        else:
+            nominal = add_months(first_payment_date, step)
+        if nominal >= end_date:
+            return dates
+        due = next_business_day(nominal)
+        if not dates or due > dates[-1]:
+            dates.append(due)
+        step += 1
+
+
+def total_repayable(loc):
+    """Total the customer owes on the drawn amount: factor rate if set, else simple interest over the term"""
+    used = loc.used_amount or 0
+    if loc.factor_rate:
+        return used * loc.factor_rate
+    if loc.interest_rate and loc.term_months:
+        return used * (1 + (loc.interest_rate / 100) * (loc.term_months / 12))
+    return used
+
+
+def generate_schedule(loc):
+    """
+    Compute a line of credit's installments without touching the database
+
+    Regular payments of payment_amount run until the total repayable is
+    reached (the last one is reduced to what is left). If the term ends
+    first, the remainder is added to the final installment. Without a
+    payment amount the total is split evenly.
+
+    Returns:
+        List of (installment_number, due_date, amount, cumulative_amount)
+    """
+    end_date = term_end_date(loc)
+    total = round(total_repayable(loc), 2)
+    if not loc.first_payment_date or not end_date or total <= 0:
+        return []
+
+    dates = due_dates(loc.payment_frequency, loc.first_payment_date, end_date)
+    if not dates:
+        return []
+
+    payment = loc.payment_amount if loc.payment_amount and loc.payment_amount > 0 else total / len(dates)
+
+    amounts = []
+    cumulative = 0.0
+    for _ in dates:
+        amount = round(min(payment, total - cumulative), 2)
+        if amount <= 0:
+            break
+        amounts.append(amount)
+        cumulative = round(cumulative + amount, 2)
+
+    # Balloon: whatever the regular payments don't cover is due with the last one
+    if cumulative < total:
+        amounts[-1] = round(amounts[-1] + total - cumulative, 2)
+
+    schedule = []
+    cumulative = 0.0
+    for number, (due, amount) in enumerate(zip(dates, amounts), start=1):
+        cumulative = round(cumulative + amount, 2)
+        schedule.append((number, due, amount, cumulative))
+    return schedule
+
+
+def schedule_terms(loc):
+    """Snapshot of the fields that determine the schedule (compare before/after an edit)"""
+    return tuple(getattr(loc, name) for name in SCHEDULE_TERMS)
+
+
+def regenerate_schedule(loc):
+    """
+    Replace a line of credit's stored schedule (call after flush so it has an id; doesn't commit)
+
+    Returns:
+        Number of installments written
+    """
+    PaymentScheduleEntry.query.filter_by(line_of_credit_id=loc.id).delete()
+    mark_stale(customer_ids=[loc.customer_id])
+    return _insert_schedules([loc])
+
+
+def regenerate_schedules(locs):
+    """Replace the stored schedules of several lines of credit with one delete and one insert (doesn't commit)"""
+    PaymentScheduleEntry.query.filter(
+        PaymentScheduleEntry.line_of_credit_id.in_([loc.id for loc in locs])
+    ).delete(synchronize_session=False)
+    mark_stale(customer_ids=[loc.customer_id for loc in locs])
+    return _insert_schedules(locs)
+
+
+def _insert_schedules(locs):
+    rows = [
+        {
+            'line_of_credit_id': loc.id,
+            'installment_number': number,
+            'due_date': due,
+            'amount': amount,
+            'cumulative_amount': cumulative,
+        }
+        for loc in locs
+        for number, due, amount, cumulative in generate_schedule(loc)
+    ]
+    if rows:
+        db.session.execute(db.insert(PaymentScheduleEntry), rows)
+    return len(rows)
+
+
+def rebuild_payment_schedules(batch_size=500):
+    """
+    Regenerate the schedule of every line of credit; commits
+
+    Returns:
+        Number of installments written
+    """
+    PaymentScheduleEntry.query.delete()
+
+    written = 0
+    batch = []
+    for loc in LineOfCredit.query.order_by(LineOfCredit.id).yield_per(batch_size):
+        batch.append(loc)
+        if len(batch) >= batch_size:
+            written += _insert_schedules(batch)
+            batch = []
+    written += _insert_schedules(batch)
+
+    db.session.commit()
+    return written
+
+
+def get_schedule_status(loc, as_of=None):
+    """
+    Expected vs. actual payments for one line of credit, from one indexed aggregate query
+
+    Returns:
+        Dict with 'expected_payments', 'expected_amount', 'total_expected',
+        'next_due_date', 'payments_ahead_behind' and 'amount_ahead_behind'
+    """
+    as_of = as_of or date.today()
+    due = PaymentScheduleEntry.due_date <= as_of
+
+    row = db.session.query(
+        func.count(case((due, PaymentScheduleEntry.id))),
+        func.max(case((due, PaymentScheduleEntry.cumulative_amount))),
+        func.max(PaymentScheduleEntry.cumulative_amount),
+        func.min(case((PaymentScheduleEntry.due_date > as_of, PaymentScheduleEntry.due_date))),
+    ).filter(PaymentScheduleEntry.line_of_credit_id == loc.id).one()
+
+    expected_payments = row[0] or 0
+    expected_amount = row[1] or 0
+    total_expected = row[2] if row[2] is not None else total_repayable(loc)
+
+    return {
+        'expected_payments': expected_payments,
+        'expected_amount': expected_amount,
+        'total_expected': total_expected,
+        'next_due_date': row[3],
+        'payments_ahead_behind': (loc.number_of_payments_made or 0) - expected_payments,
+        'amount_ahead_behind': (loc.total_paid or 0) - expected_amount,
+    }
@@ -0,0 +1,293 @@
+"""
+Full-text and typeahead search over applications, customers and deals
+
+Business names, legal names, owner names, emails, EINs and phone numbers
+(digits only, so "512-555-0100" and "5125550100" both match) are indexed
+by the database itself, so the index can't drift from the rows:
+
+    postgresql  Expression GIN indexes: to_tsvector('simple', ...) for word
+                prefix matches and pg_trgm on lower(business_name) for
+                misspelled names.
+    sqlite      An FTS5 table per source (applications_search,
+                customers_search) kept up to date by triggers.
+    other       LIKE scans (also used if the FTS5 tables are missing).
+
+The indexes are created with the tables (create_all) and by bootstrap.py
+for existing databases. Deals are found through their customer, or by
+number when the query is a plain integer.
+"""
+import re
+from flask import current_app, url_for
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Application, Customer, LineOfCredit
+
+# Results per kind for the typeahead and the search page
+TYPEAHEAD_LIMIT = 5
+SEARCH_LIMIT = 50
+
+# Shorter queries match too much to be useful as you type
+MIN_QUERY_LENGTH = 2
+
+SOURCES = {
+    'application': {
+        'model': Application,
+        'table': 'applications',
+        'text': ('business_name', 'business_legal_name', 'owner_first_name', 'owner_last_name'),
+        'emails': ('owner_email',),
+        'digits': ('ein', 'business_phone', 'owner_phone'),
+    },
+    'customer': {
+        'model': Customer,
+        'table': 'customers',
+        'text': ('business_name', 'owner_name'),
+        'emails': ('email',),
+        'digits': ('phone',),
+    },
+}
+
+_WORD_RE = re.compile(r'\w+')
+_PHONE_PUNCTUATION_RE = re.compile(r'[\s().+\-]')
+_SQLITE_PUNCTUATION = ('-', ' ', '(', ')', '.', '+')
+
+
+def _indexed_columns(source):
+    return source['text'] + source['emails'] + source['digits']
+
+
+def _pg_document(source):
+    parts = [f"coalesce({column}, '')" for column in source['text']]
+    parts += [f"translate(coalesce({column}, ''), '@.', '  ')" for column in source['emails']]
+    parts += [f"regexp_replace(coalesce({column}, ''), '\\D', '', 'g')" for column in source['digits']]
+    return "to_tsvector('simple', " + " || ' ' || ".join(parts) + ")"
+
+
+def _sqlite_document(source, row):
+    parts = [f"coalesce({row}.{column}, '')" for column in source['text'] + source['emails']]
+    for column in source['digits']:
+        expression = f"coalesce({row}.{column}, '')"
+        for character in _SQLITE_PUNCTUATION:
+            expression = f"replace({expression}, '{character}', '')"
+        parts.append(expression)
+    return " || ' ' || ".join(parts)
+
+
+def search_ddl(dialect_name, kind):
+    """CREATE statements of the search index for one source (idempotent; empty for other dialects)"""
+    source = SOURCES[kind]
+    table = source['table']
+
+    if dialect_name == 'postgresql':
+        return [
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+            f'CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING gin ({_pg_document(source)})',
+            f'CREATE INDEX IF NOT EXISTS ix_{table}_business_name_trgm ON {table} '
+            f'USING gin (lower(business_name) gin_trgm_ops)',
+        ]
+
+    if dialect_name == 'sqlite':
+        fts = f'{table}_search'
+        columns = ', '.join(_indexed_columns(source))
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(document, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN '
+            f'INSERT INTO {fts}(rowid, document) VALUES (new.id, {_sqlite_document(source, "new")}); END',
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {table} BEGIN '
+            f'DELETE FROM {fts} WHERE rowid = old.id; '
+            f'INSERT INTO {fts}(rowid, document) VALUES (new.id, {_sqlite_document(source, "new")}); END',
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN '
+            f'DELETE FROM {fts} WHERE rowid = old.id; END',
+        ]
+
+    return []
+
+
+def _create_search_index(connection, kind):
+    """Create one source's index, filling a new FTS5 table from the existing rows"""
+    dialect_name = connection.dialect.name
+    table = SOURCES[kind]['table']
+
+    new_fts = dialect_name == 'sqlite' and connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f'{table}_search',)
+    ).first() is None
+
+    for statement in search_ddl(dialect_name, kind):
+        connection.exec_driver_sql(statement)
+
+    if new_fts:
+        connection.exec_driver_sql(
+            f'INSERT INTO {table}_search(rowid, document) '
+            f'SELECT id, {_sqlite_document(SOURCES[kind], table)} FROM {table}'
+        )
+
+
+def ensure_search_indexes():
+    """Create any missing search index (run by bootstrap.py)"""
+    with db.engine.begin() as connection:
+        for kind in SOURCES:
+            _create_search_index(connection, kind)
+
+
+for _kind, _source in SOURCES.items():
+    event.listen(
+        _source['model'].__table__, 'after_create',
+        lambda target, connection, kind=_kind, **kw: _create_search_index(connection, kind)
+    )
+
+
+def _backend():
+    backend = current_app.extensions.get('search_backend')
+    if backend is None:
+        dialect_name = db.engine.dialect.name
+        if dialect_name == 'postgresql':
+            backend = 'postgresql'
+        elif dialect_name == 'sqlite' and db.inspect(db.engine).has_table('applications_search'):
+            backend = 'fts5'
+        else:
+            backend = 'like'
+        current_app.extensions['search_backend'] = backend
+    return backend
+
+
+def parse_query(query):
+    """
+    Split a search string into lowercase prefix terms
+
+    Phone numbers and EINs typed with punctuation become a single digits term.
+    """
+    query = (query or '').strip().lower()
+    compact = _PHONE_PUNCTUATION_RE.sub('', query)
+    if compact.isdigit():
+        return [compact]
+    return _WORD_RE.findall(query)
+
+
+def _matching_ids(kind, query, terms, limit, ranked):
+    """Ids of one source's rows matching every term, best (or newest) first"""
+    source = SOURCES[kind]
+    table = source['table']
+    backend = _backend()
+
+    if backend == 'postgresql':
+        document = _pg_document(source)
+        order = ('ts_rank(' + document + ", to_tsquery('simple', :tsquery)) "
+                 '+ similarity(lower(business_name), :raw) DESC, id DESC') if ranked else 'id DESC'
+        sql = (f"SELECT id FROM {table} WHERE {document} @@ to_tsquery('simple', :tsquery) "
+               f'OR lower(business_name) % :raw ORDER BY {order} LIMIT :limit')
+        params = {'tsquery': ' & '.join(f'{term}:*' for term in terms), 'raw': query.strip().lower()}
+
+    elif backend == 'fts5':
+        sql = (f'SELECT rowid FROM {table}_search WHERE {table}_search MATCH :match '
+               f"ORDER BY {'rank' if ranked else 'rowid DESC'} LIMIT :limit")
+        params = {'match': ' '.join(f'"{term}"*' for term in terms)}
+
+    else:
+        columns = _indexed_columns(source)
+        conditions = []
+        params = {}
+        for i, term in enumerate(terms):
+            params[f'term{i}'] = f'%{term}%'
+            conditions.append('(' + ' OR '.join(f'lower({column}) LIKE :term{i}' for column in columns) + ')')
+        sql = f"SELECT id FROM {table} WHERE {' AND '.join(conditions)} ORDER BY id DESC LIMIT :limit"
+
+    params['limit'] = limit
+    return db.session.execute(db.text(sql), params).scalars().all()
+
+
+def _in_order(objects, ids):
+    by_id = {obj.id: obj for obj in objects}
+    return [by_id[id] for id in ids if id in by_id]
+
+
+def search(query, limit=SEARCH_LIMIT, ranked=True):
+    """
+    Find applications, customers and deals matching every word of the query (as prefixes)
+
+    Args:
+        query: Names, email, EIN or phone number, or an application / deal number
+        limit: Maximum results per kind
+        ranked: Best matches first (the search page); False returns the newest
+                matches first, which is cheaper on very common prefixes (typeahead)
+
+    Returns:
+        Dict with 'applications', 'customers' and 'deals' lists (empty when the query is too short)
+    """
+    results = {'applications': [], 'customers': [], 'deals': []}
+    terms = parse_query(query)
+
+    # A plain number may also be an application or deal number (looked up however short)
+    number = int(terms[0]) if len(terms) == 1 and terms[0].isdigit() and len(terms[0]) <= 9 else None
+
+    application_ids, customer_ids = [], []
+    if len(''.join(terms)) >= MIN_QUERY_LENGTH:
+        application_ids = _matching_ids('application', query, terms, limit, ranked)
+        customer_ids = _matching_ids('customer', query, terms, limit, ranked)
+
+    if number is not None and number not in application_ids:
+        application_ids.insert(0, number)
+
+    if application_ids:
+        results['applications'] = _in_order(
+            Application.query.filter(Application.id.in_(application_ids)).all(), application_ids
+        )[:limit]
+
+    if customer_ids:
+        results['customers'] = _in_order(
+            Customer.query.options(joinedload(Customer.line_of_credit))
+            .filter(Customer.id.in_(customer_ids)).all(), customer_ids
+        )
+
+    deals = [customer.line_of_credit for customer in results['customers'] if customer.line_of_credit]
+    if number is not None and number not in {deal.id for deal in deals}:
+        deal = LineOfCredit.query.options(joinedload(LineOfCredit.customer)).filter_by(id=number).first()
+        if deal:
+            deals.insert(0, deal)
+    results['deals'] = deals[:limit]
+
+    return results
+
+
+def typeahead(query, limit=TYPEAHEAD_LIMIT):
+    """
+    Compact search results for the navbar search box
+
+    Returns:
+        List of {'kind', 'id', 'label', 'detail', 'url'} dicts, deals first
+    """
+    results = search(query, limit=limit, ranked=False)
+
+    suggestions = [
+        {
+            'kind': 'deal',
+            'id': deal.id,
+            'label': deal.customer.business_name,
+            'detail': f'Deal #{deal.id} · ${deal.approved_amount:,.0f} · {deal.status}',
+            'url': url_for('admin.view_deal', id=deal.id),
+        }
+        for deal in results['deals']
+    ]
+    suggestions += [
+        {
+            'kind': 'customer',
+            'id': customer.id,
+            'label': customer.business_name,
+            'detail': f'Customer · {customer.email}',
+            'url': url_for('admin.view_application', id=customer.application_id) if customer.application_id
+                   else url_for('admin.customers'),
+        }
+        # Customers with a deal are already listed as the deal
+        for customer in results['customers']
+        if not customer.line_of_credit
+    ]
+    suggestions += [
+        {
+            'kind': 'application',
+            'id': application.id,
+            'label': application.business_name,
+            'detail': f'Application #{application.id} · {application.owner_first_name} {application.owner_last_name} · {application.status}',
+            'url': url_for('admin.view_application', id=application.id),
+        }
+        for application in results['applications']
+    ]
+    return suggestions
@@ -0,0 +1,158 @@
+"""
+Aggregate queries for dashboard statistics
+"""
+from app import db
+from app.models import Application, User, LineOfCredit, WithdrawalRequest, Payment
+from app.portfolio import get_portfolio_totals, empty_totals
+from app.cache import memoize
+from datetime import date, timedelta
+from sqlalchemy import func, case
+
+
+def get_application_status_counts():
+    """
+    Count applications per status in a single GROUP BY query
+
+    Returns:
+        Dict with 'total', 'pending', 'approved' and 'rejected' counts
+    """
+    rows = db.session.query(
+        Application.status, func.count(Application.id)
+    ).group_by(Application.status).all()
+
+    counts = {'pending': 0, 'approved': 0, 'rejected': 0}
+    for status, count in rows:
+        counts[status] = count
+    counts['total'] = sum(count for _, count in rows)
+
+    return counts
+
+
+def get_deal_totals():
+    """
+    Active deal count, active credit issued and pending withdrawals
+
+    Deal figures come from the portfolio rollup rather than scanning
+    lines_of_credit.
+
+    Returns:
+        Dict with 'active_deals', 'total_credit_issued' and 'pending_withdrawals'
+    """
+    active = get_portfolio_totals().get('active', empty_totals())
+    pending_withdrawals = db.session.query(
+        func.count(WithdrawalRequest.id)
+    ).filter(WithdrawalRequest.status == 'pending').scalar()
+
+    return {
+        'active_deals': active['deal_count'],
+        'total_credit_issued': active['approved_amount'],
+        'pending_withdrawals': pending_withdrawals or 0,
+    }
+
+
+def get_rep_deal_counts():
+    """
+    Active reps with their assigned deal counts (one LEFT JOIN + GROUP BY)
+
+    Returns:
+        List of dicts with 'id', 'first_name', 'last_name' and 'deal_count'
+    """
+    rows = db.session.query(
+        User.id, User.first_name, User.last_name, func.count(LineOfCredit.id)
+    ).outerjoin(
+        LineOfCredit, LineOfCredit.rep_id == User.id
+    ).filter(
+        User.role == 'rep', User.is_active.is_(True)
+    ).group_by(
+        User.id, User.first_name, User.last_name
+    ).order_by(User.id).all()
+
+    return [
+        {'id': rep_id, 'first_name': first_name, 'last_name': last_name, 'deal_count': deal_count}
+        for rep_id, first_name, last_name, deal_count in rows
+    ]
+
+
+@memoize('dashboard_stats', tables=('applications', 'lines_of_credit', 'portfolio_rollup', 'withdrawal_requests', 'users'))
+def get_dashboard_stats():
+    """
+    Collect every number shown on the admin dashboard
+
+    Returns:
+        Dict of plain values ready to pass to the template
+    """
+    application_counts = get_application_status_counts()
+    deal_totals = get_deal_totals()
+
+    return {
+        'total_applications': application_counts['total'],
+        'pending_count': application_counts['pending'],
+        'approved_count': application_counts['approved'],
+        'rejected_count': application_counts['rejected'],
+        'active_deals': deal_totals['active_deals'],
+        'total_credit_issued': deal_totals['total_credit_issued'],
+        'pending_withdrawals': deal_totals['pending_withdrawals'],
+        'reps': get_rep_deal_counts(),
+    }
+
+
+@memoize('report_summary', tables=('portfolio_rollup', 'payments'))
+def get_report_summary():
+    """
+    Portfolio and collection figures for the financial reports page
+
+    Portfolio numbers come from the rollup table; collections are SQL
+    aggregates over the payments ledger.
+
+    Returns:
+        Dict of plain values ready to pass to the template or export
+    """
+    portfolio = get_portfolio_totals()
+    active = portfolio.get('active', empty_totals())
+
+    total_deals_count = sum(totals['deal_count'] for totals in portfolio.values())
+    total_approved = sum(totals['approved_amount'] for totals in portfolio.values())
+
+    today = date.today()
+    first_day_of_month = today.replace(day=1)
+    first_day_of_year = today.replace(month=1, day=1)
+
+    row = db.session.query(
+        func.avg(Payment.amount),
+        func.sum(case((Payment.payment_date >= first_day_of_month, Payment.amount), else_=0)),
+        func.sum(case((Payment.payment_date >= first_day_of_year, Payment.amount), else_=0)),
+    ).one()
+
+    return {
+        'total_outstanding': active['outstanding_balance'],
+        'total_credit_issued': active['approved_amount'],
+        'total_credit_used': active['used_amount'],
+        'total_collected': sum(totals['total_paid'] for totals in portfolio.values()),
+        'avg_deal_size': (total_approved / total_deals_count) if total_deals_count else 0,
+        'avg_payment': row[0] or 0,
+        'this_month_collected': row[1] or 0,
+        'this_year_collected': row[2] or 0,
+        'status_counts': {
+            status: portfolio.get(status, empty_totals())['deal_count']
+            for status in ('active', 'paid_off', 'defaulted', 'suspended')
+        },
+        'active_deals_count': active['deal_count'],
+        'total_deals_count': total_deals_count,
+    }
+
+
+def get_collections_in_range(start=None, end=None):
+    """
+    Payment count and total collected between two dates (inclusive)
+
+    Returns:
+        Dict with 'payment_count' and 'collected'
+    """
+    query = db.session.query(func.count(Payment.id), func.sum(Payment.amount))
+    if start:
+        query = query.filter(Payment.payment_date >= start)
+    if end:
+        query = query.filter(Payment.payment_date < end + timedelta(days=1))
+    count, total = query.one()
+
+    return {'payment_count': count or 0, 'collected': total or 0}
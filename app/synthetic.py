@@ -0,0 +1,371 @@
+"""
+Deterministic synthetic portfolio for benchmarks and query-plan checks
+
+generate() fills an empty database with reps, applications (scored and
+indexed for duplicate detection), customers and lines of credit for the
+approved ones, their payment history (payments ledger plus the
+payment_recorded activity logs the portal reads) and withdrawal requests.
+The same seed and as_of date always give the same rows.
+
+Distributions, roughly what production looks like:
+
+    applications  submitted evenly over the two years before as_of; recent
+                  ones mostly pending, older ones ~45% approved; lognormal
+                  requested amounts around $40k; ~2% are repeat applicants
+                  (same email, EIN and phones as an earlier application)
+    deals         one per approved application, ~1 rep per 2,000
+                  applications (10% unassigned); weekly or monthly payments
+                  over 6-18 months, mostly on time, ~15% behind, a few
+                  defaulted; paid_off once every installment is in
+    withdrawals   ~30% of active deals have one (30% still pending)
+
+Everything is bulk-inserted in batches of applications, so memory stays flat
+at any size. Logins all use SYNTHETIC_PASSWORD.
+"""
+import json
+import math
+import random
+from datetime import date, datetime, time, timedelta
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import User, Application, Customer, LineOfCredit, ActivityLog, WithdrawalRequest, Payment
+from app.underwriting import score_records
+from app.duplicates import index_applications
+from app.portfolio import rebuild_portfolio_rollup
+from app.schedule import rebuild_payment_schedules
+from app.delinquency import scan_delinquency
+from app.customer_summary import rebuild_customer_summaries
+
+SYNTHETIC_PASSWORD = 'synthetic'
+ADMIN_EMAIL = 'synthetic-admin@example.com'
+
+BATCH_SIZE = 5000
+HISTORY_DAYS = 730
+APPLICATIONS_PER_REP = 2000
+
+_NAME_WORDS = (
+    'Acme', 'Golden', 'River', 'Metro', 'Prime', 'Coastal', 'Family', 'Express', 'Urban', 'Valley',
+    'Summit', 'Pioneer', 'Liberty', 'Harbor', 'Sunrise', 'Evergreen', 'Lakeside', 'Redwood', 'Main Street', 'Capital',
+    'Northern', 'Southern', 'Eagle', 'Lone Star', 'Blue Sky', 'Maple', 'Cedar', 'Silver', 'Bright', 'Heritage',
+)
+_BUSINESS_KINDS = (
+    'Pizza', 'Auto Repair', 'Dental', 'Bakery', 'Market', 'Salon', 'Logistics', 'Fitness', 'Plumbing', 'Roofing',
+    'Landscaping', 'Cafe', 'Pharmacy', 'Trucking', 'Construction', 'Cleaning', 'Boutique', 'Tacos', 'Barbershop', 'Florist',
+)
+_SUFFIXES = ('LLC', 'Inc', 'Co', 'Corp', 'Group', '')
+_FIRST_NAMES = (
+    'James', 'Maria', 'Robert', 'Linda', 'Michael', 'Patricia', 'David', 'Jennifer', 'Carlos', 'Elizabeth',
+    'Daniel', 'Susan', 'Jose', 'Jessica', 'Thomas', 'Sarah', 'Kevin', 'Karen', 'Anh', 'Nancy',
+)
+_LAST_NAMES = (
+    'Smith', 'Garcia', 'Johnson', 'Martinez', 'Williams', 'Nguyen', 'Brown', 'Lopez', 'Jones', 'Patel',
+    'Davis', 'Rodriguez', 'Miller', 'Kim', 'Wilson', 'Hernandez', 'Moore', 'Taylor', 'Anderson', 'Thomas',
+)
+_INDUSTRIES = ('Retail', 'Restaurant', 'Healthcare', 'Construction', 'Transportation', 'Services', 'Manufacturing')
+_STATES = (('TX', 'Austin', '787'), ('FL', 'Miami', '331'), ('CA', 'Fresno', '937'), ('NY', 'Buffalo', '142'),
+           ('GA', 'Atlanta', '303'), ('IL', 'Chicago', '606'), ('AZ', 'Phoenix', '850'), ('OH', 'Columbus', '432'))
+_STREETS = ('Main St', 'Oak Ave', 'Commerce Blvd', 'Market St', 'Industrial Pkwy', 'Elm St', 'Park Ln')
+_BUSINESS_TYPES = ('LLC', 'Corporation', 'Sole Proprietorship', 'Partnership')
+_PURPOSES = ('Inventory', 'Equipment', 'Payroll', 'Expansion', 'Marketing', 'Working capital')
+
+# Days between installments per payment frequency
+_PERIOD_DAYS = {'Weekly': 7, 'Monthly': 30}
+
+
+def _weighted(rng, choices):
+    """Pick from ((value, weight), ...)"""
+    total = sum(weight for _, weight in choices)
+    point = rng.random() * total
+    for value, weight in choices:
+        point -= weight
+        if point < 0:
+            return value
+    return choices[-1][0]
+
+
+def _application_row(rng, n, submitted_at, as_of, previous):
+    state, city, zip_prefix = rng.choice(_STATES)
+    name = ' '.join(filter(None, (rng.choice(_NAME_WORDS), rng.choice(_BUSINESS_KINDS), rng.choice(_SUFFIXES))))
+    requested = min(max(round(rng.lognormvariate(math.log(40000), 0.7) / 500) * 500, 5000), 500000)
+    monthly_revenue = round(requested * rng.uniform(0.6, 3.0), -2)
+    age_days = (as_of - submitted_at.date()).days
+
+    if age_days < 14:
+        status = 'pending' if rng.random() < 0.85 else rng.choice(('approved', 'rejected'))
+    elif age_days < 45:
+        status = _weighted(rng, (('pending', 0.1), ('approved', 0.4), ('rejected', 0.5)))
+    else:
+        status = 'approved' if rng.random() < 0.45 else 'rejected'
+
+    row = {
+        'business_name': name,
+        'business_legal_name': name,
+        'ein': f'{10 + n // 10000000 % 90:02d}-{n % 10000000:07d}',
+        'business_type': rng.choice(_BUSINESS_TYPES),
+        'industry': rng.choice(_INDUSTRIES),
+        'years_in_business': round(rng.uniform(0.5, 25), 1),
+        'business_address': f'{n % 9899 + 100} {rng.choice(_STREETS)}',
+        'business_city': city,
+        'business_state': state,
+        'business_zip': f'{zip_prefix}{n % 100:02d}',
+        'business_phone': f'{200 + n // 10000000 % 800}{n % 10000000:07d}',
+        'monthly_revenue': monthly_revenue,
+        'annual_revenue': monthly_revenue * 12,
+        'average_monthly_bank_balance': round(monthly_revenue * rng.uniform(0.1, 0.6), -2),
+        'existing_debt': round(requested * rng.uniform(0, 1.5), -2) if rng.random() < 0.4 else 0.0,
+        'credit_score': int(min(max(rng.gauss(660, 60), 480), 820)),
+        'requested_amount': float(requested),
+        'purpose_of_funding': rng.choice(_PURPOSES),
+        'owner_first_name': rng.choice(_FIRST_NAMES),
+        'owner_last_name': rng.choice(_LAST_NAMES),
+        'owner_email': f'owner{n}@example.com',
+        'owner_phone': f'{300 + n // 10000000 % 700}{(n * 7 + 3) % 10000000:07d}',
+        'owner_ssn_last_4': f'{rng.randrange(10000):04d}',
+        'owner_date_of_birth': date(1950, 1, 1) + timedelta(days=rng.randrange(18000)),
+        'owner_address': f'{n % 8999 + 1000} {rng.choice(_STREETS)}',
+        'owner_city': city,
+        'owner_state': state,
+        'owner_zip': f'{zip_prefix}{(n // 100) % 100:02d}',
+        'ownership_percentage': rng.choice((100.0, 100.0, 51.0, 50.0)),
+        'bank_name': rng.choice(('Chase', 'Bank of America', 'Wells Fargo', 'Regions', 'Local Credit Union')),
+        'bank_account_type': 'Checking',
+        'time_with_bank': round(rng.uniform(0.5, 15), 1),
+        'average_daily_balance': round(monthly_revenue * rng.uniform(0.05, 0.4), -2),
+        'number_of_nsf_last_3_months': rng.choice((0, 0, 0, 0, 1, 2, 5)),
+        'has_merchant_account': rng.random() < 0.6,
+        'status': status,
+        'submitted_at': submitted_at,
+        'reviewed_at': min(submitted_at + timedelta(days=rng.uniform(0.5, 5)), datetime.combine(as_of, time(23, 59)))
+                       if status != 'pending' else None,
+    }
+
+    # Repeat applicants reuse an earlier application's identity (and are
+    # never approved, so customer emails stay unique)
+    if previous and rng.random() < 0.02:
+        earlier = rng.choice(previous)
+        for field in ('owner_email', 'ein', 'business_phone', 'owner_phone', 'owner_ssn_last_4',
+                      'owner_date_of_birth', 'business_name', 'business_legal_name', 'owner_first_name',
+                      'owner_last_name'):
+            row[field] = earlier[field]
+        if status == 'approved':
+            row['status'] = 'rejected'
+    return row
+
+
+def _deal_row(rng, customer_id, rep_ids, application, as_of):
+    approved_amount = round(application['requested_amount'] * rng.uniform(0.6, 1.0), -2)
+    interest_rate = rng.choice((18.0, 24.0, 30.0, 36.0))
+    term_months = rng.choice((6, 9, 12, 12, 18))
+    frequency = rng.choice(('Weekly', 'Weekly', 'Monthly'))
+    period = _PERIOD_DAYS[frequency]
+    installments = term_months * 52 // 12 if frequency == 'Weekly' else term_months
+
+    used_amount = round(approved_amount * rng.uniform(0.3, 1.0), 2)
+    total_repayable = used_amount * (1 + interest_rate / 100 * term_months / 12)
+    payment_amount = round(total_repayable / installments, 2)
+
+    approved_date = application['reviewed_at']
+    first_payment_date = approved_date.date() + timedelta(days=7)
+    due = min(max((as_of - first_payment_date).days // period + 1, 0), installments)
+
+    status = 'active'
+    behind = 0
+    roll = rng.random()
+    if due and roll < 0.15:
+        behind = min(rng.choice((1, 1, 2, 3, 6)), due)
+    elif due >= 4 and roll < 0.18:
+        behind = due - rng.randrange(1, due)
+        status = 'defaulted'
+    payments_made = due - behind
+    if payments_made >= installments:
+        status = 'paid_off'
+
+    total_paid = round(payment_amount * payments_made, 2)
+    payment_dates = [first_payment_date + timedelta(days=period * k) for k in range(payments_made)]
+
+    deal = {
+        'customer_id': customer_id,
+        'rep_id': rng.choice(rep_ids) if rng.random() < 0.9 else None,
+        'approved_amount': approved_amount,
+        'used_amount': used_amount if status != 'paid_off' else 0.0,
+        'available_amount': approved_amount - (used_amount if status != 'paid_off' else 0.0),
+        'interest_rate': interest_rate,
+        'payment_frequency': frequency,
+        'payment_amount': payment_amount,
+        'term_months': term_months,
+        'approved_date': approved_date,
+        'first_payment_date': first_payment_date,
+        'maturity_date': first_payment_date + timedelta(days=period * (installments - 1)),
+        'status': status,
+        'total_paid': total_paid,
+        'outstanding_balance': round(max(total_repayable - total_paid, 0), 2) if status != 'paid_off' else 0.0,
+        'number_of_payments_made': payments_made,
+        'number_of_payments_remaining': installments - payments_made,
+        'last_payment_date': payment_dates[-1] if payment_dates else None,
+        'next_payment_date': first_payment_date + timedelta(days=period * payments_made)
+                             if status == 'active' else None,
+        'created_at': approved_date,
+    }
+    return deal, payment_dates
+
+
+def _insert(model, rows):
+    """Bulk insert, returning the new ids in row order"""
+    if not rows:
+        return []
+    return db.session.scalars(
+        db.insert(model).returning(model.id, sort_by_parameter_order=True), rows
+    ).all()
+
+
+def generate(applications, seed=42, as_of=None, schedules=True, batch_size=BATCH_SIZE, log=print):
+    """
+    Fill an empty database with a synthetic portfolio; commits after every batch
+
+    Args:
+        applications: Number of applications (customers, deals, payments and
+                      withdrawals follow from the distributions above)
+        seed: Random seed; the same seed and as_of give the same data
+        as_of: Date the history ends on (default today)
+        schedules: Also generate payment schedules and run the delinquency
+                   scan (rep and admin late-deal lists; slow at millions of rows)
+        batch_size: Applications per insert batch
+        log: Progress output
+
+    Returns:
+        Dict of row counts per table plus logins and ids useful for requests:
+        'admin_email', 'rep_email', 'rep_id', 'customer_email', 'deal_id',
+        'pending_application_id'
+    """
+    rng = random.Random(seed)
+    as_of = as_of or date.today()
+    history_start = datetime.combine(as_of, time()) - timedelta(days=HISTORY_DAYS)
+    password_hash = generate_password_hash(SYNTHETIC_PASSWORD)
+
+    reps = max(3, applications // APPLICATIONS_PER_REP)
+    users = [{'username': 'synthetic-admin', 'email': ADMIN_EMAIL, 'role': 'admin', 'first_name': 'Synthetic',
+              'last_name': 'Admin', 'password_hash': password_hash, 'created_at': history_start}]
+    users += [
+        {'username': f'synthetic-rep{i}', 'email': f'synthetic-rep{i}@example.com', 'role': 'rep',
+         'first_name': rng.choice(_FIRST_NAMES), 'last_name': rng.choice(_LAST_NAMES),
+         'password_hash': password_hash, 'created_at': history_start}
+        for i in range(reps)
+    ]
+    # Reuse users kept from an earlier run (clear_database.py keeps admins)
+    existing = dict(db.session.execute(
+        db.select(User.email, User.id).where(User.email.in_([user['email'] for user in users]))
+    ).all())
+    new_ids = iter(_insert(User, [user for user in users if user['email'] not in existing]))
+    user_ids = [existing.get(user['email']) or next(new_ids) for user in users]
+    rep_ids = user_ids[1:]
+
+    counts = {'users': len(user_ids), 'applications': 0, 'customers': 0, 'lines_of_credit': 0,
+              'payments': 0, 'withdrawal_requests': 0, 'activity_logs': 0}
+    result = {'pending_application_id': None, 'deal_id': None}
+    step = timedelta(days=HISTORY_DAYS) / max(applications, 1)
+
+    for start in range(0, applications, batch_size):
+        end = min(start + batch_size, applications)
+        rows = []
+        for n in range(start, end):
+            submitted_at = history_start + step * n + timedelta(seconds=rng.uniform(0, step.total_seconds()))
+            rows.append(_application_row(rng, n, submitted_at, as_of, rows))
+        for row, score in zip(rows, score_records(rows)):
+            row.update(score)
+        application_ids = _insert(Application, rows)
+        index_applications(zip(application_ids, rows))
+
+        approved = [(application_id, row) for application_id, row in zip(application_ids, rows)
+                    if row['status'] == 'approved']
+        customer_ids = _insert(Customer, [
+            {'application_id': application_id, 'email': row['owner_email'],
+             'password_hash': password_hash, 'business_name': row['business_name'],
+             'owner_name': f"{row['owner_first_name']} {row['owner_last_name']}",
+             'phone': row['business_phone'], 'created_at': row['reviewed_at']}
+            for application_id, row in approved
+        ]) if approved else []
+
+        deals, histories = [], []
+        for customer_id, (_, row) in zip(customer_ids, approved):
+            deal, payment_dates = _deal_row(rng, customer_id, rep_ids, row, as_of)
+            deals.append(deal)
+            histories.append(payment_dates)
+        deal_ids = _insert(LineOfCredit, deals)
+
+        payment_logs, payments = [], []
+        for deal_id, deal, payment_dates in zip(deal_ids, deals, histories):
+            for paid_on in payment_dates:
+                paid_at = datetime.combine(paid_on, time(rng.randrange(8, 18), rng.randrange(60)))
+                payment_logs.append({
+                    'action_type': 'payment_recorded',
+                    'description': f"Payment of ${deal['payment_amount']:,.2f} recorded via ACH on {paid_on.strftime('%m/%d/%Y')}.",
+                    'customer_id': deal['customer_id'],
+                    'line_of_credit_id': deal_id,
+                    'extra_data': json.dumps({'amount': deal['payment_amount'], 'method': 'ACH', 'date': paid_on.isoformat()}),
+                    'created_at': paid_at,
+                })
+                payments.append({
+                    'line_of_credit_id': deal_id, 'customer_id': deal['customer_id'],
+                    'amount': deal['payment_amount'], 'payment_date': paid_on, 'method': 'ACH',
+                    'created_at': paid_at,
+                })
+        for payment, log_id in zip(payments, _insert(ActivityLog, payment_logs)):
+            payment['activity_log_id'] = log_id
+        if payments:
+            db.session.execute(db.insert(Payment), payments)
+
+        withdrawals, withdrawal_logs = [], []
+        for deal_id, deal in zip(deal_ids, deals):
+            if deal['status'] != 'active' or rng.random() >= 0.3:
+                continue
+            status = _weighted(rng, (('pending', 0.3), ('approved', 0.6), ('denied', 0.1)))
+            requested_at = max(datetime.combine(as_of, time()) - timedelta(days=rng.uniform(0, 60)),
+                               deal['approved_date'])
+            amount = round(max(deal['available_amount'], 1000) * rng.uniform(0.2, 1.0), -2)
+            withdrawals.append({
+                'line_of_credit_id': deal_id, 'customer_id': deal['customer_id'], 'requested_amount': amount,
+                'purpose': rng.choice(_PURPOSES), 'status': status, 'created_at': requested_at,
+                'reviewed_at': requested_at + timedelta(hours=rng.uniform(1, 48)) if status != 'pending' else None,
+            })
+            withdrawal_logs.append({
+                'action_type': 'withdrawal_requested',
+                'description': f'Withdrawal request for ${amount:,.2f}',
+                'customer_id': deal['customer_id'], 'line_of_credit_id': deal_id, 'created_at': requested_at,
+            })
+        if withdrawals:
+            db.session.execute(db.insert(WithdrawalRequest), withdrawals)
+            db.session.execute(db.insert(ActivityLog), withdrawal_logs)
+
+        db.session.commit()
+
+        counts['applications'] += len(application_ids)
+        counts['customers'] += len(customer_ids)
+        counts['lines_of_credit'] += len(deal_ids)
+        counts['payments'] += len(payments)
+        counts['withdrawal_requests'] += len(withdrawals)
+        counts['activity_logs'] += len(payment_logs) + len(withdrawal_logs)
+
+        # The newest pending application and an active, assigned deal for request targets
+        for application_id, row in zip(application_ids, rows):
+            if row['status'] == 'pending':
+                result['pending_application_id'] = application_id
+        for deal_id, deal in zip(deal_ids, deals):
+            if deal['status'] == 'active' and deal['rep_id'] and deal['number_of_payments_made']:
+                result.update(deal_id=deal_id, rep_id=deal['rep_id'], customer_id=deal['customer_id'])
+
+        log(f"   - {end:,} / {applications:,} applications")
+
+    rebuild_portfolio_rollup()
+    if schedules:
+        counts['payment_schedule'] = rebuild_payment_schedules()
+        scan_delinquency(as_of)
+    counts['customer_summaries'] = rebuild_customer_summaries()
+
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('ANALYZE')
+
+    result.update(counts=counts, admin_email=ADMIN_EMAIL, password=SYNTHETIC_PASSWORD)
+    if result['deal_id']:
+        result['rep_email'] = db.session.get(User, result['rep_id']).email
+        result['customer_email'] = db.session.get(Customer, result['customer_id']).email
+    return result
@@ -4,14 +4,31 @@ Helper functions for activity logging
 from app import db
 from app.models import ActivityLog
 from flask_login import current_user
-from flask import session
+from flask import session, current_app, has_request_context
+from datetime import datetime
+import atexit
 import json
+import logging
+import os
+import queue
+import threading
+import time
 
+logger = logging.getLogger(__name__)
 
-def log_activity(action_type, description, user_id=None, customer_id=None, application_id=None, line_of_credit_id=None, metadata=None):
+# Queued after the last row to tell the writer thread to drain and exit
+_STOP = object()
+
+
+def log_activity(action_type, description, user_id=None, customer_id=None, application_id=None, line_of_credit_id=None, metadata=None, buffered=None):
     """
     Log an activity to the database
-    
+
+    By default the log row is added to the current session, so it is written
+    by the caller's next commit together with the change it describes. With
+    ACTIVITY_LOG_BUFFERED enabled (or buffered=True) the row is instead queued
+    for the background writer, which inserts batches in its own transaction.
+
     Args:
         action_type: Type of action (e.g., 'application_approved', 'password_changed')
         description: Human-readable description of the action
@@ -20,29 +37,141 @@ def log_activity(action_type, description, user_id=None, customer_id=None, appli
         application_id: ID of related application
         line_of_credit_id: ID of related line of credit
         metadata: Dict of additional data to store as JSON
+        buffered: Override ACTIVITY_LOG_BUFFERED for this call (use False when the log id is needed)
+
+    Returns:
+        The pending ActivityLog, or None when the row was queued for the background writer
     """
     # Auto-detect current user if not provided
-    if user_id is None and hasattr(current_user, 'id') and current_user.is_authenticated:
+    if user_id is None and has_request_context() and hasattr(current_user, 'id') and current_user.is_authenticated:
         user_id = current_user.id
-    
+
     # Auto-detect current customer if not provided
-    if customer_id is None and 'customer_id' in session:
+    if customer_id is None and has_request_context() and 'customer_id' in session:
         customer_id = session.get('customer_id')
-    
+
     # Convert metadata to JSON string if provided
     extra_data_str = json.dumps(metadata) if metadata else None
-    
-    log = ActivityLog(
-        action_type=action_type,
-        description=description,
-        user_id=user_id,
-        customer_id=customer_id,
-        application_id=application_id,
-        line_of_credit_id=line_of_credit_id,
-        extra_data=extra_data_str
-    )
-    
+
+    row = {
+        'action_type': action_type,
+        'description': description,
+        'user_id': user_id,
+        'customer_id': customer_id,
+        'application_id': application_id,
+        'line_of_credit_id': line_of_credit_id,
+        'extra_data': extra_data_str,
+    }
+
+    if buffered is None:
+        buffered = current_app.config.get('ACTIVITY_LOG_BUFFERED', False)
+
+    if buffered:
+        row['created_at'] = datetime.utcnow()
+        get_activity_log_writer().enqueue(row)
+        return None
+
+    log = ActivityLog(**row)
     db.session.add(log)
-    db.session.commit()
-    
+
     return log
+
+
+class ActivityLogWriter:
+    """
+    Background writer that inserts queued activity log rows in batches
+
+    A batch is flushed with one multi-row INSERT when it reaches batch_size
+    rows or when flush_interval seconds have passed since the last flush.
+    stop() drains everything queued before it; it is registered with atexit.
+    """
+
+    def __init__(self, app, batch_size=100, flush_interval=2.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+        self._thread.start()
+
+    def enqueue(self, row):
+        self._queue.put(row)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect_batch()
+            if batch:
+                self._write(batch)
+
+    def _collect_batch(self):
+        """
+        Wait for the first row, then gather rows until batch_size or flush_interval is reached
+
+        Returns:
+            Tuple of (rows, whether the stop marker was seen)
+        """
+        batch = []
+        row = self._queue.get()
+        if row is _STOP:
+            return batch, True
+        batch.append(row)
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                row = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if row is _STOP:
+                return batch, True
+            batch.append(row)
+
+        return batch, False
+
+    def _write(self, batch):
+        with self.app.app_context():
+            try:
+                db.session.execute(db.insert(ActivityLog), batch)
+                db.session.commit()
+                self.written += len(batch)
+            except Exception:
+                db.session.rollback()
+                self.dropped += len(batch)
+                logger.exception('Failed to write %d buffered activity logs', len(batch))
+            finally:
+                db.session.remove()
+
+    def stop(self, timeout=10.0):
+        """Flush every queued row and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def get_activity_log_writer():
+    """Return this process's background writer, starting it on first use (and after a fork)"""
+    global _writer, _writer_pid
+
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            app = current_app._get_current_object()
+            _writer = ActivityLogWriter(
+                app,
+                batch_size=app.config.get('ACTIVITY_LOG_BATCH_SIZE', 100),
+                flush_interval=app.config.get('ACTIVITY_LOG_FLUSH_INTERVAL', 2.0)
+            )
+            _writer_pid = os.getpid()
+            atexit.register(_writer.stop)
+
+    return _writer
@@ -0,0 +1,142 @@
+"""
+Per-worker request counters for gunicorn
+
+gunicorn.conf.py records every request a worker handles in a WorkerStats
+and the worker writes a small JSON snapshot to WORKER_STATS_DIR every few
+seconds. Workers are separate processes, so the admin perf page reads all
+of the snapshots to show requests, errors and average time per worker, as
+well as when each one was started (workers are recycled after
+GUNICORN_MAX_REQUESTS requests).
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Minimum seconds between snapshots (the file is removed when the worker exits)
+WRITE_INTERVAL = 5.0
+
+
+def default_stats_dir():
+    return os.environ.get('WORKER_STATS_DIR') or os.path.join(tempfile.gettempdir(), 'quickline-workers')
+
+
+class WorkerStats:
+    """Request counters for one worker process"""
+
+    def __init__(self, directory, worker_class, threads):
+        self.directory = directory
+        self.pid = os.getpid()
+        self.worker_class = worker_class
+        self.threads = threads
+        self.booted_at = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.in_flight = 0
+        self.last_request_at = None
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'{self.pid}.json')
+
+    def start_request(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finish_request(self, duration_ms, status_code):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.errors += status_code >= 500
+            self.total_ms += duration_ms
+            self.max_ms = max(self.max_ms, duration_ms)
+            self.last_request_at = time.time()
+            due = self.last_request_at - self._last_write >= WRITE_INTERVAL
+        if due:
+            self.write()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': self.pid,
+                'worker_class': self.worker_class,
+                'threads': self.threads,
+                'booted_at': self.booted_at,
+                'requests': self.requests,
+                'errors': self.errors,
+                'avg_ms': self.total_ms / self.requests if self.requests else 0,
+                'max_ms': self.max_ms,
+                'in_flight': self.in_flight,
+                'last_request_at': self.last_request_at,
+                'written_at': time.time(),
+            }
+
+    def write(self):
+        """Replace this worker's snapshot file atomically"""
+        data = self.snapshot()
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+        self._last_write = data['written_at']
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_worker_stats(directory=None):
+    """
+    Snapshots of every live gunicorn worker
+
+    Files left behind by workers that died without cleaning up are deleted.
+
+    Returns:
+        List of snapshot dicts sorted by pid, with 'booted' and 'last_request' as UTC
+        datetimes (empty when not running under gunicorn.conf.py)
+    """
+    directory = directory or default_stats_dir()
+    if not os.path.isdir(directory):
+        return []
+
+    workers = []
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if _is_running(data['pid']):
+            data['booted'] = datetime.utcfromtimestamp(data['booted_at'])
+            data['last_request'] = datetime.utcfromtimestamp(data['last_request_at']) if data['last_request_at'] else None
+            workers.append(data)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    workers.sort(key=lambda worker: worker['pid'])
+    return workers
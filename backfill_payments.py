@@ -0,0 +1,91 @@
+"""
+Backfill the payments ledger from 'payment_recorded' activity logs
+Safe to run more than once: logs that already have a payment row are skipped
+"""
+import json
+from datetime import datetime
+from app import create_app, db
+from app.models import ActivityLog, Payment, LineOfCredit
+
+BATCH_SIZE = 1000
+
+
+def parse_payment_log(log):
+    """Extract amount, method and date from a payment log's JSON extra_data"""
+    try:
+        data = json.loads(log.extra_data or '{}')
+    except ValueError:
+        return None
+    
+    if data.get('amount') is None:
+        return None
+    
+    payment_date = log.created_at.date()
+    if data.get('date'):
+        try:
+            payment_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    
+    return {
+        'amount': float(data['amount']),
+        'method': data.get('method'),
+        'payment_date': payment_date,
+    }
+
+
+def backfill_payments():
+    app = create_app()
+    
+    with app.app_context():
+        db.create_all()
+        
+        migrated_ids = db.session.query(Payment.activity_log_id).filter(
+            Payment.activity_log_id.isnot(None)
+        )
+        existing_loc_ids = db.session.query(LineOfCredit.id)
+        
+        logs = ActivityLog.query.filter(
+            ActivityLog.action_type == 'payment_recorded',
+            ActivityLog.line_of_credit_id.in_(existing_loc_ids),
+            ActivityLog.id.notin_(migrated_ids)
+        ).order_by(ActivityLog.id).yield_per(BATCH_SIZE)
+        
+        rows = []
+        migrated = 0
+        skipped = 0
+        
+        for log in logs:
+            parsed = parse_payment_log(log)
+            if parsed is None:
+                skipped += 1
+                continue
+            
+            rows.append({
+                'line_of_credit_id': log.line_of_credit_id,
+                'customer_id': log.customer_id,
+                'recorded_by_id': log.user_id,
+                'activity_log_id': log.id,
+                'created_at': log.created_at,
+                **parsed
+            })
+            
+            if len(rows) >= BATCH_SIZE:
+                db.session.execute(db.insert(Payment), rows)
+                migrated += len(rows)
+                rows = []
+        
+        if rows:
+            db.session.execute(db.insert(Payment), rows)
+            migrated += len(rows)
+        
+        db.session.commit()
+        
+        print(f"✅ Migrated {migrated} payments from activity logs")
+        if skipped:
+            print(f"⚠️  Skipped {skipped} logs without a parseable amount")
+        print(f"📊 Payments in ledger: {Payment.query.count()}")
+
+
+if __name__ == "__main__":
+    backfill_payments()
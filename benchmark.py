@@ -0,0 +1,227 @@
+"""
+End-to-end benchmark of the main pages on synthetic data
+Usage: python benchmark.py [--scales 1k 100k 1m] [--requests 30] [--save-baseline]
+       python benchmark.py --scales 100k --data-dir ~/quickline-bench   (reuse generated databases)
+
+For each scale (number of applications; see app/synthetic.py for the rows
+that follow from it) a SQLite database is filled by app.synthetic.generate,
+then every endpoint in ENDPOINTS is requested --requests times through the
+Flask test client as the right kind of user. Prints p50/p95 latency and
+SQL queries per request.
+
+--save-baseline writes the results to --baseline (default
+benchmark_baseline.json). When that file exists, later runs compare
+against it and exit with status 1 if an endpoint's p95 grew by more than
+--tolerance (plus 2ms for timer noise) or it runs more queries than before.
+Baselines are machine-specific: record and compare on the same host.
+
+Caching is off (CACHE_BACKEND=null) so the numbers measure the database
+work; set CACHE_BACKEND to benchmark with a cache.
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault('CACHE_BACKEND', 'null')
+os.environ.setdefault('PAGE_CACHE_ENABLED', '0')
+
+from sqlalchemy import event
+from config import Config, engine_options
+from app import create_app, db
+from app.models import User
+from app.synthetic import generate, ADMIN_EMAIL
+from load_test import APPLICATION_FIELDS
+
+# (endpoint, login as, method, path); logins come from the generated data
+ENDPOINTS = (
+    ('main.apply', None, 'POST', '/apply'),
+    ('admin.dashboard', 'admin', 'GET', '/admin/dashboard'),
+    ('admin.reports', 'admin', 'GET', '/admin/reports'),
+    ('admin.deals', 'admin', 'GET', '/admin/deals'),
+    ('rep.dashboard', 'rep', 'GET', '/rep/dashboard'),
+    ('customer.dashboard', 'customer', 'GET', '/customer/dashboard'),
+)
+
+# Absolute p95 slack (ms) so timer noise on fast pages isn't a regression
+NOISE_MS = 2.0
+
+
+def parse_scale(value):
+    """'1k' -> 1000, '1m' -> 1000000"""
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1].lower(), 1)
+    return int(float(value.rstrip('kKmM')) * multiplier)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def make_app(database_uri):
+    config = type('BenchmarkConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(database_uri),
+        'WTF_CSRF_ENABLED': False,
+        'SQL_QUERY_BUDGET': 0,
+    })
+    return create_app(config)
+
+
+def prepare_data(app, rows, seed, log):
+    """Generate the dataset unless the database already has it; returns the generator's ids"""
+    with app.app_context():
+        db.create_all()
+        marker = os.path.join(os.path.dirname(db.engine.url.database), f'synthetic-{rows}.json')
+        if db.session.scalar(db.select(User.id).filter_by(email=ADMIN_EMAIL)) and os.path.exists(marker):
+            log(f"   reusing {db.engine.url.database}")
+            with open(marker) as f:
+                return json.load(f)
+
+        started = time.perf_counter()
+        data = generate(rows, seed=seed, log=lambda message: None)
+        log(f"   generated {sum(data['counts'].values()):,} rows in {time.perf_counter() - started:.0f}s")
+        with open(marker, 'w') as f:
+            json.dump(data, f)
+        return data
+
+
+def login(client, kind, data):
+    if kind == 'customer':
+        client.post('/auth/customer-login', data={'email': data['customer_email'], 'password': data['password']})
+    elif kind:
+        email = data['admin_email'] if kind == 'admin' else data['rep_email']
+        client.post('/auth/login', data={'email': email, 'password': data['password']})
+
+
+def measure(app, data, requests):
+    """p50/p95 latency and queries per request of every endpoint"""
+    with app.app_context():
+        engine = db.engine
+    queries = [0]
+
+    def count_query(*args):
+        queries[0] += 1
+
+    results = {}
+    for endpoint, kind, method, path in ENDPOINTS:
+        client = app.test_client()
+        login(client, kind, data)
+
+        latencies, counts = [], []
+        for number in range(requests + 2):
+            form = None
+            if method == 'POST':
+                form = dict(APPLICATION_FIELDS, owner_email=f'benchmark-{os.getpid()}-{number}@example.com')
+
+            queries[0] = 0
+            event.listen(engine, 'before_cursor_execute', count_query)
+            started = time.perf_counter()
+            try:
+                response = client.open(path, method=method, data=form)
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                event.remove(engine, 'before_cursor_execute', count_query)
+
+            if response.status_code >= 400 or (method == 'GET' and response.status_code != 200):
+                raise SystemExit(f'⚠️  {endpoint}: {method} {path} returned {response.status_code}')
+            # The first two requests warm up caches and the connection pool
+            if number >= 2:
+                latencies.append(elapsed_ms)
+                counts.append(queries[0])
+
+        latencies.sort()
+        results[endpoint] = {
+            'p50_ms': round(_percentile(latencies, 0.50), 2),
+            'p95_ms': round(_percentile(latencies, 0.95), 2),
+            'queries': max(counts),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print each endpoint against the baseline; returns the number of regressions"""
+    regressions = 0
+    for scale, endpoints in results.items():
+        before = baseline.get('scales', {}).get(scale)
+        if not before:
+            print(f"ℹ️  No baseline for {scale} applications")
+            continue
+        print(f"\n📊 {scale} applications vs baseline ({baseline.get('recorded_at', '?')})")
+        for endpoint, result in endpoints.items():
+            old = before.get(endpoint)
+            if not old:
+                continue
+            slower = result['p95_ms'] > old['p95_ms'] * (1 + tolerance) + NOISE_MS
+            more_queries = result['queries'] > old['queries']
+            regressions += slower or more_queries
+            print(f"{'⚠️ ' if slower or more_queries else '✅'} {endpoint:<20} "
+                  f"p95 {old['p95_ms']:8.1f} -> {result['p95_ms']:8.1f}ms   "
+                  f"queries {old['queries']:3d} -> {result['queries']:3d}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the main pages on synthetic data')
+    parser.add_argument('--scales', nargs='+', default=['1k', '100k', '1m'],
+                        help='Applications per dataset, e.g. 1k 100k 1m (1m takes a while to generate)')
+    parser.add_argument('--requests', type=int, default=30, help='Timed requests per endpoint')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', help='Keep generated databases here and reuse them on later runs')
+    parser.add_argument('--baseline', default='benchmark_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help='Record this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 growth over the baseline')
+    args = parser.parse_args()
+
+    temp_dir = None
+    data_dir = args.data_dir
+    if data_dir:
+        os.makedirs(data_dir, exist_ok=True)
+    else:
+        temp_dir = tempfile.TemporaryDirectory()
+        data_dir = temp_dir.name
+
+    results = {}
+    for scale in args.scales:
+        rows = parse_scale(scale)
+        print(f"\n🚀 {rows:,} applications")
+        app = make_app('sqlite:///' + os.path.abspath(os.path.join(data_dir, f'synthetic-{rows}.db')))
+        data = prepare_data(app, rows, args.seed, print)
+
+        results[str(rows)] = measure(app, data, args.requests)
+        for endpoint, result in results[str(rows)].items():
+            print(f"⏱️  {endpoint:<20} p50 {result['p50_ms']:8.1f}ms   p95 {result['p95_ms']:8.1f}ms   "
+                  f"{result['queries']:3d} queries")
+        with app.app_context():
+            db.engine.dispose()
+
+    if temp_dir:
+        temp_dir.cleanup()
+
+    if args.save_baseline:
+        baseline = {'recorded_at': datetime.utcnow().isoformat(timespec='seconds'),
+                    'python': platform.python_version(), 'machine': platform.node(), 'scales': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline['scales'] = json.load(f).get('scales', {})
+        baseline['scales'].update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\n✅ Baseline saved to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n⚠️  {regressions} regression(s)")
+            raise SystemExit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Prepare the database before the web server starts (runs on every deploy)
+Usage: python bootstrap.py [--force]
+
+Checks the schema version with one query and only creates tables, adds
+columns and runs backfills when the models changed (see app/bootstrap.py).
+Prints how long each start-up phase took.
+"""
+import argparse
+import time
+
+started = time.perf_counter()
+
+from app import create_app
+from app.bootstrap import bootstrap
+
+imported = time.perf_counter()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the schema version and upgrade the database if needed')
+    parser.add_argument('--force', action='store_true', help='Upgrade even if the schema version is current')
+    args = parser.parse_args()
+
+    app = create_app()
+    created = time.perf_counter()
+
+    with app.app_context():
+        upgraded = bootstrap(force=args.force)
+    finished = time.perf_counter()
+
+    if not upgraded:
+        print("✅ Schema is current, nothing to upgrade")
+    print(f"⏱️  Cold start {(finished - started) * 1000:.0f}ms: "
+          f"imports {(imported - started) * 1000:.0f}ms, "
+          f"create_app {(created - imported) * 1000:.0f}ms, "
+          f"{'schema upgrade' if upgraded else 'schema check'} {(finished - created) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
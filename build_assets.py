@@ -0,0 +1,112 @@
+"""
+Build optimized static asset variants
+Usage: python build_assets.py [--force]
+
+Writes, next to each file in app/static:
+  - <name>.gz and <name>.br precompressed copies of text assets (CSS, JS, SVG, ...)
+  - <stem>-<width>w.webp resized WebP copies of PNG / JPEG images (kept only
+    when smaller than the original, which stays the <img> fallback)
+
+The app serves and links these automatically (see app/assets.py). Needs
+Pillow for the image variants and brotli for .br files (pip install Pillow brotli);
+without them those steps are skipped.
+"""
+import argparse
+import gzip
+import os
+from app.assets import _VARIANT_PATTERN
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static')
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.xml', '.html', '.ico', '.map')
+
+# Rendered widths (1x and 2x) of the images the templates show; other images get DEFAULT_WIDTHS
+IMAGE_WIDTHS = {
+    'images/logo.png': (40, 80, 160),
+    'images/hero-business-collage.png': (600, 900),
+}
+DEFAULT_WIDTHS = (480, 960)
+WEBP_QUALITY = 82
+
+
+def is_output(filename):
+    return filename.endswith(('.gz', '.br')) or _VARIANT_PATTERN.match(filename)
+
+
+def up_to_date(source, target, force):
+    return not force and os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+
+def compress(path, force):
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    written = 0
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not up_to_date(path, path + '.gz', force):
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9))
+        written += 1
+    if brotli and not up_to_date(path, path + '.br', force):
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+        written += 1
+    return written
+
+
+def image_variants(path, filename, force):
+    from PIL import Image
+
+    stem = os.path.splitext(path)[0]
+    original_size = os.path.getsize(path)
+    written = 0
+    with Image.open(path) as image:
+        widths = [width for width in IMAGE_WIDTHS.get(filename, DEFAULT_WIDTHS) if width < image.width]
+        widths.append(image.width)
+        for width in widths:
+            target = f'{stem}-{width}w.webp'
+            if up_to_date(path, target, force):
+                continue
+            height = round(image.height * width / image.width)
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            resized.save(target, 'WEBP', quality=WEBP_QUALITY, method=6)
+            if os.path.getsize(target) >= original_size:
+                os.remove(target)
+                continue
+            written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build precompressed and resized static asset variants')
+    parser.add_argument('--force', action='store_true', help='Rebuild variants that are already up to date')
+    args = parser.parse_args()
+
+    try:
+        import PIL  # noqa: F401
+        have_pillow = True
+    except ImportError:
+        have_pillow = False
+        print("⚠️  Pillow is not installed; skipping image variants")
+
+    compressed = images = 0
+    for root, _, files in os.walk(STATIC_FOLDER):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, STATIC_FOLDER).replace(os.sep, '/')
+            if is_output(filename):
+                continue
+            ext = os.path.splitext(name)[1].lower()
+            if ext in COMPRESSIBLE_EXTENSIONS:
+                compressed += compress(path, args.force)
+            elif ext in ('.png', '.jpg', '.jpeg') and have_pillow:
+                images += image_variants(path, filename, args.force)
+
+    print(f"✅ Wrote {compressed} precompressed files and {images} image variants")
+
+
+if __name__ == "__main__":
+    main()
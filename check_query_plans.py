@@ -0,0 +1,192 @@
+"""
+Query-plan regression check for the dashboards and list pages
+Usage: python check_query_plans.py [--rows 10000] [--database-url postgresql://.../scratch] [--query-budget 30] [--verbose]
+
+Loads the synthetic dataset of app/synthetic.py into a throwaway database
+(a temporary SQLite file unless --database-url points at an EMPTY scratch
+database), requests every checked page as the right kind of user, captures each SELECT the page
+runs and EXPLAINs it. A page fails when one of its queries reads a whole
+table instead of using an index (SQLite "SCAN <table>", PostgreSQL "Seq
+Scan" with enable_seqscan off), except for the small tables listed in
+SMALL_TABLES. Every request also runs under its view's @query_budget (or
+--query-budget for views without one), so a page that runs more statements
+than its budget fails too. Exits with status 1 if any page fails.
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description='EXPLAIN every query of the main pages and flag full table scans')
+parser.add_argument('--rows', type=int, default=10000, help='Applications to generate (other tables scale from it)')
+parser.add_argument('--database-url', help='Empty scratch database to use instead of a temporary SQLite file')
+parser.add_argument('--query-budget', type=int, default=30,
+                    help='Statements allowed per request for views without a @query_budget')
+parser.add_argument('--verbose', action='store_true', help='Print every query plan')
+args = parser.parse_args()
+
+_temp_dir = None
+if args.database_url:
+    os.environ['DATABASE_URL'] = args.database_url
+else:
+    _temp_dir = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_temp_dir.name, 'plans.db')
+os.environ.setdefault('PAGE_CACHE_ENABLED', '0')
+os.environ.setdefault('CACHE_BACKEND', 'null')
+# Read when the app is created (it decides whether the budget hooks are installed)
+os.environ['SQL_QUERY_BUDGET'] = str(args.query_budget)
+
+from sqlalchemy import event
+from app import create_app, db
+from app.instrumentation import QueryBudgetExceeded
+from app.models import Application
+from app.synthetic import generate
+
+# Tables that stay small whatever the volume (scanning them is fine)
+SMALL_TABLES = {'users', 'portfolio_rollup', 'schema_version'}
+
+_SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)')
+
+
+def checked_pages(data):
+    """(name, login as, method, url) of every page whose queries are checked"""
+    return [
+        ('admin dashboard', 'admin', 'GET', '/admin/dashboard'),
+        ('applications', 'admin', 'GET', '/admin/applications'),
+        ('pending applications', 'admin', 'GET', '/admin/applications?status=pending'),
+        ('view application', 'admin', 'GET', f"/admin/application/{data['pending_application_id']}"),
+        ('approve application', 'admin', 'POST', f"/admin/application/{data['pending_application_id']}/approve"),
+        ('deals', 'admin', 'GET', '/admin/deals'),
+        ('active deals', 'admin', 'GET', '/admin/deals?status=active'),
+        ('deals by rep', 'admin', 'GET', f"/admin/deals?rep={data['rep_id']}"),
+        ('view deal', 'admin', 'GET', f"/admin/deal/{data['deal_id']}"),
+        ('customers', 'admin', 'GET', '/admin/customers'),
+        ('withdrawal requests', 'admin', 'GET', '/admin/withdrawal-requests'),
+        ('all withdrawal requests', 'admin', 'GET', '/admin/withdrawal-requests?status=all'),
+        ('activity logs', 'admin', 'GET', '/admin/activity-logs'),
+        ('payment activity', 'admin', 'GET', '/admin/activity-logs?type=payment_recorded'),
+        ('reports', 'admin', 'GET', '/admin/reports'),
+        ('search', 'admin', 'GET', '/admin/search?q=acme'),
+        ('rep dashboard', 'rep', 'GET', '/rep/dashboard'),
+        ('rep deal', 'rep', 'GET', f"/rep/deal/{data['deal_id']}"),
+        ('customer dashboard', 'customer', 'GET', '/customer/dashboard'),
+        ('customer details', 'customer', 'GET', '/customer/details'),
+    ]
+
+
+def login(client, kind, data):
+    if kind == 'customer':
+        return client.post('/auth/customer-login', data={'email': data['customer_email'], 'password': data['password']})
+    email = data['admin_email'] if kind == 'admin' else data['rep_email']
+    return client.post('/auth/login', data={'email': email, 'password': data['password']})
+
+
+def explain(engine, statement, parameters):
+    """
+    Plan of one captured SELECT
+
+    Returns:
+        Tuple of (plan lines, names of tables read with a full scan)
+    """
+    with engine.connect() as conn:
+        if conn.dialect.name == 'postgresql':
+            conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            plan = conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters).scalar()
+            plan = plan if isinstance(plan, list) else json.loads(plan)
+            lines, scans = [], set()
+            nodes = [(plan[0]['Plan'], 0)]
+            while nodes:
+                node, depth = nodes.pop()
+                relation = node.get('Relation Name')
+                lines.append('  ' * depth + node['Node Type'] + (f' on {relation}' if relation else ''))
+                if node['Node Type'] == 'Seq Scan' and relation:
+                    scans.add(relation)
+                nodes.extend((child, depth + 1) for child in reversed(node.get('Plans', [])))
+            return lines, scans
+
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+        lines = [row[-1] for row in rows]
+        scans = set()
+        for line in lines:
+            match = _SQLITE_SCAN_RE.match(line)
+            if match and 'USING' not in line and 'VIRTUAL TABLE' not in line and match.group(1) != 'CONSTANT':
+                scans.add(re.sub(r'_\d+$', '', match.group(1)))
+        return lines, scans
+
+
+def main():
+    app = create_app()
+    # TESTING lets QueryBudgetExceeded propagate out of the test client instead of becoming a 500
+    app.config.update(WTF_CSRF_ENABLED=False, TESTING=True)
+
+    with app.app_context():
+        db.create_all()
+        if db.session.scalar(db.select(db.func.count(Application.id))):
+            raise SystemExit('⚠️  The database already has data; point --database-url at an empty scratch database')
+
+        started = time.perf_counter()
+        data = generate(args.rows, log=lambda message: None)
+        engine = db.engine
+        print(f"📊 Generated {sum(data['counts'].values()):,} rows in {time.perf_counter() - started:.1f}s "
+              f"({engine.dialect.name})")
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            captured.append((statement, parameters))
+
+    # Requests run outside the setup app context so each one gets its own
+    # context (and logged-in user)
+    failures = 0
+    for name, kind, method, url in checked_pages(data):
+        client = app.test_client()
+        login(client, kind, data)
+
+        captured.clear()
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            response = client.open(url, method=method)
+        except QueryBudgetExceeded as error:
+            print(f"⚠️  {name}: {error}")
+            failures += 1
+            continue
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+
+        problems = []
+        for statement, parameters in captured:
+            lines, scans = explain(engine, statement, parameters)
+            scans -= SMALL_TABLES
+            if scans:
+                problems.append((statement, lines, scans))
+            if args.verbose:
+                print(f"      {' '.join(statement.split())[:120]}")
+                for line in lines:
+                    print(f"        {line}")
+
+        if response.status_code >= 400 or (method == 'GET' and response.status_code != 200):
+            print(f"⚠️  {name}: {method} {url} returned {response.status_code}")
+            failures += 1
+        elif problems:
+            print(f"⚠️  {name}: {len(problems)} of {len(captured)} queries scan a whole table")
+            for statement, lines, scans in problems:
+                print(f"      tables: {', '.join(sorted(scans))}")
+                print(f"      {' '.join(statement.split())[:200]}")
+                for line in lines:
+                    print(f"        {line}")
+            failures += 1
+        else:
+            print(f"✅ {name}: {len(captured)} queries, all indexed")
+
+    engine.dispose()
+    if _temp_dir:
+        _temp_dir.cleanup()
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ WARNING: This will delete ALL applications, customers, lines of credit, and acti
 Only the admin user account will remain.
 """
 from app import create_app, db
-from app.models import User, Customer, Application, LineOfCredit, ActivityLog, WithdrawalRequest
+from app.models import User, Customer, Application, LineOfCredit, ActivityLog, WithdrawalRequest, Payment, ApplicationMatchKey, PaymentScheduleEntry, DelinquencyStatus, PortfolioRollup, CustomerSummary
 
 def clear_database():
     """Clear all data except admin account"""
@@ -20,6 +20,7 @@ def clear_database():
         print(f"  Customers: {Customer.query.count()}")
         print(f"  Lines of Credit: {LineOfCredit.query.count()}")
         print(f"  Withdrawal Requests: {WithdrawalRequest.query.count()}")
+        print(f"  Payments: {Payment.query.count()}")
         print(f"  Activity Logs: {ActivityLog.query.count()}")
         print(f"  Users (total): {User.query.count()}")
         print(f"  Admins: {User.query.filter_by(role='admin').count()}")
@@ -41,27 +42,57 @@ def clear_database():
         deleted_counts['Withdrawal Requests'] = count
         print(f"  ✓ Deleted {count} withdrawal requests")
         
-        # 2. Delete activity logs
+        # 2. Delete payments
+        count = Payment.query.delete()
+        deleted_counts['Payments'] = count
+        print(f"  ✓ Deleted {count} payments")
+        
+        # 3. Delete payment schedules
+        count = PaymentScheduleEntry.query.delete()
+        deleted_counts['Payment Schedule Entries'] = count
+        print(f"  ✓ Deleted {count} payment schedule entries")
+        
+        # 4. Delete delinquency scan results
+        count = DelinquencyStatus.query.delete()
+        deleted_counts['Delinquency Status'] = count
+        print(f"  ✓ Deleted {count} delinquency status rows")
+        
+        # 5. Delete activity logs
         count = ActivityLog.query.delete()
         deleted_counts['Activity Logs'] = count
         print(f"  ✓ Deleted {count} activity logs")
         
-        # 3. Delete lines of credit
+        # 6. Delete lines of credit
         count = LineOfCredit.query.delete()
         deleted_counts['Lines of Credit'] = count
         print(f"  ✓ Deleted {count} lines of credit")
         
-        # 4. Delete customers
+        # 7. Delete portfolio rollup totals (dashboards and reports read deal totals from them)
+        count = PortfolioRollup.query.delete()
+        deleted_counts['Portfolio Rollup'] = count
+        print(f"  ✓ Deleted {count} portfolio rollup rows")
+        
+        # 8. Delete customer dashboard summaries
+        count = CustomerSummary.query.delete()
+        deleted_counts['Customer Summaries'] = count
+        print(f"  ✓ Deleted {count} customer summaries")
+        
+        # 9. Delete customers
         count = Customer.query.delete()
         deleted_counts['Customers'] = count
         print(f"  ✓ Deleted {count} customers")
         
-        # 5. Delete applications
+        # 10. Delete duplicate-detection keys
+        count = ApplicationMatchKey.query.delete()
+        deleted_counts['Application Match Keys'] = count
+        print(f"  ✓ Deleted {count} application match keys")
+        
+        # 11. Delete applications
         count = Application.query.delete()
         deleted_counts['Applications'] = count
         print(f"  ✓ Deleted {count} applications")
         
-        # 6. Delete non-admin users (reps)
+        # 12. Delete non-admin users (reps)
         count = User.query.filter(User.role != 'admin').delete()
         deleted_counts['Rep Users'] = count
         print(f"  ✓ Deleted {count} rep users")
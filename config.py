@@ -5,6 +5,25 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'))
 
 
+def engine_options(uri):
+    """SQLAlchemy engine options for the database URI, from the DB_* environment variables"""
+    # Test each connection before use so ones the server (or Railway's proxy) closed while idle are replaced
+    options = {'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1'}
+    if uri.startswith('sqlite'):
+        return options  # SQLite picks its own pool; sizing doesn't apply
+    
+    options.update(
+        pool_size=int(os.environ.get('DB_POOL_SIZE', 5)),  # connections kept open per worker
+        max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 5)),  # extra connections allowed under load
+        pool_timeout=int(os.environ.get('DB_POOL_TIMEOUT', 10)),  # seconds to wait for a free connection
+        pool_recycle=int(os.environ.get('DB_POOL_RECYCLE', 1800)),  # seconds before a connection is replaced
+    )
+    statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))  # 0 = no limit
+    if statement_timeout and uri.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
@@ -14,5 +33,35 @@ class Config:
     if SQLALCHEMY_DATABASE_URI and SQLALCHEMY_DATABASE_URI.startswith("postgres://"):
         SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace("postgres://", "postgresql://", 1)
     
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     WTF_CSRF_ENABLED = True
+    
+    # Fail any request that runs more SQL statements than this (0 = off; set in tests)
+    SQL_QUERY_BUDGET = int(os.environ.get('SQL_QUERY_BUDGET', 0))
+    
+    # Per-request query/template timing (Server-Timing header and /admin/perf)
+    PERF_INSTRUMENTATION = os.environ.get('PERF_INSTRUMENTATION', '1') == '1'
+    PERF_WINDOW_SIZE = int(os.environ.get('PERF_WINDOW_SIZE', 500))  # requests kept per endpoint
+    
+    # Activity logs join the caller's transaction unless buffered mode is on,
+    # in which case a background writer inserts them in batches
+    ACTIVITY_LOG_BUFFERED = os.environ.get('ACTIVITY_LOG_BUFFERED', '0') == '1'
+    ACTIVITY_LOG_BATCH_SIZE = int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE', 100))
+    ACTIVITY_LOG_FLUSH_INTERVAL = float(os.environ.get('ACTIVITY_LOG_FLUSH_INTERVAL', 2.0))  # seconds
+    
+    # Rendered public pages served from memory to anonymous visitors
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', '1') == '1'
+    PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 300))  # seconds a rendered page is reused
+    PAGE_CACHE_MAX_AGE = int(os.environ.get('PAGE_CACHE_MAX_AGE', 60))  # browser / CDN Cache-Control max-age
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 256))
+    
+    # Cache for dashboard / report aggregates: 'memory' (per worker), 'redis' (shared) or 'null'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 60))  # seconds
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))  # memory backend only
+    
+    # Gunicorn worker processes, each with its own connection pool (used to size the pool)
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+    DB_SLOW_CHECKOUT_MS = float(os.environ.get('DB_SLOW_CHECKOUT_MS', 100))  # checkout waits counted as slow
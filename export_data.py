@@ -0,0 +1,34 @@
+"""
+Stream a full export of applications or deals to a file (or stdout)
+Usage: python export_data.py applications|deals [--format csv|jsonl] [-o output.csv]
+"""
+import argparse
+import sys
+from app import create_app
+from app.exports import EXPORTS, EXPORT_FORMATS, stream_export
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export applications or deals')
+    parser.add_argument('table', choices=sorted(EXPORTS))
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    args = parser.parse_args()
+    
+    app = create_app()
+    
+    with app.app_context():
+        out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+        try:
+            for chunk in stream_export(EXPORTS[args.table](), args.format):
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+        
+        if args.output:
+            print(f"✅ Exported {args.table} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
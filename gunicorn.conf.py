@@ -0,0 +1,92 @@
+"""
+Gunicorn production profile
+Usage: gunicorn -c gunicorn.conf.py run:app
+
+Every setting can be overridden with an environment variable:
+
+    PORT                     Port to bind (Railway sets this)
+    WEB_CONCURRENCY          Worker processes (default 2 x CPUs + 1, at most GUNICORN_MAX_WORKERS)
+    GUNICORN_MAX_WORKERS     Upper bound for the automatic worker count (default 8)
+    GUNICORN_THREADS         Threads per worker (default 4; 1 = sync workers)
+    GUNICORN_TIMEOUT         Seconds before a stuck worker is killed (default 60)
+    GUNICORN_MAX_REQUESTS    Requests before a worker is recycled (default 1000, 0 = never)
+    GUNICORN_PRELOAD         Load the app once before forking (default 1)
+    WORKER_STATS_DIR         Where workers write their request counters (shown on /admin/perf)
+
+Each worker has its own database pool, so keep GUNICORN_THREADS at or below
+DB_POOL_SIZE + DB_MAX_OVERFLOW and WEB_CONCURRENCY x that sum below the
+server's max_connections.
+"""
+import multiprocessing
+import os
+import time
+
+_config_loaded_at = time.perf_counter()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+workers = int(os.environ.get('WEB_CONCURRENCY') or min(
+    multiprocessing.cpu_count() * 2 + 1,
+    int(os.environ.get('GUNICORN_MAX_WORKERS', 8))
+))
+# config.Config reads this to size the connection pool check on /admin/perf
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then so slow memory growth can't build up; the
+# jitter keeps them from all restarting at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max(max_requests // 10, 0)))
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None  # '-' logs requests to stdout
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    from app.worker_stats import default_stats_dir
+    server.log.info('Starting %d %s worker(s) with %d thread(s), stats in %s',
+                    workers, worker_class, threads, default_stats_dir())
+
+
+def when_ready(server):
+    # Includes loading the app when it is preloaded
+    server.log.info('Ready in %.0fms', (time.perf_counter() - _config_loaded_at) * 1000)
+
+
+def post_fork(server, worker):
+    from app.worker_stats import WorkerStats, default_stats_dir
+
+    # A preloaded app was created in the master: give this worker its own connections
+    if preload_app:
+        from run import app
+        from app import db
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+    worker.quickline_stats = WorkerStats(default_stats_dir(), worker_class, threads)
+    worker.quickline_stats.write()
+
+
+def pre_request(worker, req):
+    req.quickline_started = time.perf_counter()
+    worker.quickline_stats.start_request()
+
+
+def post_request(worker, req, environ, resp):
+    duration_ms = (time.perf_counter() - req.quickline_started) * 1000
+    worker.quickline_stats.finish_request(duration_ms, resp.status_code or 0)
+
+
+def worker_exit(server, worker):
+    stats = getattr(worker, 'quickline_stats', None)
+    if stats is not None:
+        stats.remove()
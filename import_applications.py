@@ -0,0 +1,43 @@
+"""
+Bulk import applications from a CSV or JSON lines file
+Usage: python import_applications.py applications.csv [--format csv|jsonl] [--errors rejected.csv]
+"""
+import argparse
+from app import create_app, db
+from app.application_import import import_applications, detect_format, IMPORT_FORMATS, IMPORT_BATCH_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import applications from a CSV or JSON lines file')
+    parser.add_argument('path', help='File to import')
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help='File format (default: from the file extension)')
+    parser.add_argument('--errors', help='Write a CSV report of rejected rows to this path')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows per insert')
+    args = parser.parse_args()
+    
+    fmt = args.format or detect_format(args.path)
+    app = create_app()
+    
+    with app.app_context():
+        db.create_all()
+        
+        error_file = open(args.errors, 'w', newline='', encoding='utf-8') if args.errors else None
+        try:
+            with open(args.path, newline='', encoding='utf-8-sig') as f:
+                result = import_applications(f, fmt, error_stream=error_file, batch_size=args.batch_size)
+        finally:
+            if error_file:
+                error_file.close()
+        
+        print(f"✅ Imported {result.imported} applications")
+        if result.rejected:
+            print(f"⚠️  Rejected {result.rejected} rows")
+            if args.errors:
+                print(f"📊 Error report written to {args.errors}")
+            else:
+                for error in result.errors[:10]:
+                    print(f"   line {error['line']}: {error['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+HTTP load test for the dashboard and apply endpoints
+Usage: python load_test.py --email admin@example.com --password secret [--url http://localhost:8000]
+       python load_test.py --compare --email admin@example.com --password secret
+
+Runs --clients concurrent clients for --duration seconds per scenario and
+prints requests/second and latency percentiles:
+
+    dashboard  GET /admin/dashboard as a logged-in admin
+    reports    GET /admin/reports as a logged-in admin (a slow page)
+    apply      GET /apply (POST a complete application with --submit; this
+               creates real pending applications)
+
+--compare starts the app twice against the configured DATABASE_URL, first
+as plain gunicorn (one sync worker, what `gunicorn run:app` gave before
+gunicorn.conf.py existed) and then with gunicorn.conf.py,
+runs the same load against both and prints the throughput side by side.
+Only uses the standard library.
+"""
+import argparse
+import http.cookiejar
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+SCENARIOS = ('dashboard', 'reports', 'apply')
+
+PROFILES = {
+    # gunicorn reads ./gunicorn.conf.py by default; an empty config gives its stock single sync worker
+    'bare': ['gunicorn', '-c', os.devnull, '--bind', '127.0.0.1:{port}', 'run:app'],
+    'tuned': ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', '127.0.0.1:{port}', 'run:app'],
+}
+
+_CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+APPLICATION_FIELDS = {
+    'business_name': 'Load Test Co', 'business_type': 'LLC', 'industry': 'Retail',
+    'years_in_business': '3', 'business_address': '1 Main St', 'business_city': 'Austin',
+    'business_state': 'TX', 'business_zip': '78701', 'business_phone': '5125550100',
+    'monthly_revenue': '50000', 'annual_revenue': '600000', 'average_monthly_bank_balance': '20000',
+    'requested_amount': '25000', 'purpose_of_funding': 'Inventory',
+    'owner_first_name': 'Load', 'owner_last_name': 'Test', 'owner_phone': '5125550101',
+    'owner_ssn_last_4': '1234', 'owner_date_of_birth': '1980-01-01', 'owner_address': '1 Main St',
+    'owner_city': 'Austin', 'owner_state': 'TX', 'owner_zip': '78701', 'ownership_percentage': '100',
+    'bank_name': 'Test Bank', 'bank_account_type': 'Checking', 'time_with_bank': '3',
+    'average_daily_balance': '15000',
+}
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+class Client:
+    """One simulated user with its own cookie jar"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(self.base_url + path, body, timeout=120) as response:
+                return response.status, response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as e:
+            return e.code, ''
+
+    def csrf_token(self, path):
+        _, html = self.request(path)
+        match = _CSRF_PATTERN.search(html)
+        return match.group(1) if match else ''
+
+    def login(self, email, password):
+        token = self.csrf_token('/auth/login')
+        status, html = self.request('/auth/login', {'csrf_token': token, 'email': email, 'password': password})
+        if 'Invalid email or password' in html or status >= 400:
+            raise SystemExit(f'⚠️  Could not log in as {email}')
+
+
+def run_scenario(base_url, scenario, clients, duration, args):
+    """
+    Hammer one scenario from many clients at once
+
+    Returns:
+        Dict with requests, errors, rps, p50_ms, p95_ms and max_ms
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    sessions = [Client(base_url) for _ in range(clients)]
+    if scenario in ('dashboard', 'reports'):
+        for client in sessions:
+            client.login(args.email, args.password)
+    deadline = time.perf_counter() + duration
+
+    def client_loop(number, client):
+        sequence = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if scenario == 'apply' and args.submit:
+                sequence += 1
+                fields = dict(APPLICATION_FIELDS, csrf_token=client.csrf_token('/apply'),
+                              owner_email=f'loadtest-{os.getpid()}-{number}-{sequence}@example.com')
+                status, _ = client.request('/apply', fields)
+            else:
+                status, _ = client.request({'dashboard': '/admin/dashboard', 'reports': '/admin/reports',
+                                            'apply': '/apply'}[scenario])
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed_ms)
+                errors[0] += status >= 400
+
+    threads = [threading.Thread(target=client_loop, args=(number, client), daemon=True)
+               for number, client in enumerate(sessions)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed if elapsed else 0,
+        'p50_ms': _percentile(latencies, 0.50),
+        'p95_ms': _percentile(latencies, 0.95),
+        'max_ms': latencies[-1] if latencies else 0,
+    }
+
+
+def run_all(base_url, args):
+    results = {}
+    for scenario in args.scenarios:
+        result = run_scenario(base_url, scenario, args.clients, args.duration, args)
+        results[scenario] = result
+        print(f"📊 {scenario:<10} {result['rps']:8.1f} req/s   p50 {result['p50_ms']:7.1f}ms   "
+              f"p95 {result['p95_ms']:7.1f}ms   max {result['max_ms']:7.1f}ms   "
+              f"{result['requests']} requests, {result['errors']} errors")
+    return results
+
+
+def wait_for_server(base_url, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit('⚠️  gunicorn exited during startup')
+        try:
+            urllib.request.urlopen(base_url + '/apply', timeout=2).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.25)
+    raise SystemExit('⚠️  gunicorn did not start in time')
+
+
+def compare(args):
+    """Run the scenarios against the bare and the tuned gunicorn profile"""
+    results = {}
+    for profile, command in PROFILES.items():
+        base_url = f'http://127.0.0.1:{args.port}'
+        env = dict(os.environ, GUNICORN_ACCESS_LOG='')
+        process = subprocess.Popen([part.format(port=args.port) for part in command], env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_server(base_url, process)
+            print(f"\n🚀 {profile}: {' '.join(command).format(port=args.port)}")
+            results[profile] = run_all(base_url, args)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print('\n📊 Throughput (req/s)')
+    print(f"{'scenario':<12}{'bare':>10}{'tuned':>10}{'speedup':>10}")
+    for scenario in args.scenarios:
+        bare, tuned = results['bare'][scenario]['rps'], results['tuned'][scenario]['rps']
+        print(f"{scenario:<12}{bare:>10.1f}{tuned:>10.1f}{(tuned / bare if bare else 0):>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the dashboard and apply endpoints')
+    parser.add_argument('--url', default='http://localhost:8000', help='Server to test (ignored with --compare)')
+    parser.add_argument('--email', help='Admin login for the dashboard and reports scenarios')
+    parser.add_argument('--password')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds per scenario')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=['dashboard', 'apply'])
+    parser.add_argument('--submit', action='store_true', help='POST applications instead of loading the form')
+    parser.add_argument('--compare', action='store_true', help='Start bare and tuned gunicorn and compare them')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the --compare servers')
+    args = parser.parse_args()
+
+    if {'dashboard', 'reports'} & set(args.scenarios) and not (args.email and args.password):
+        parser.error('--email and --password are required for the dashboard and reports scenarios')
+
+    if args.compare:
+        compare(args)
+    else:
+        print(f'🚀 {args.clients} clients x {args.duration:g}s against {args.url}')
+        run_all(args.url, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""
+Post a bank remittance file of collected payments
+Usage: python post_payments.py remittance.csv [--format csv|nacha] [--dry-run]
+"""
+import argparse
+from datetime import date
+from app import create_app, db
+from app.payment_posting import post_payments, parse_payment_file, detect_format, POSTING_FORMATS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Post payments from a CSV or NACHA remittance file')
+    parser.add_argument('path', help='Remittance file')
+    parser.add_argument('--format', choices=POSTING_FORMATS, help='File format (default: from the file extension)')
+    parser.add_argument('--method', help='Payment method for every row (default: from the file, else ACH)')
+    parser.add_argument('--dry-run', action='store_true', help='Validate and report without posting')
+    args = parser.parse_args()
+    
+    fmt = args.format or detect_format(args.path)
+    app = create_app()
+    
+    with app.app_context():
+        db.create_all()
+        
+        with open(args.path, newline='', encoding='utf-8-sig') as f:
+            result = post_payments(parse_payment_file(f, fmt, default_date=date.today()),
+                                   method=args.method, dry_run=args.dry_run)
+        
+        verb = 'Would post' if result.dry_run else 'Posted'
+        print(f"✅ {verb} {result.posted} payments totaling ${result.total_amount:,.2f}")
+        if result.paid_off:
+            print(f"📊 {len(result.paid_off)} deals paid off: {', '.join(str(deal_id) for deal_id in result.paid_off[:20])}")
+        if result.rejected:
+            print(f"⚠️  Rejected {result.rejected} rows")
+            for error in result.errors[:10]:
+                print(f"   line {error['line']} ({error['reference']}): {error['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Rebuild the customer portal read model (customer_summaries) from the source tables
+Run to reconcile the summaries after manual data fixes
+"""
+from app import create_app, db
+from app.customer_summary import rebuild_customer_summaries
+
+
+def main():
+    app = create_app()
+    
+    with app.app_context():
+        db.create_all()
+        
+        rows = rebuild_customer_summaries()
+        
+        print(f"✅ Customer summaries rebuilt: {rows} customers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Re-score the whole application backlog for duplicates
+Recomputes every application's match keys; run after changing the normalization rules in app/duplicates.py
+"""
+from app import create_app, db
+from app.duplicates import rebuild_duplicate_index
+
+
+def main():
+    app = create_app()
+    
+    with app.app_context():
+        db.create_all()
+        
+        keys = rebuild_duplicate_index()
+        
+        print(f"✅ Duplicate index rebuilt: {keys} match keys")
+
+
+if __name__ == "__main__":
+    main()
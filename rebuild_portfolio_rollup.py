@@ -0,0 +1,21 @@
+"""
+Rebuild the portfolio rollup table from lines of credit
+Run after deploying the rollup table, or to reconcile totals after manual data fixes
+"""
+from app import create_app, db
+from app.portfolio import rebuild_portfolio_rollup
+
+
+def main():
+    app = create_app()
+    
+    with app.app_context():
+        db.create_all()
+        
+        rows = rebuild_portfolio_rollup()
+        
+        print(f"✅ Portfolio rollup rebuilt: {rows} (status, rep) rows")
+
+
+if __name__ == "__main__":
+    main()
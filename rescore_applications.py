@@ -0,0 +1,26 @@
+"""
+Re-score applications with the current underwriting rules
+Usage: python rescore_applications.py [--all]   (default: pending applications only)
+"""
+import argparse
+from app import create_app, db
+from app.underwriting import rescore_applications, SCORE_VERSION
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-score applications with the current underwriting rules')
+    parser.add_argument('--all', action='store_true', help='Re-score every application, not just pending ones')
+    args = parser.parse_args()
+    
+    app = create_app()
+    
+    with app.app_context():
+        db.create_all()
+        
+        scored = rescore_applications(statuses=None if args.all else ('pending',))
+        
+        print(f"✅ Scored {scored} applications with rules {SCORE_VERSION}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Scan every active line of credit for late payments
+Writes expected vs. actual payments and the delinquency bucket to delinquency_status.
+Schedule it daily (e.g. a Railway cron job running: python scan_delinquency.py)
+"""
+import time
+from app import create_app, db
+from app.delinquency import scan_delinquency
+
+
+def main():
+    app = create_app()
+    
+    with app.app_context():
+        db.create_all()
+        
+        started = time.perf_counter()
+        counts = scan_delinquency()
+        elapsed = time.perf_counter() - started
+        
+        print(f"✅ Scanned {sum(counts.values())} active deals in {elapsed:.1f}s")
+        for bucket, count in counts.items():
+            print(f"📊 {bucket}: {count}")
+
+
+if __name__ == "__main__":
+    main()
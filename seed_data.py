@@ -0,0 +1,50 @@
+"""
+Fill the configured database with a deterministic synthetic portfolio
+Usage: python seed_data.py --applications 100000 [--seed 42] [--as-of 2026-01-31] [--no-schedules]
+
+For local development, demos and load tests (load_test.py), never for
+production. Generates reps, applications, customers, lines of credit,
+payment history and withdrawal requests (see app/synthetic.py for the
+distributions). The database must not contain applications yet; empty it
+with clear_database.py first. Every generated login uses the password
+'synthetic'.
+"""
+import argparse
+import time
+from datetime import date
+from app import create_app, db
+from app.models import Application
+from app.synthetic import generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic portfolio')
+    parser.add_argument('--applications', type=int, default=10000, help='Applications to generate')
+    parser.add_argument('--seed', type=int, default=42, help='Same seed and --as-of give the same data')
+    parser.add_argument('--as-of', type=date.fromisoformat, help='Date the history ends on (default today)')
+    parser.add_argument('--no-schedules', action='store_true',
+                        help='Skip payment schedules and the delinquency scan (much faster at millions of rows)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if Application.query.first() is not None:
+            raise SystemExit('⚠️  The database already has applications; run clear_database.py first')
+
+        print(f"🚀 Generating {args.applications:,} applications (seed {args.seed})...")
+        started = time.perf_counter()
+        data = generate(args.applications, seed=args.seed, as_of=args.as_of, schedules=not args.no_schedules)
+
+        print(f"\n✅ Done in {time.perf_counter() - started:.0f}s")
+        for table, count in data['counts'].items():
+            print(f"   {table:<22} {count:>10,}")
+        print(f"\n👤 Logins (password '{data['password']}')")
+        print(f"   admin     {data['admin_email']}")
+        if data['deal_id']:
+            print(f"   rep       {data['rep_email']}")
+            print(f"   customer  {data['customer_email']}")
+
+
+if __name__ == "__main__":
+    main()
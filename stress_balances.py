@@ -0,0 +1,168 @@
+"""
+Multi-threaded stress test for concurrent balance updates
+Usage: python stress_balances.py [--threads 8] [--withdrawals 60] [--payments 200]
+
+Creates two throwaway lines of credit, then has many threads (each with its
+own app context, session and connection) race to approve the same withdrawal
+requests and record payments at the same time. Checks that no update was
+lost, no request was approved twice and approved_amount was never exceeded,
+then deletes everything it created. Point DATABASE_URL at PostgreSQL to test
+row locking the way production runs; on SQLite the writers are serialized
+and "database is locked" errors are retried.
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import date
+from sqlalchemy.exc import OperationalError
+from app import create_app, db
+from app.models import User, Customer, LineOfCredit, WithdrawalRequest, Payment, ActivityLog, PaymentScheduleEntry
+from app.balances import BalanceConflict, apply_payment, approve_withdrawal_request
+from app.portfolio import rebuild_portfolio_rollup
+
+APPROVED_AMOUNT = 10000.0
+WITHDRAWAL_AMOUNT = 300.0
+PAYMENT_AMOUNT = 1.0
+MAX_RETRIES = 50
+
+
+def run_with_retry(work, counters, lock):
+    """Run work() and commit, retrying when the database reports a lock conflict"""
+    for _ in range(MAX_RETRIES):
+        try:
+            work()
+            db.session.commit()
+            return 'ok'
+        except BalanceConflict:
+            db.session.rollback()
+            return 'refused'
+        except OperationalError:
+            db.session.rollback()
+            with lock:
+                counters['retries'] += 1
+            time.sleep(random.uniform(0.001, 0.02))
+    return 'gave_up'
+
+
+def worker(app, tasks, counters, lock, reviewer_id):
+    with app.app_context():
+        while True:
+            with lock:
+                if not tasks:
+                    return
+                kind, target_id = tasks.pop()
+
+            if kind == 'approve':
+                def work():
+                    withdrawal = db.session.get(WithdrawalRequest, target_id)
+                    approve_withdrawal_request(withdrawal, db.session.get(User, reviewer_id))
+            else:
+                def work():
+                    loc = db.session.get(LineOfCredit, target_id)
+                    apply_payment(loc, PAYMENT_AMOUNT, date.today())
+                    db.session.add(Payment(line_of_credit_id=loc.id, customer_id=loc.customer_id,
+                                           amount=PAYMENT_AMOUNT, payment_date=date.today(),
+                                           method='ACH', recorded_by_id=reviewer_id))
+
+            outcome = run_with_retry(work, counters, lock)
+            with lock:
+                counters[f'{kind}_{outcome}'] = counters.get(f'{kind}_{outcome}', 0) + 1
+            db.session.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Race concurrent withdrawal approvals and payments')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--withdrawals', type=int, default=60, help='Pending withdrawals (each approved twice)')
+    parser.add_argument('--payments', type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app()
+    tag = f'stress-{int(time.time())}'
+
+    with app.app_context():
+        db.create_all()
+
+        reviewer = User(username=tag, email=f'{tag}@example.com', role='admin')
+        draw_customer = Customer(email=f'{tag}-draw@example.com', business_name=f'{tag} draws')
+        pay_customer = Customer(email=f'{tag}-pay@example.com', business_name=f'{tag} payments')
+        db.session.add_all([reviewer, draw_customer, pay_customer])
+        db.session.flush()
+
+        draw_loc = LineOfCredit(customer_id=draw_customer.id, approved_amount=APPROVED_AMOUNT, used_amount=0.0,
+                                available_amount=APPROVED_AMOUNT, interest_rate=10, status='active')
+        pay_loc = LineOfCredit(customer_id=pay_customer.id, approved_amount=APPROVED_AMOUNT,
+                               used_amount=APPROVED_AMOUNT, outstanding_balance=APPROVED_AMOUNT,
+                               total_paid=0.0, number_of_payments_made=0, interest_rate=10, status='active')
+        db.session.add_all([draw_loc, pay_loc])
+        db.session.flush()
+
+        withdrawals = [
+            WithdrawalRequest(line_of_credit_id=draw_loc.id, customer_id=draw_customer.id,
+                              requested_amount=WITHDRAWAL_AMOUNT, status='pending')
+            for _ in range(args.withdrawals)
+        ]
+        db.session.add_all(withdrawals)
+        db.session.commit()
+
+        ids = {'reviewer': reviewer.id, 'customers': [draw_customer.id, pay_customer.id],
+               'draw_loc': draw_loc.id, 'pay_loc': pay_loc.id}
+        tasks = [('approve', w.id) for w in withdrawals] * 2 + [('pay', pay_loc.id)] * args.payments
+        random.shuffle(tasks)
+
+    counters = {'retries': 0}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=worker, args=(app, tasks, counters, lock, ids['reviewer']))
+               for _ in range(args.threads)]
+
+    print(f"📊 {len(tasks)} operations on {args.threads} threads ({app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0]})")
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"📊 Finished in {time.perf_counter() - started:.2f}s, {counters['retries']} lock retries")
+    print(f"📊 {', '.join(f'{key}={value}' for key, value in sorted(counters.items()))}")
+
+    with app.app_context():
+        draw_loc = db.session.get(LineOfCredit, ids['draw_loc'])
+        pay_loc = db.session.get(LineOfCredit, ids['pay_loc'])
+        approved = WithdrawalRequest.query.filter_by(line_of_credit_id=draw_loc.id, status='approved').count()
+        payments = Payment.query.filter_by(line_of_credit_id=pay_loc.id).count()
+        expected_approvals = min(args.withdrawals, int(APPROVED_AMOUNT // WITHDRAWAL_AMOUNT))
+
+        checks = [
+            ('each request approved at most once', counters.get('approve_ok', 0) == approved),
+            ('used amount matches approved requests', abs(draw_loc.used_amount - approved * WITHDRAWAL_AMOUNT) < 0.005),
+            ('approved amount never exceeded', draw_loc.used_amount <= draw_loc.approved_amount),
+            ('available credit used up', approved == expected_approvals),
+            ('available amount consistent', abs(draw_loc.available_amount - (draw_loc.approved_amount - draw_loc.used_amount)) < 0.005),
+            ('every payment counted', pay_loc.number_of_payments_made == payments == counters.get('pay_ok', 0)),
+            ('no payment lost', abs(pay_loc.total_paid - payments * PAYMENT_AMOUNT) < 0.005),
+            ('balance matches payments', abs(pay_loc.outstanding_balance - (APPROVED_AMOUNT - payments * PAYMENT_AMOUNT)) < 0.005),
+        ]
+
+        # Remove everything the run created
+        loc_ids = [ids['draw_loc'], ids['pay_loc']]
+        Payment.query.filter(Payment.line_of_credit_id.in_(loc_ids)).delete()
+        PaymentScheduleEntry.query.filter(PaymentScheduleEntry.line_of_credit_id.in_(loc_ids)).delete()
+        ActivityLog.query.filter(ActivityLog.line_of_credit_id.in_(loc_ids)).delete()
+        WithdrawalRequest.query.filter(WithdrawalRequest.line_of_credit_id.in_(loc_ids)).delete()
+        LineOfCredit.query.filter(LineOfCredit.id.in_(loc_ids)).delete()
+        Customer.query.filter(Customer.id.in_(ids['customers'])).delete()
+        User.query.filter_by(id=ids['reviewer']).delete()
+        db.session.commit()
+        rebuild_portfolio_rollup()
+
+        failed = False
+        for name, passed in checks:
+            print(f"{'✅' if passed else '⚠️ '} {name}")
+            failed = failed or not passed
+
+        if failed:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
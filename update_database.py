@@ -1,22 +1,19 @@
 """
-Update database with new tables: activity_logs and withdrawal_requests
-Run this after pulling latest code
+Update the database schema after pulling new code
+Creates new tables and columns and runs the catch-up backfills, even if the
+schema version is current (bootstrap.py does the same only when needed)
 """
 from app import create_app, db
-from app.models import ActivityLog, WithdrawalRequest
+from app.bootstrap import bootstrap
+
 
 def update_database():
     app = create_app()
     
     with app.app_context():
-        print("Creating new tables...")
-        
-        # Create new tables
-        db.create_all()
-        
+        print("Updating database...")
+        bootstrap(force=True)
         print("✅ Database updated successfully!")
-        print("   - activity_logs table created")
-        print("   - withdrawal_requests table created")
         
         # Check tables exist
         inspector = db.inspect(db.engine)